@@ -3,48 +3,58 @@ AquaHub Registration Backend
 Flask application to handle customer and vendor registration
 """
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import bcrypt
 import uuid
+import codecs
+import hashlib
 from datetime import datetime
-import os
 from dotenv import load_dotenv
 
+from hashing import get_rounds, hash_password, verify_password
+from registration import (
+    CUSTOMER_REQUIRED_FIELDS, VENDOR_REQUIRED_FIELDS, validate_delivery_radius, validate_location
+)
+from areas import DEFAULT_AREA_PAGE_SIZE, MAX_AREA_PAGE_SIZE, parse_area_cursor
+from bulk_import import IMPORT_KINDS
+from catalog_snapshot import (
+    CATALOG_CONFIG, DEFAULT_CATALOG_LIMIT, FACETS, MAX_CATALOG_LIMIT, get_catalog
+)
+from coverage import MAX_POLYGON_NAME, get_coverage_index, parse_polygon
+from distances import distance_cache
+from geocoding import MAX_GEOCODE_RESULTS, RateLimited, UpstreamError, get_geocoder
+from pincode_directory import MAX_PINCODE_BATCH, get_pincode_directory
+from places import DEFAULT_PLACE_RESULTS, MAX_PLACE_RESULTS, get_place_index
+from ranking import RANKING_CONFIG, validate_rating
+from reverse_geocoder import MAX_REVERSE_BATCH, get_reverse_geocoder
+from search_index import DEFAULT_SEARCH_RESULTS, MAX_SEARCH_RESULTS, get_search_index
+from serviceability import DEFAULT_PINCODE_PAGE_SIZE, MAX_PINCODE_PAGE_SIZE, normalize_pincode
+from serialization import FastJSONProvider, dumps, negotiated_response
+from storage import StorageUnavailable, get_storage
+from users import InvalidCursor, clamp_page_size
+from snapshots import invalidate_snapshots, snapshot_stats
+from tiles import TILE_CONFIG, TileUpstreamError, get_tile_cache, valid_tile
+from vendor_search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, get_vendor_index
+
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
-# Database configuration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'aquahub_db'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'your_password'),
-    'port': os.getenv('DB_PORT', '5432')
-}
-
-def get_db_connection():
-    """Create database connection"""
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except psycopg2.Error as e:
-        print(f"Database connection error: {e}")
-        return None
+# Calibrate the bcrypt cost once per worker instead of on the first signup
+get_rounds()
 
-def hash_password(password):
-    """Hash password using bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+@app.before_request
+def begin_storage_request():
+    """Attribute storage connections acquired from here on to this request"""
+    get_storage().begin_request(f'{request.method} {request.path}')
 
-def verify_password(password, hashed):
-    """Verify password against hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+@app.teardown_request
+def end_storage_request(exc):
+    """Report connections or cursors the request left open (DB_LEAK_DEBUG)"""
+    get_storage().end_request()
 
 @app.route('/')
 def index():
@@ -58,74 +68,25 @@ def register_customer():
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['email', 'password', 'firstName', 'lastName', 'phone', 'address', 'city', 'state', 'postalCode']
-        for field in required_fields:
+        for field in CUSTOMER_REQUIRED_FIELDS:
             if field not in data or not data[field]:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Check if email already exists
-        cur.execute("SELECT id FROM users WHERE email = %s", (data['email'],))
-        if cur.fetchone():
-            return jsonify({'error': 'Email already registered'}), 400
-        
         # Hash password
         password_hash = hash_password(data['password'])
         
-        # Insert user
-        user_id = str(uuid.uuid4())
-        cur.execute("""
-            INSERT INTO users (id, email, password_hash, user_type)
-            VALUES (%s, %s, %s, 'customer')
-        """, (user_id, data['email'], password_hash))
-        
-        # Insert customer profile
-        cur.execute("""
-            INSERT INTO customer_profiles 
-            (user_id, first_name, last_name, phone, date_of_birth, gender,
-             address_line1, address_line2, city, state, postal_code, country,
-             emergency_contact_name, emergency_contact_phone)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            user_id, data['firstName'], data['lastName'], data['phone'],
-            data.get('dateOfBirth'), data.get('gender'),
-            data['address'], data.get('address2', ''), data['city'], 
-            data['state'], data['postalCode'], data.get('country', 'India'),
-            data.get('emergencyContactName', ''), data.get('emergencyContactPhone', '')
-        ))
-        
-        # Insert water requirements if provided
-        if 'waterRequirements' in data:
-            reqs = data['waterRequirements']
-            cur.execute("""
-                INSERT INTO customer_water_requirements
-                (customer_id, required_quantity, frequency, preferred_delivery_days,
-                 preferred_time_slots, water_type, storage_capacity, special_instructions)
-                VALUES (
-                    (SELECT id FROM customer_profiles WHERE user_id = %s),
-                    %s, %s, %s, %s, %s, %s, %s
-                )
-            """, (
-                user_id, reqs.get('quantity', 5000), reqs.get('frequency', 'weekly'),
-                reqs.get('preferredDays', []), reqs.get('preferredTimeSlots', []),
-                reqs.get('waterType', 'potable'), reqs.get('storageCapacity'),
-                reqs.get('specialInstructions', '')
-            ))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        user_id = get_storage().create_customer(data, password_hash)
+        if user_id is None:
+            return jsonify({'error': 'Email already registered'}), 400
         
         return jsonify({
             'message': 'Customer registered successfully',
             'userId': user_id
         }), 201
         
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
     except Exception as e:
         print(f"Registration error: {e}")
         return jsonify({'error': 'Registration failed'}), 500
@@ -137,110 +98,672 @@ def register_vendor():
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['email', 'password', 'businessName', 'contactPersonName', 'phone', 'businessAddress', 'city', 'state', 'postalCode']
-        for field in required_fields:
+        for field in VENDOR_REQUIRED_FIELDS:
             if field not in data or not data[field]:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Check if email already exists
-        cur.execute("SELECT id FROM users WHERE email = %s", (data['email'],))
-        if cur.fetchone():
-            return jsonify({'error': 'Email already registered'}), 400
+        location_error = validate_location(data) or validate_delivery_radius(data)
+        if location_error:
+            return jsonify({'error': location_error}), 400
         
         # Hash password
         password_hash = hash_password(data['password'])
         
-        # Insert user
-        user_id = str(uuid.uuid4())
-        cur.execute("""
-            INSERT INTO users (id, email, password_hash, user_type)
-            VALUES (%s, %s, %s, 'vendor')
-        """, (user_id, data['email'], password_hash))
-        
-        # Insert vendor profile
-        cur.execute("""
-            INSERT INTO vendor_profiles 
-            (user_id, business_name, contact_person_name, phone, alternate_phone,
-             business_address_line1, business_address_line2, city, state, postal_code, country,
-             business_type, years_in_business, license_number, tax_id,
-             service_areas, tanker_capacity, delivery_radius_km)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            user_id, data['businessName'], data['contactPersonName'], data['phone'],
-            data.get('alternatePhone', ''), data['businessAddress'], data.get('businessAddress2', ''),
-            data['city'], data['state'], data['postalCode'], data.get('country', 'India'),
-            data.get('businessType', ''), data.get('yearsInBusiness'), data.get('licenseNumber', ''),
-            data.get('taxId', ''), data.get('serviceAreas', []), data.get('tankerCapacity', []),
-            data.get('deliveryRadius', 50)
-        ))
-        
-        # Insert vendor services if provided
-        if 'services' in data and data['services']:
-            for service in data['services']:
-                cur.execute("""
-                    INSERT INTO vendor_services
-                    (vendor_id, service_name, water_type, tanker_capacity, price_per_liter,
-                     minimum_order_quantity, available_days, available_time_slots, coverage_areas)
-                    VALUES (
-                        (SELECT id FROM vendor_profiles WHERE user_id = %s),
-                        %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                """, (
-                    user_id, service.get('serviceName', ''), service.get('waterType', 'potable'),
-                    service.get('tankerCapacity', 5000), service.get('pricePerLiter', 1.50),
-                    service.get('minimumOrder', 1000), service.get('availableDays', []),
-                    service.get('availableTimeSlots', []), service.get('coverageAreas', [])
-                ))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        # Creates the profile and any services in the payload
+        user_id = get_storage().create_vendor(data, password_hash)
+        if user_id is None:
+            return jsonify({'error': 'Email already registered'}), 400
+        invalidate_snapshots()
+        refresh_pincode_rankings()
         
         return jsonify({
             'message': 'Vendor registered successfully',
             'userId': user_id
         }), 201
         
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
     except Exception as e:
         print(f"Registration error: {e}")
         return jsonify({'error': 'Registration failed'}), 500
 
 @app.route('/api/users', methods=['GET'])
 def get_users():
-    """Get all users (for testing)"""
+    """List users newest first, one keyset page at a time
+
+    Query parameters: ``limit`` (page size, capped at MAX_PAGE_SIZE) and
+    ``cursor`` (the ``nextCursor`` of the previous page). Pass
+    ``format=ndjson`` or ``Accept: application/x-ndjson`` to stream the
+    whole table instead, or ``format=msgpack`` / ``Accept:
+    application/msgpack`` for a MessagePack page.
+    """
+    if request.args.get('format') == 'ndjson' or \
+            request.accept_mimetypes.best == 'application/x-ndjson':
+        return Response(stream_users_ndjson(), mimetype='application/x-ndjson')
+
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT u.id, u.email, u.user_type, u.created_at,
-                   CASE 
-                       WHEN u.user_type = 'customer' THEN cp.first_name || ' ' || cp.last_name
-                       WHEN u.user_type = 'vendor' THEN vp.business_name
-                   END as name
-            FROM users u
-            LEFT JOIN customer_profiles cp ON u.id = cp.user_id
-            LEFT JOIN vendor_profiles vp ON u.id = vp.user_id
-            ORDER BY u.created_at DESC
-        """)
-        
-        users = cur.fetchall()
-        cur.close()
-        conn.close()
+        limit = clamp_page_size(request.args.get('limit'))
+        users, next_cursor = get_storage().list_users(limit, request.args.get('cursor'))
         
-        return jsonify({'users': users}), 200
+        return negotiated_response({'users': users, 'nextCursor': next_cursor})
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
     except Exception as e:
         print(f"Error fetching users: {e}")
         return jsonify({'error': 'Failed to fetch users'}), 500
 
+def stream_users_ndjson():
+    """Yield every user as one JSON document per line"""
+    try:
+        for user in get_storage().iter_users():
+            yield dumps(user) + b'\n'
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated stream
+        print(f"Error streaming users: {e}")
+
+@app.route('/api/import/<kind>', methods=['POST'])
+def bulk_import(kind):
+    """Bulk onboard customers, vendors or services from CSV or NDJSON
+
+    The file is the request body (or a multipart ``file`` field). The
+    format comes from ``?format=`` or the content type, defaulting to NDJSON.
+    """
+    if kind not in IMPORT_KINDS:
+        return jsonify({'error': f'Unknown import kind: {kind}'}), 404
+    
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    content_type = (upload.mimetype if upload else request.mimetype) or ''
+    fmt = request.args.get('format') or ('csv' if 'csv' in content_type else 'ndjson')
+    
+    try:
+        lines = codecs.iterdecode(stream, 'utf-8')
+        report = get_storage().import_records(kind, lines, fmt)
+        if kind != 'customers' and report.imported:
+            invalidate_snapshots()
+            refresh_pincode_rankings()
+        
+        return jsonify(report.as_dict()), 200
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Import error: {e}")
+        return jsonify({'error': 'Import failed'}), 500
+
+@app.route('/api/vendors/search', methods=['GET'])
+def search_vendors():
+    """Vendors whose delivery radius covers a point, nearest first
+
+    Query parameters: ``lat`` and ``lng`` (required), ``water_type``,
+    ``min_capacity`` (litres), ``limit`` and ``offset``.
+    """
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        min_capacity = int(request.args.get('min_capacity') or 0)
+        offset = max(int(request.args.get('offset') or 0), 0)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lng are required; min_capacity and offset must be integers'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat/lng out of range'}), 400
+    limit = clamp_page_size(request.args.get('limit'), DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+    
+    try:
+        index = get_vendor_index(get_storage())
+        vendors, total = index.search(
+            lat, lng, request.args.get('water_type'), min_capacity, limit, offset
+        )
+        
+        return negotiated_response({
+            'vendors': vendors, 'total': total, 'limit': limit, 'offset': offset
+        })
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Vendor search error: {e}")
+        return jsonify({'error': 'Vendor search failed'}), 500
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """Typo-tolerant search over vendor names, service names and areas
+
+    Query parameters: ``q`` (the text typed so far; the last word may be
+    partial), optional ``city`` and ``limit``. Results are ranked best first.
+    """
+    query = request.args.get('q', '')
+    limit = clamp_page_size(request.args.get('limit'), DEFAULT_SEARCH_RESULTS, MAX_SEARCH_RESULTS)
+    
+    try:
+        index = get_search_index(get_storage())
+        results = index.search(query, limit, request.args.get('city'))
+        
+        return negotiated_response({'query': query, 'results': results})
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Search error: {e}")
+        return jsonify({'error': 'Search failed'}), 500
+
+@app.route('/api/places/autocomplete', methods=['GET'])
+def autocomplete_places():
+    """Localities, areas and landmarks with a word starting with ``q``
+
+    Served from the local memory-mapped place index, without external calls.
+    """
+    query = request.args.get('q', '')
+    limit = clamp_page_size(request.args.get('limit'), DEFAULT_PLACE_RESULTS, MAX_PLACE_RESULTS)
+            
+    try:
+        index = get_place_index()
+        if index is None:
+            return jsonify({'error': 'Place index has not been built'}), 503
+                
+        return negotiated_response({'query': query, 'places': index.complete(query, limit)})
+                
+    except Exception as e:
+        print(f"Place autocomplete error: {e}")
+        return jsonify({'error': 'Place autocomplete failed'}), 500
+
+@app.route('/api/places/nearest', methods=['GET'])
+def nearest_place():
+    """Nearest locality, city, state and pincode of ``lat``/``lng``
+
+    Served from the local memory-mapped reverse geocoding index.
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat and lng must be valid coordinates'}), 400
+        
+    try:
+        index = get_reverse_geocoder()
+        if index is None:
+            return jsonify({'error': 'Reverse geocoding index has not been built'}), 503
+        location = index.locate([(lat, lng)])[0]
+        if location is None:
+            return jsonify({'error': 'No known locality near this point'}), 404
+        
+        return negotiated_response(location)
+        
+    except Exception as e:
+        print(f"Reverse geocoding error: {e}")
+        return jsonify({'error': 'Reverse geocoding failed'}), 500
+
+@app.route('/api/places/nearest', methods=['POST'])
+def nearest_places():
+    """Reverse geocode up to MAX_REVERSE_BATCH ``points`` (``[lat, lng]`` pairs) at once
+
+    ``locations`` lines up with ``points``; points with nothing nearby get null.
+    """
+    points = (request.get_json(silent=True) or {}).get('points')
+    if not isinstance(points, list) or len(points) > MAX_REVERSE_BATCH:
+        return jsonify({'error': f'points must be a list of at most {MAX_REVERSE_BATCH} [lat, lng] pairs'}), 400
+    try:
+        coordinates = [(float(lat), float(lng)) for lat, lng in points]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'points must be [lat, lng] pairs'}), 400
+    if not all(-90 <= lat <= 90 and -180 <= lng <= 180 for lat, lng in coordinates):
+        return jsonify({'error': 'points must be valid coordinates'}), 400
+        
+    try:
+        index = get_reverse_geocoder()
+        if index is None:
+            return jsonify({'error': 'Reverse geocoding index has not been built'}), 503
+        
+        return negotiated_response({'locations': index.locate(coordinates)})
+        
+    except Exception as e:
+        print(f"Reverse geocoding error: {e}")
+        return jsonify({'error': 'Reverse geocoding failed'}), 500
+
+@app.route('/api/geocode/search', methods=['GET'])
+def geocode_search():
+    """Forward geocoding of ``q`` through the cached geocoding proxy"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    limit = clamp_page_size(request.args.get('limit'), 1, MAX_GEOCODE_RESULTS)
+        
+    try:
+        body, hit = get_geocoder().search(query, limit)
+        return geocode_response(body, hit)
+        
+    except RateLimited as e:
+        return upstream_busy(e)
+    except UpstreamError as e:
+        print(f"Geocoder upstream error: {e}")
+        return jsonify({'error': 'Geocoding service unavailable'}), 502
+    except Exception as e:
+        print(f"Geocoding error: {e}")
+        return jsonify({'error': 'Geocoding failed'}), 500
+
+@app.route('/api/geocode/reverse', methods=['GET'])
+def geocode_reverse():
+    """Address of ``lat``/``lng`` through the cached geocoding proxy
+
+    Coordinates are rounded before the lookup, so nearby points share a
+    cache entry.
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat and lng must be valid coordinates'}), 400
+    zoom = min(max(request.args.get('zoom', 18, type=int), 0), 18)
+        
+    try:
+        body, hit = get_geocoder().reverse(lat, lng, zoom)
+        return geocode_response(body, hit)
+        
+    except RateLimited as e:
+        return upstream_busy(e)
+    except UpstreamError as e:
+        print(f"Geocoder upstream error: {e}")
+        return jsonify({'error': 'Geocoding service unavailable'}), 502
+    except Exception as e:
+        print(f"Geocoding error: {e}")
+        return jsonify({'error': 'Geocoding failed'}), 500
+
+def geocode_response(body, hit):
+    response = Response(body, mimetype='application/json')
+    response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+def upstream_busy(error):
+    response = jsonify({'error': 'Upstream service busy, try again shortly'})
+    response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response, 503
+
+@app.route('/api/tiles/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+def map_tile(z, x, y):
+    """OpenStreetMap tile through the caching tile proxy
+
+    Tiles carry a content ETag and may be cached by browsers and CDNs for
+    TILE_BROWSER_MAX_AGE; a matching ``If-None-Match`` gets an empty 304.
+    """
+    if not valid_tile(z, x, y):
+        return jsonify({'error': f'No such tile: {z}/{x}/{y}'}), 404
+        
+    try:
+        body, content_type, hit = get_tile_cache().get(z, x, y)
+        
+        response = app.response_class(body, mimetype=content_type)
+        response.set_etag(hashlib.blake2b(body, digest_size=12).hexdigest())
+        response.cache_control.public = True
+        response.cache_control.max_age = TILE_CONFIG['browser_max_age']
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response.make_conditional(request)
+        
+    except RateLimited as e:
+        return upstream_busy(e)
+    except TileUpstreamError as e:
+        print(f"Tile upstream error: {e}")
+        return jsonify({'error': 'Tile server unavailable'}), 502
+    except Exception as e:
+        print(f"Tile proxy error: {e}")
+        return jsonify({'error': 'Tile proxy failed'}), 500
+
+@app.route('/api/services', methods=['GET'])
+def list_services():
+    """Filtered listing of active services with per-facet counts
+
+    Facet filters (``water_type``, ``price_band``, ``capacity``, ``city``)
+    take comma-separated values; values of one facet are OR-ed, facets are
+    AND-ed. Results are cheapest tanker first, paged by ``limit``/``offset``.
+    """
+    try:
+        offset = max(int(request.args.get('offset') or 0), 0)
+    except ValueError:
+        return jsonify({'error': 'offset must be an integer'}), 400
+    limit = clamp_page_size(request.args.get('limit'), DEFAULT_CATALOG_LIMIT, MAX_CATALOG_LIMIT)
+    filters = {
+        facet: [v for v in request.args.get(facet, '').split(',') if v.strip()]
+        for facet in FACETS
+    }
+    
+    try:
+        snapshot = get_catalog(get_storage())
+        services, total, facets = snapshot.search(filters, offset, limit)
+        
+        return negotiated_response({
+            'services': services, 'total': total, 'facets': facets,
+            'version': snapshot.version, 'limit': limit, 'offset': offset
+        })
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Service listing error: {e}")
+        return jsonify({'error': 'Failed to list services'}), 500
+
+@app.route('/api/catalog', methods=['GET'])
+def catalog_document():
+    """Precomputed tanker catalog for ``?city=``, or the list of cities
+
+    Documents are regenerated only when the catalog changes and carry a
+    strong ETag; a matching ``If-None-Match`` gets an empty 304.
+    """
+    try:
+        snapshot = get_catalog(get_storage())
+        document = snapshot.document(request.args.get('city'))
+        if document is None:
+            return jsonify({'error': f"Unknown city: {request.args.get('city')}"}), 404
+        
+        response = app.response_class(document.body, mimetype='application/json')
+        response.set_etag(document.etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = CATALOG_CONFIG['max_age']
+        response.headers['X-Catalog-Version'] = str(snapshot.version)
+        return response.make_conditional(request)
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Catalog error: {e}")
+        return jsonify({'error': 'Failed to load catalog'}), 500
+
+@app.route('/api/areas/<path:name>/vendors', methods=['GET'])
+def area_vendors(name):
+    """Vendors serving an area through their profile or a service's coverage
+
+    Area names match case- and punctuation-insensitively. Paged by
+    ``limit`` and ``cursor`` (the ``nextCursor`` of the previous page).
+    """
+    try:
+        limit = clamp_page_size(request.args.get('limit'), DEFAULT_AREA_PAGE_SIZE, MAX_AREA_PAGE_SIZE)
+        cursor = parse_area_cursor(request.args.get('cursor'))
+        area, vendors, next_cursor = get_storage().area_vendors(name, limit, cursor)
+        if area is None:
+            return jsonify({'error': f'Unknown area: {name}'}), 404
+        
+        return negotiated_response({
+            'area': {'key': area.area_key, 'name': area.name},
+            'vendors': vendors,
+            'nextCursor': next_cursor
+        })
+        
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Area lookup error: {e}")
+        return jsonify({'error': 'Area lookup failed'}), 500
+
+@app.route('/api/pincodes/<pincode>', methods=['GET'])
+def pincode_details(pincode):
+    """Post offices, district, state and centroid of a pincode"""
+    if normalize_pincode(pincode) is None:
+        return jsonify({'error': f'Invalid pincode: {pincode}'}), 400
+            
+    try:
+        directory = get_pincode_directory()
+        if directory is None:
+            return jsonify({'error': 'Pincode directory has not been built'}), 503
+        record = directory.lookup(pincode)
+        if record is None:
+            return jsonify({'error': f'Unknown pincode: {pincode}'}), 404
+                
+        return negotiated_response(record)
+                
+    except Exception as e:
+        print(f"Pincode directory error: {e}")
+        return jsonify({'error': 'Pincode lookup failed'}), 500
+
+@app.route('/api/pincodes/lookup', methods=['POST'])
+def lookup_pincodes():
+    """Look up to MAX_PINCODE_BATCH ``pincodes`` in one request
+
+    Unknown and malformed pincodes are listed under ``notFound``.
+    """
+    pincodes = (request.get_json(silent=True) or {}).get('pincodes')
+    if not isinstance(pincodes, list) or len(pincodes) > MAX_PINCODE_BATCH:
+        return jsonify({'error': f'pincodes must be a list of at most {MAX_PINCODE_BATCH} pincodes'}), 400
+            
+    try:
+        directory = get_pincode_directory()
+        if directory is None:
+            return jsonify({'error': 'Pincode directory has not been built'}), 503
+        found, not_found = [], []
+        for pincode in pincodes:
+            record = directory.lookup(pincode)
+            if record is None:
+                not_found.append(pincode)
+            else:
+                found.append(record)
+                
+        return negotiated_response({'pincodes': found, 'notFound': not_found})
+                
+    except Exception as e:
+        print(f"Pincode directory error: {e}")
+        return jsonify({'error': 'Pincode lookup failed'}), 500
+
+@app.route('/api/pincodes/<pincode>/vendors', methods=['GET'])
+def pincode_vendors(pincode):
+    """Vendors delivering to a pincode, with the services that do
+
+    Served from the precomputed pincode_serviceability table. Paged by
+    ``limit`` and ``cursor`` (the ``nextCursor`` of the previous page).
+    """
+    code = normalize_pincode(pincode)
+    if code is None:
+        return jsonify({'error': f'Invalid pincode: {pincode}'}), 400
+    
+    try:
+        limit = clamp_page_size(request.args.get('limit'), DEFAULT_PINCODE_PAGE_SIZE, MAX_PINCODE_PAGE_SIZE)
+        cursor = parse_area_cursor(request.args.get('cursor'))
+        info, vendors, next_cursor = get_storage().pincode_vendors(code, limit, cursor)
+        if info is None:
+            return jsonify({'error': f'Unknown pincode: {code}'}), 404
+        
+        return negotiated_response({
+            'pincode': info,
+            'vendors': vendors,
+            'nextCursor': next_cursor
+        })
+        
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Pincode lookup error: {e}")
+        return jsonify({'error': 'Pincode lookup failed'}), 500
+
+@app.route('/api/pincodes/<pincode>/top-services', methods=['GET'])
+def pincode_top_services(pincode):
+    """Best services for a pincode and ``water_type`` (default potable)
+
+    Read from the precomputed pincode_rankings; ``limit`` is capped at
+    RANKING_TOP_K, the number of services ranked per pincode.
+    """
+    code = normalize_pincode(pincode)
+    if code is None:
+        return jsonify({'error': f'Invalid pincode: {pincode}'}), 400
+    water_type = request.args.get('water_type') or 'potable'
+    limit = clamp_page_size(request.args.get('limit'), RANKING_CONFIG['top_k'], RANKING_CONFIG['top_k'])
+            
+    try:
+        services = get_storage().top_services(code, water_type, limit)
+                
+        return negotiated_response({
+            'pincode': code, 'waterType': water_type, 'services': services
+        })
+                
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Ranking lookup error: {e}")
+        return jsonify({'error': 'Ranking lookup failed'}), 500
+
+@app.route('/api/vendors/<vendor_id>/ratings', methods=['POST'])
+def rate_vendor(vendor_id):
+    """Record a 1-5 star ``rating`` for a vendor"""
+    try:
+        vendor_id = str(uuid.UUID(vendor_id))
+    except ValueError:
+        return jsonify({'error': f'Invalid vendor id: {vendor_id}'}), 400
+    rating = validate_rating((request.get_json(silent=True) or {}).get('rating'))
+    if rating is None:
+        return jsonify({'error': 'rating must be an integer from 1 to 5'}), 400
+            
+    try:
+        result = get_storage().rate_vendor(vendor_id, rating)
+        if result is None:
+            return jsonify({'error': f'Unknown vendor: {vendor_id}'}), 404
+        refresh_pincode_rankings()
+                
+        average, count = result
+        return jsonify({'vendorId': vendor_id, 'rating': average, 'ratingCount': count}), 200
+                
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Rating error: {e}")
+        return jsonify({'error': 'Rating failed'}), 500
+
+@app.route('/api/vendors/<vendor_id>/coverage-polygons', methods=['POST'])
+def add_coverage_polygon(vendor_id):
+    """Draw a coverage ``polygon`` (``[lat, lng]`` vertices) for a vendor
+
+    ``serviceId`` limits it to one of the vendor's services; without it
+    the polygon covers all of them.
+    """
+    try:
+        vendor_id = str(uuid.UUID(vendor_id))
+    except ValueError:
+        return jsonify({'error': f'Invalid vendor id: {vendor_id}'}), 400
+    data = request.get_json(silent=True) or {}
+    service_id = data.get('serviceId')
+    if service_id is not None:
+        try:
+            service_id = str(uuid.UUID(str(service_id)))
+        except ValueError:
+            return jsonify({'error': f'Invalid service id: {service_id}'}), 400
+    name = data.get('name')
+    if name is not None and (not isinstance(name, str) or len(name) > MAX_POLYGON_NAME):
+        return jsonify({'error': f'name must be a string of at most {MAX_POLYGON_NAME} characters'}), 400
+    try:
+        vertices = parse_polygon(data.get('polygon'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    try:
+        polygon_id = get_storage().add_coverage_polygon(vendor_id, service_id, name, vertices)
+        if polygon_id is None:
+            return jsonify({'error': f'Unknown vendor or service: {vendor_id}'}), 404
+        invalidate_snapshots()
+        
+        return jsonify({'id': polygon_id, 'vendorId': vendor_id, 'serviceId': service_id}), 201
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Coverage polygon error: {e}")
+        return jsonify({'error': 'Saving coverage polygon failed'}), 500
+
+@app.route('/api/vendors/<vendor_id>/coverage-polygons', methods=['GET'])
+def vendor_coverage_polygons(vendor_id):
+    """A vendor's coverage polygons"""
+    try:
+        vendor_id = str(uuid.UUID(vendor_id))
+    except ValueError:
+        return jsonify({'error': f'Invalid vendor id: {vendor_id}'}), 400
+        
+    try:
+        return negotiated_response({'polygons': get_storage().vendor_coverage_polygons(vendor_id)})
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Coverage polygon error: {e}")
+        return jsonify({'error': 'Coverage polygon lookup failed'}), 500
+
+@app.route('/api/vendors/<vendor_id>/coverage-polygons/<int:polygon_id>', methods=['DELETE'])
+def delete_coverage_polygon(vendor_id, polygon_id):
+    """Remove one of a vendor's coverage polygons"""
+    try:
+        vendor_id = str(uuid.UUID(vendor_id))
+    except ValueError:
+        return jsonify({'error': f'Invalid vendor id: {vendor_id}'}), 400
+        
+    try:
+        if not get_storage().delete_coverage_polygon(vendor_id, polygon_id):
+            return jsonify({'error': f'Unknown coverage polygon: {polygon_id}'}), 404
+        invalidate_snapshots()
+        
+        return jsonify({'id': polygon_id, 'deleted': True}), 200
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Coverage polygon error: {e}")
+        return jsonify({'error': 'Deleting coverage polygon failed'}), 500
+
+@app.route('/api/coverage', methods=['GET'])
+def coverage():
+    """Services whose coverage polygons contain ``lat``/``lng``, cheapest first
+
+    Optionally filtered by ``water_type``. Served from the in-memory
+    polygon index.
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat and lng must be valid coordinates'}), 400
+        
+    try:
+        index = get_coverage_index(get_storage())
+        services = index.covering(lat, lng, request.args.get('water_type'))
+        
+        return negotiated_response({'latitude': lat, 'longitude': lng, 'services': services})
+        
+    except StorageUnavailable as e:
+        print(f"Database connection error: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+    except Exception as e:
+        print(f"Coverage lookup error: {e}")
+        return jsonify({'error': 'Coverage lookup failed'}), 500
+
+def refresh_pincode_rankings():
+    """Re-rank one batch of the pincodes a write queued
+
+    A large write (an import) can queue more than a batch; the rest, and
+    anything a failure leaves queued, is for `python ranking.py refresh
+    --watch` to drain outside the request.
+    """
+    try:
+        get_storage().refresh_rankings(max_batches=1)
+    except Exception as e:
+        print(f"Ranking refresh error: {e}")
+
+@app.route('/api/health/db', methods=['GET'])
+def db_health():
+    """Report the storage backend and its connection statistics"""
+    return jsonify({
+        'backend': get_storage().name, **get_storage().health(), 'snapshots': snapshot_stats(),
+        'distanceCache': distance_cache.stats()
+    }), 200
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,105 @@
+"""
+AquaHub Service Areas
+Area-to-vendor lookups over the normalized areas tables
+
+Area names are matched on a canonical key so "HSR Layout", "hsr  layout"
+and "HSR-Layout" are the same area. In PostgreSQL the join tables are
+kept in step with the TEXT[] columns by triggers (migration 003).
+"""
+
+import re
+import uuid
+from dataclasses import dataclass
+
+from prepared import execute_prepared, register_query
+from users import InvalidCursor
+
+DEFAULT_AREA_PAGE_SIZE = 50
+MAX_AREA_PAGE_SIZE = 500
+
+_NON_ALNUM = re.compile(r'[\W_]+')
+
+AREA_SQL = """
+    SELECT id, area_key, name FROM areas WHERE area_key = %(area_key)s
+"""
+register_query('area_by_key', AREA_SQL)
+
+# Each branch is an index-only range scan on its primary key, bounded by the
+# page size, so the cost depends on the page and not on the table size.
+AREA_VENDORS_SQL = """
+    WITH page AS (
+        (SELECT vendor_id FROM vendor_service_areas
+         WHERE area_id = %(area_id)s AND vendor_id > %(after)s::uuid
+         ORDER BY vendor_id LIMIT %(limit)s)
+        UNION
+        (SELECT vendor_id FROM vendor_service_coverage
+         WHERE area_id = %(area_id)s AND vendor_id > %(after)s::uuid
+         ORDER BY vendor_id LIMIT %(limit)s)
+        ORDER BY vendor_id
+        LIMIT %(limit)s
+    )
+    SELECT vp.id, vp.business_name, vp.city, vp.phone
+    FROM page
+    JOIN vendor_profiles vp ON vp.id = page.vendor_id
+    ORDER BY vp.id
+"""
+register_query('area_vendors', AREA_VENDORS_SQL)
+
+FIRST_VENDOR_ID = '00000000-0000-0000-0000-000000000000'
+
+
+@dataclass(slots=True)
+class Area:
+    id: int
+    area_key: str
+    name: str
+
+
+@dataclass(slots=True)
+class AreaVendor:
+    """A vendor serving an area, through its profile or one of its services"""
+
+    id: str
+    business_name: str
+    city: str
+    phone: str
+
+
+def area_key(name):
+    """Canonical key for an area name (mirrors the SQL area_key function)"""
+    return _NON_ALNUM.sub(' ', (name or '').lower()).strip()
+
+
+def parse_area_cursor(cursor):
+    """Validate an area page cursor (the last vendor id of a page)"""
+    if not cursor:
+        return None
+    try:
+        return str(uuid.UUID(cursor))
+    except ValueError as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def fetch_area_vendors(conn, name, limit=DEFAULT_AREA_PAGE_SIZE, cursor=None):
+    """Return (area, vendors, next_cursor) for one page of an area's vendors
+
+    area is None when no vendor has ever listed the area. Vendors are
+    ordered by id and ``cursor`` is the last id of the previous page.
+    """
+    with conn.cursor() as cur:
+        execute_prepared(cur, 'area_by_key', {'area_key': area_key(name)})
+        row = cur.fetchone()
+        if row is None:
+            return None, [], None
+        area = Area(*row)
+
+        execute_prepared(cur, 'area_vendors', {
+            'area_id': area.id, 'after': cursor or FIRST_VENDOR_ID, 'limit': limit + 1
+        })
+        vendors = [AreaVendor(str(r[0]), *r[1:]) for r in cur]
+
+    next_cursor = None
+    if len(vendors) > limit:
+        vendors = vendors[:limit]
+        next_cursor = vendors[-1].id
+    return area, vendors, next_cursor
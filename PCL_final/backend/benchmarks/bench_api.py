@@ -0,0 +1,99 @@
+"""
+AquaHub API Benchmark
+Drives the registration and user-listing endpoints through the Flask test client
+
+Uses the storage backend selected by STORAGE_BACKEND and defaults to an
+in-memory SQLite database, so it runs hermetically without a Postgres
+server. bcrypt runs at its minimum cost so the numbers reflect the API
+and storage path rather than password hashing.
+
+    python benchmarks/bench_api.py [--customers 2000] [--vendors 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+os.environ.setdefault('SQLITE_PATH', ':memory:')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('BCRYPT_WORKERS', '0')
+
+from app import app
+
+
+def customer_payload(i):
+    return {
+        'email': f'customer{i}@bench.example', 'password': 'benchmark',
+        'firstName': 'Bench', 'lastName': f'Customer {i}', 'phone': '9000000000',
+        'address': f'{i} Bench Street', 'city': 'Bangalore', 'state': 'Karnataka',
+        'postalCode': '560001',
+        'waterRequirements': {'quantity': 5000, 'preferredDays': ['monday', 'thursday']},
+    }
+
+
+def vendor_payload(i):
+    return {
+        'email': f'vendor{i}@bench.example', 'password': 'benchmark',
+        'businessName': f'Bench Tankers {i}', 'contactPersonName': 'Bench',
+        'phone': '9000000000', 'businessAddress': f'{i} Depot Road', 'city': 'Bangalore',
+        'state': 'Karnataka', 'postalCode': '560034', 'serviceAreas': ['Koramangala'],
+        'services': [{'serviceName': f'{cap} L tanker', 'tankerCapacity': cap,
+                      'coverageAreas': ['Koramangala', 'HSR Layout']}
+                     for cap in (5000, 10000, 12000)],
+    }
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {count:>7} {elapsed * 1000:>10.1f} ms {count / elapsed:>10.1f} /s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--vendors', type=int, default=500)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    print(f"storage backend: {os.environ['STORAGE_BACKEND']}")
+    print(f"{'operation':<28} {'count':>7} {'total':>13} {'rate':>12}")
+
+    def register_customers():
+        for i in range(args.customers):
+            assert client.post('/api/register/customer', json=customer_payload(i)).status_code == 201
+
+    def register_vendors():
+        for i in range(args.vendors):
+            assert client.post('/api/register/vendor', json=vendor_payload(i)).status_code == 201
+
+    timed('register customer', args.customers, register_customers)
+    timed('register vendor (+3 svc)', args.vendors, register_vendors)
+
+    total_users = args.customers + args.vendors
+    pages = []
+
+    def walk_pages():
+        cursor = None
+        while True:
+            url = f'/api/users?limit={args.page_size}' + (f'&cursor={cursor}' if cursor else '')
+            body = client.get(url).get_json()
+            pages.append(len(body['users']))
+            cursor = body['nextCursor']
+            if not cursor:
+                break
+
+    timed(f'list users (page {args.page_size})', total_users, walk_pages)
+    timed('export users (ndjson)', total_users,
+          lambda: client.get('/api/users?format=ndjson').get_data())
+    print(f"pages walked: {len(pages)}, users seen: {sum(pages)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+AquaHub Service Area Benchmark
+Compares unnesting area arrays with the normalized area join tables
+
+Runs on an in-memory SQLite storage, so it is hermetic. Vendors list a few
+of AREA_COUNT areas on their profile and their services; each query asks
+for the first page of vendors serving one area.
+
+    python benchmarks/bench_areas.py [--vendors 20000] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.sqlite import SQLiteStorage
+
+AREA_COUNT = 400
+
+ARRAY_SCAN_SQL = """
+    SELECT DISTINCT vp.id, vp.business_name, vp.city, vp.phone
+    FROM vendor_profiles vp
+    LEFT JOIN vendor_services vs ON vs.vendor_id = vp.id
+    WHERE EXISTS (SELECT 1 FROM json_each(vp.service_areas) WHERE lower(trim(value)) = ?)
+       OR EXISTS (SELECT 1 FROM json_each(vs.coverage_areas) WHERE lower(trim(value)) = ?)
+    ORDER BY vp.id
+    LIMIT ?
+"""
+
+
+def vendor_payload(i, rng):
+    areas = [f'Area {n}' for n in rng.sample(range(AREA_COUNT), 3)]
+    return {
+        'email': f'vendor{i}@bench.example', 'businessName': f'Bench Tankers {i}',
+        'contactPersonName': 'Bench', 'phone': '9000000000', 'businessAddress': f'{i} Depot Road',
+        'city': 'Bangalore', 'state': 'Karnataka', 'postalCode': '560034',
+        'serviceAreas': areas[:2],
+        'services': [{'serviceName': '5000 L tanker', 'tankerCapacity': 5000,
+                      'coverageAreas': [areas[2]]}],
+    }
+
+
+def timed_queries(points, fn):
+    started = time.perf_counter()
+    for name in points:
+        fn(name)
+    return (time.perf_counter() - started) / len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--vendors', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    storage = SQLiteStorage(':memory:')
+    started = time.perf_counter()
+    with storage.transaction() as conn:
+        for i in range(args.vendors):
+            storage._insert_vendor(conn, vendor_payload(i, rng), 'bench')
+    print(f"vendors: {args.vendors}, areas: {AREA_COUNT}, "
+          f"load: {time.perf_counter() - started:.1f} s")
+
+    names = [f'Area {rng.randrange(AREA_COUNT)}' for _ in range(args.queries)]
+    conn = storage._conn()
+
+    def array_scan(name):
+        key = name.lower()
+        return conn.execute(ARRAY_SCAN_SQL, (key, key, args.page_size)).fetchall()
+
+    def join_tables(name):
+        return storage.area_vendors(name, args.page_size)
+
+    print(f"{'lookup':<22} {'per query':>12}")
+    for label, fn in (('array scan', array_scan), ('area join tables', join_tables)):
+        print(f"{label:<22} {timed_queries(names, fn) * 1000:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
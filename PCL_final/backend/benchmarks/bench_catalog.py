@@ -0,0 +1,109 @@
+"""
+AquaHub Catalog Snapshot Benchmark
+Builds the columnar catalog snapshot over synthetic services and times facet queries
+
+Services are synthesised in memory in the CATALOG_SERVICES_SQL row shape,
+so the numbers cover the snapshot build, its memory and query latency
+without a database.
+
+    python benchmarks/bench_catalog.py [--services 1000000] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_snapshot import CatalogSnapshot
+
+CITIES = ['Bangalore', 'Chennai', 'Hyderabad', 'Mumbai', 'Pune', 'Delhi', 'Kolkata',
+          'Ahmedabad', 'Jaipur', 'Kochi', 'Mysore', 'Coimbatore']
+WATER_TYPES = ['potable', 'industrial', 'construction', 'irrigation', 'drinking']
+CAPACITIES = [1000, 1200, 1500, 3000, 3500, 4000, 5000, 8000, 10000, 12000, 20000]
+
+
+def make_rows(count, vendors, rng):
+    vendor_rows = [(str(uuid.uuid4()), f'Bench Tankers {i}', rng.choice(CITIES)) for i in range(vendors)]
+    rows = []
+    for _ in range(count):
+        vendor_id, business_name, city = rng.choice(vendor_rows)
+        capacity = rng.choice(CAPACITIES)
+        rows.append((
+            str(uuid.uuid4()), vendor_id, business_name, city, f'{capacity} L tanker',
+            rng.choice(WATER_TYPES), capacity, round(rng.uniform(0.05, 0.4), 2), 1000,
+        ))
+    return rows
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--services', type=int, default=1000000)
+    parser.add_argument('--vendors', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    rows = make_rows(args.services, args.vendors, rng)
+
+    started = time.perf_counter()
+    snapshot = CatalogSnapshot(rows, version=1)
+    build = time.perf_counter() - started
+
+    # Second build under tracemalloc, which slows it down too much to time
+    del snapshot
+    tracemalloc.start()
+    snapshot = CatalogSnapshot(rows, version=1)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+
+    print(f"services: {snapshot.size}, vendors: {len(snapshot.vendor_ids)}, build: {build:.2f} s")
+    print(f"snapshot: {snapshot.memory_bytes() / 2**20:.1f} MB (columns + bitmaps), "
+          f"build peak: {peak / 2**20:.1f} MB, retained: {current / 2**20:.1f} MB")
+
+    scenarios = [
+        ('no filter', lambda: {}),
+        ('city', lambda: {'city': [rng.choice(CITIES)]}),
+        ('city + water type', lambda: {'city': [rng.choice(CITIES)], 'water_type': [rng.choice(WATER_TYPES)]}),
+        ('city + type + price + size', lambda: {
+            'city': [rng.choice(CITIES)], 'water_type': [rng.choice(WATER_TYPES)],
+            'price_band': ['500-1000', '1000-2000'], 'capacity': [rng.choice(['small', 'medium', 'large'])],
+        }),
+    ]
+    print(f"\n{'query (page + facet counts)':<30} {'p50':>9} {'p95':>9} {'avg total':>11}")
+    for label, make_filters in scenarios:
+        samples, totals = [], 0
+        for _ in range(args.queries):
+            filters = make_filters()
+            started = time.perf_counter()
+            _, total, _ = snapshot.search(filters, rng.randrange(5) * 20, 20)
+            samples.append(time.perf_counter() - started)
+            totals += total
+        print(f"{label:<30} {percentile(samples, 50) * 1000:>6.2f} ms "
+              f"{percentile(samples, 95) * 1000:>6.2f} ms {totals / args.queries:>11,.0f}")
+
+    print(f"\n{'city document':<30} {'first':>9} {'repeat':>9} {'size':>11}")
+    for city in CITIES[:3]:
+        started = time.perf_counter()
+        document = snapshot.document(city)
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(1000):
+            snapshot.document(city)
+        repeat = (time.perf_counter() - started) / 1000
+        print(f"{city:<30} {first * 1000:>6.0f} ms {repeat * 1e6:>6.2f} us "
+              f"{len(document.body) / 2**20:>8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
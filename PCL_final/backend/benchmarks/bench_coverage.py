@@ -0,0 +1,86 @@
+"""
+AquaHub Coverage Polygon Benchmark
+Builds the coverage polygon index over synthetic service areas and times point lookups
+
+Star-shaped polygons of a few kilometres, with 8 to 64 vertices each, are
+scattered over India's bounding box. Lookups are timed one point at a
+time, as /api/coverage answers them, and a sample is checked against a
+brute-force even-odd test of every polygon.
+
+    python benchmarks/bench_coverage.py [--polygons 100000] [--queries 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coverage import CoverageIndex, CoveragePolygon, encode_vertices
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def star(rng, lat, lng):
+    count = int(rng.integers(8, 65))
+    angles = np.sort(rng.uniform(0, 2 * np.pi, count))
+    radii = rng.uniform(0.01, 0.05, count)
+    return np.c_[lat + radii * np.sin(angles), lng + radii * np.cos(angles)]
+
+
+def brute_force(edges, owner, lat, lng):
+    """Sorted positions of the polygons containing (lat, lng), testing every edge"""
+    y1, x1, y2, x2 = edges
+    straddles = (y1 > lat) != (y2 > lat)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing = straddles & (lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1))
+    return np.flatnonzero(np.bincount(owner[crossing], minlength=owner[-1] + 1) % 2).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--polygons', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(17)
+    centres = np.c_[rng.uniform(8, 35, args.polygons), rng.uniform(68, 97, args.polygons)]
+    shapes = [star(rng, lat, lng) for lat, lng in centres.tolist()]
+    rows = [CoveragePolygon(i, f'vendor-{i % 20000}', None, None, encode_vertices(v)) for i, v in enumerate(shapes)]
+    # Queries land near polygon centres so most of them hit something
+    points = centres[rng.integers(0, args.polygons, args.queries)] + rng.normal(0, 0.02, (args.queries, 2))
+
+    started = time.perf_counter()
+    index = CoverageIndex(rows, [])
+    vertices = sum(len(v) for v in shapes)
+    print(f"polygons: {args.polygons}, vertices: {vertices}, build: {time.perf_counter() - started:.2f} s")
+
+    samples, hits = [], 0
+    for lat, lng in points.tolist():
+        started = time.perf_counter()
+        hits += len(index.containing(lat, lng))
+        samples.append((time.perf_counter() - started) * 1e6)
+    print(f"lookup: p50 {percentile(samples, 50):.0f} us, p95 {percentile(samples, 95):.0f} us, "
+          f"p99 {percentile(samples, 99):.0f} us, {hits / args.queries:.2f} polygons per point")
+
+    # Compare against the stored (rounded) vertices the index tests
+    decoded = [index.vertices[index.vertex_start[i]:index.vertex_start[i + 1]] for i in range(len(rows))]
+    first = np.concatenate(decoded)
+    following = np.concatenate([np.roll(v, -1, axis=0) for v in decoded])
+    edges = (first[:, 0], first[:, 1], following[:, 0], following[:, 1])
+    owner = np.repeat(np.arange(len(decoded)), [len(v) for v in decoded])
+    mismatches = sum(
+        index.containing(lat, lng).tolist() != brute_force(edges, owner, lat, lng)
+        for lat, lng in points[:500].tolist()
+    )
+    print(f"brute-force check: {mismatches} mismatches in 500 points")
+
+
+if __name__ == '__main__':
+    main()
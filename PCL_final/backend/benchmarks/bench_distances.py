@@ -0,0 +1,100 @@
+"""
+AquaHub Distance Benchmark
+Times distance matrices against per-pair Python haversine, and cached vendor searches
+
+Customers and vendors are scattered around a few Indian metros. The
+matrix is timed per pair for both formulas next to a scalar Python
+haversine_km loop, and the equirectangular error is reported.
+Vendor searches are timed as a customer paging through results from one
+spot, with and without the distance cache.
+
+    python benchmarks/bench_distances.py [--vendors 5000] [--customers 200] [--vendor-index 50000]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_vendor_search import METROS, make_vendors, percentile
+from distances import EARTH_RADIUS_KM, PointSet, distance_cache, distance_matrix
+from vendor_search import VendorGeoIndex
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km, one pair at a time in plain Python"""
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2))
+         * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def scatter(rng, count, spread):
+    centres = np.array([(lat, lng) for _, lat, lng in METROS])[rng.integers(0, len(METROS), count)]
+    return centres + rng.normal(0, spread, (count, 2))
+
+
+def time_search(index, points, pages):
+    samples = []
+    for lat, lng in points:
+        for page in range(pages):
+            started = time.perf_counter()
+            index.search(lat, lng, offset=page * 20)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--vendors', type=int, default=5000)
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--vendor-index', type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    vendors = scatter(rng, args.vendors, 0.15)
+    customers = scatter(rng, args.customers, 0.2)
+    points = PointSet(vendors[:, 0], vendors[:, 1])
+    pairs = args.vendors * args.customers
+
+    started = time.perf_counter()
+    for lat, lng in customers[:20].tolist():
+        for v_lat, v_lng in vendors.tolist():
+            haversine_km(lat, lng, v_lat, v_lng)
+    loop = (time.perf_counter() - started) / (20 * args.vendors)
+    print(f"python haversine_km loop: {loop * 1e9:.0f} ns per pair")
+
+    exact = None
+    for method in ('haversine', 'equirectangular'):
+        started = time.perf_counter()
+        matrix = distance_matrix(customers[:, 0], customers[:, 1], points, method)
+        elapsed = (time.perf_counter() - started) / pairs
+        if exact is None:
+            exact = matrix
+            print(f"{method} matrix {matrix.shape}: {elapsed * 1e9:.1f} ns per pair")
+        else:
+            near = exact <= 100
+            error = np.abs(matrix - exact)[near].max()
+            print(f"{method} matrix {matrix.shape}: {elapsed * 1e9:.1f} ns per pair, "
+                  f"max error within 100 km {error * 1000:.1f} m")
+
+    search_vendors = make_vendors(args.vendor_index, random.Random(7))
+    spots = [(lat, lng) for lat, lng in scatter(rng, 500, 0.2).tolist()]
+    print(f"\nsearch, 5 pages per customer ({args.vendor_index} vendors)")
+    # An unversioned index bypasses the cache
+    for label, version in [('uncached', None), ('cached', 1)]:
+        distance_cache.clear()
+        index = VendorGeoIndex(search_vendors, version=version)
+        samples = time_search(index, spots, 5)
+        print(f"{label:<10} p50 {percentile(samples, 50) * 1000:.2f} ms, "
+              f"p95 {percentile(samples, 95) * 1000:.2f} ms, cache {distance_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+AquaHub Password Hashing Benchmark
+Reports registrations per second per core before and after cost calibration
+
+"Before" is the original bcrypt.gensalt() default cost, hashed on the
+request threads; "after" is hash_password at the calibrated cost on the
+per-worker process pool. Both are driven by the same number of
+concurrent threads, mimicking a gthread gunicorn worker. Bulk hashing
+(hash_passwords, as imports use it) is timed too. No database is needed.
+
+    python benchmarks/bench_hashing.py [--threads 8] [--seconds 5]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+
+import hashing
+
+
+def inline_default_hash(password):
+    """The pre-pool behaviour: default cost, hashed on the calling thread"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def run(hash_fn, threads, seconds):
+    """Hash from ``threads`` threads for ``seconds``; return hashes per second"""
+    done = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        while time.perf_counter() < deadline:
+            hash_fn('benchmark-password')
+            done[index] += 1
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(done) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--threads', type=int, default=8,
+                        help='concurrent request threads')
+    parser.add_argument('--seconds', type=float, default=5.0,
+                        help='duration of each run')
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+
+    default_rounds = int(bcrypt.gensalt().decode('ascii').split('$')[2])
+    rounds = hashing.get_rounds()
+    print(f"cores: {cores}, hashing workers: {hashing.HASHING_CONFIG['workers']}")
+    print(f"default cost: {default_rounds} ({hashing.time_hash(default_rounds):.0f} ms/hash)")
+    print(f"calibrated cost: {rounds} ({hashing.time_hash(rounds):.0f} ms/hash, "
+          f"target {hashing.HASHING_CONFIG['target_ms']:.0f} ms)")
+
+    before = run(inline_default_hash, args.threads, args.seconds)
+    after = run(hashing.hash_password, args.threads, args.seconds)
+
+    # Warm the pool so process start-up is not counted
+    hashing.hash_passwords(['warm-up'])
+    batch = ['benchmark-password'] * max(8, int(after * 2))
+    started = time.perf_counter()
+    hashing.hash_passwords(batch)
+    bulk = len(batch) / (time.perf_counter() - started)
+
+    print(f"{'':>8} {'reg/s':>10} {'reg/s/core':>12}")
+    print(f"{'before':>8} {before:>10.1f} {before / cores:>12.2f}")
+    print(f"{'after':>8} {after:>10.1f} {after / cores:>12.2f}")
+    print(f"{'bulk':>8} {bulk:>10.1f} {bulk / cores:>12.2f}")
+    hashing.shutdown_executor()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+AquaHub Requirement Matching Benchmark
+Times the in-memory half of the nightly matcher over synthetic candidate batches
+
+Candidate rows are synthesised in the MATCH_CANDIDATES_SQL row shape, one
+batch of MATCH_BATCH_SIZE requirements at a time, so the numbers cover
+the day/slot overlap and ranking without a database. The SQL half is an
+index join per batch; compare with EXPLAIN ANALYZE on real data.
+
+    python benchmarks/bench_matching.py [--requirements 1000000] [--candidates 12]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching import MATCHING_CONFIG, match_candidates
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+SLOTS = ['morning', 'afternoon', 'evening', '9am-12pm', '12pm-3pm', '3pm-6pm', '6pm-9pm',
+         '10:00-12:00', '14:00-16:00']
+CAPACITIES = [1000, 3000, 5000, 8000, 10000, 12000, 20000]
+
+
+def make_services(count, rng):
+    return [(
+        str(uuid.uuid4()), str(uuid.uuid4()), rng.choice(CAPACITIES), round(rng.uniform(0.05, 0.4), 2),
+        rng.sample(DAYS, rng.randint(0, 7)), rng.sample(SLOTS, rng.randint(0, 3)),
+    ) for _ in range(count)]
+
+
+def make_batch(size, candidates, services, rng):
+    rows = []
+    for _ in range(size):
+        requirement_id = str(uuid.uuid4())
+        quantity = rng.choice([2000, 5000, 8000, 10000, 25000])
+        days, slots = rng.sample(DAYS, rng.randint(0, 3)), rng.sample(SLOTS, rng.randint(0, 2))
+        for service in rng.sample(services, rng.randint(0, 2 * candidates)):
+            rows.append((requirement_id, quantity, days, slots, *service))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--requirements', type=int, default=1000000)
+    parser.add_argument('--candidates', type=int, default=12, help='mean candidate services per requirement')
+    parser.add_argument('--services', type=int, default=20000)
+    parser.add_argument('--sample-batches', type=int, default=20,
+                        help='batches actually timed; the rest is extrapolated')
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    services = make_services(args.services, rng)
+    batch_size = MATCHING_CONFIG['batch_size']
+    batches = -(-args.requirements // batch_size)
+    timed = min(batches, args.sample_batches)
+
+    elapsed, rows, matches = 0.0, 0, 0
+    for _ in range(timed):
+        batch = make_batch(batch_size, args.candidates, services, rng)
+        started = time.perf_counter()
+        matches += len(match_candidates(batch))
+        elapsed += time.perf_counter() - started
+        rows += len(batch)
+
+    per_batch = elapsed / timed
+    print(f"batch: {batch_size} requirements, {rows / timed:.0f} candidate rows, "
+          f"{per_batch * 1000:.1f} ms, {rows / elapsed / 1e6:.2f} M rows/s")
+    print(f"matches per requirement: {matches / (timed * batch_size):.2f}")
+    print(f"{args.requirements} requirements: {batches} batches, "
+          f"~{per_batch * batches / 60:.1f} min of matching CPU")
+
+
+if __name__ == '__main__':
+    main()
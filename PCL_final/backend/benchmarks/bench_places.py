@@ -0,0 +1,74 @@
+"""
+AquaHub Place Autocomplete Benchmark
+Builds a place index over a synthetic gazetteer and times prefix queries
+
+Place names are random syllable compounds, roughly the size and shape of
+the GeoNames India dump. The index is written to a temporary file and
+queried through the memory map, as the API does.
+
+    python benchmarks/bench_places.py [--places 600000] [--queries 5000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from places import Place, PlaceIndex, build_place_index
+
+SYLLABLES = ['ko', 'ra', 'man', 'ga', 'la', 'in', 'di', 'ra', 'na', 'gar', 'pur', 'ha', 'lli',
+             'pet', 'vi', 'jay', 'ya', 'wa', 'da', 'bad', 'ban', 'ja', 'ra', 'ma', 'nu', 'kal']
+SUFFIXES = ['', '', '', ' Layout', ' Nagar', ' Colony', ' Main Road', ' Cross', ' Temple', ' Lake']
+KINDS = ['locality', 'locality', 'area', 'landmark']
+
+
+def make_places(count, rng):
+    for _ in range(count):
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        yield Place(
+            name + rng.choice(SUFFIXES), rng.choice(KINDS), f'District {rng.randint(1, 700)}',
+            f'State {rng.randint(1, 36)}', str(rng.randint(110001, 855999)),
+            rng.uniform(8, 35), rng.uniform(68, 97),
+        ), int(rng.paretovariate(1.2) * 100)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--places', type=int, default=600000)
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'places.idx')
+        started = time.perf_counter()
+        places, keys = build_place_index(make_places(args.places, rng), path)
+        print(f"places: {places}, keys: {keys}, build: {time.perf_counter() - started:.1f} s, "
+              f"file: {os.path.getsize(path) / 2**20:.1f} MB")
+
+        started = time.perf_counter()
+        index = PlaceIndex(path)
+        print(f"open: {(time.perf_counter() - started) * 1000:.2f} ms")
+
+        for length in (1, 2, 3, 5, 8):
+            samples = []
+            for _ in range(args.queries // 5):
+                query = ''.join(rng.choice(SYLLABLES) for _ in range(4))[:length]
+                started = time.perf_counter()
+                index.complete(query, 8)
+                samples.append((time.perf_counter() - started) * 1000)
+            print(f"prefix length {length}: p50 {percentile(samples, 50):.3f} ms, "
+                  f"p95 {percentile(samples, 95):.3f} ms, p99 {percentile(samples, 99):.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+AquaHub Reverse Geocoder Benchmark
+Builds a reverse geocoding index over synthetic localities and pincodes and times lookups
+
+Localities and pincode centroids are scattered over India's bounding box,
+roughly as many as the GeoNames dump and the post office directory hold.
+Single lookups are timed as the API answers one GPS fix; batches as the
+batch endpoint answers them. A sample is checked against brute force.
+
+    python benchmarks/bench_reverse_geocoder.py [--places 600000] [--pincodes 19000] [--queries 20000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from places import Place
+from reverse_geocoder import ReverseGeocoder, build_reverse_index, unit_vectors
+from serviceability import Pincode
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--places', type=int, default=600000)
+    parser.add_argument('--pincodes', type=int, default=19000)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(13)
+    lat, lng = rng.uniform(8, 35, args.places), rng.uniform(68, 97, args.places)
+    places = [
+        (Place(f'Locality {i}', 'locality', f'District {i % 700}', f'State {i % 36}', None,
+               float(lat[i]), float(lng[i])), 0)
+        for i in range(args.places)
+    ]
+    pincodes = [
+        (Pincode(str(110001 + i), f'District {i % 700}', f'State {i % 36}',
+                 float(rng.uniform(8, 35)), float(rng.uniform(68, 97))), [])
+        for i in range(args.pincodes)
+    ]
+    points = np.c_[rng.uniform(8, 35, args.queries), rng.uniform(68, 97, args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'localities.idx')
+        started = time.perf_counter()
+        build_reverse_index(places, pincodes, path)
+        print(f"places: {args.places}, pincodes: {args.pincodes}, "
+              f"build: {time.perf_counter() - started:.1f} s, file: {os.path.getsize(path) / 2**20:.1f} MB")
+        index = ReverseGeocoder(path)
+
+        samples = []
+        for point in points[:2000].tolist():
+            started = time.perf_counter()
+            index.locate([point])
+            samples.append((time.perf_counter() - started) * 1e6)
+        print(f"single: p50 {percentile(samples, 50):.0f} us, p95 {percentile(samples, 95):.0f} us, "
+              f"p99 {percentile(samples, 99):.0f} us")
+
+        for size in (100, 1000, args.queries):
+            started = time.perf_counter()
+            for lo in range(0, args.queries, size):
+                index.locate(points[lo:lo + size], max_km=float('inf'))
+            elapsed = time.perf_counter() - started
+            print(f"batches of {size}: {elapsed / args.queries * 1e6:.1f} us per point")
+
+        queries = unit_vectors(points[:500, 0], points[:500, 1])
+        _, found = index.places.nearest(queries)
+        all_points = unit_vectors(lat, lng).astype(np.float32)
+        exact = np.array([np.sqrt(((all_points - q) ** 2).sum(axis=1)).min() for q in queries])
+        print(f"brute-force check: max difference {np.abs(found - exact).max():.2e}")
+
+
+if __name__ == '__main__':
+    main()
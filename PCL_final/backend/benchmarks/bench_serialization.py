@@ -0,0 +1,99 @@
+"""
+AquaHub Serialization Benchmark
+Compares dict rows + Flask's default JSON with slotted rows + orjson / MessagePack
+
+Rows are synthesised in memory in the shape the users listing returns, so
+the numbers isolate row materialisation and encoding from the database.
+
+    python benchmarks/bench_serialization.py [--rows 100000] [--repeat 3]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import serialization
+from users import UserRow
+
+COLUMNS = ('id', 'email', 'user_type', 'created_at', 'name')
+
+
+def make_tuples(count):
+    started = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    return [
+        (str(uuid.uuid4()), f'user{i}@bench.example', 'customer' if i % 4 else 'vendor',
+         started + datetime.timedelta(seconds=i), f'Bench User {i}')
+        for i in range(count)
+    ]
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    rows = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    tuples = make_tuples(args.rows)
+    app = Flask(__name__)
+    default_json = DefaultJSONProvider(app)
+    fast_json = serialization.FastJSONProvider(app)
+
+    as_dicts = lambda: [dict(zip(COLUMNS, row)) for row in tuples]
+    as_rows = lambda: [UserRow(*row) for row in tuples]
+    dict_rows, slot_rows = as_dicts(), as_rows()
+
+    print(f"rows: {args.rows}, orjson: {serialization.orjson is not None}, "
+          f"msgpack: {serialization.msgpack is not None}")
+    print(f"{'row type':<24} {'build':>10} {'peak memory':>14}")
+    for label, build in (('dict (RealDictCursor)', as_dicts), ('UserRow (__slots__)', as_rows)):
+        elapsed, _ = best_of(args.repeat, build)
+        print(f"{label:<24} {elapsed * 1000:>7.1f} ms {peak_memory(build) / 2**20:>11.1f} MB")
+
+    encoders = [
+        ('json, dict rows', lambda: default_json.dumps({'users': dict_rows}).encode('utf-8')),
+        ('fast json, UserRow', lambda: serialization.dumps({'users': slot_rows})),
+    ]
+    if serialization.msgpack is not None:
+        encoders.append(('msgpack, UserRow', lambda: serialization.packb({'users': slot_rows})))
+    with app.app_context():
+        encoders.append(('fast provider response', lambda: fast_json.response({'users': slot_rows}).data))
+
+    print(f"\n{'encoder':<24} {'encode':>10} {'rows/s':>12} {'size':>10}")
+    baseline = None
+    for label, encode in encoders:
+        elapsed, body = best_of(args.repeat, encode)
+        baseline = baseline or elapsed
+        print(f"{label:<24} {elapsed * 1000:>7.1f} ms {args.rows / elapsed:>12,.0f} "
+              f"{len(body) / 2**20:>7.2f} MB  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
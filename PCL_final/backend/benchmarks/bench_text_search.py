@@ -0,0 +1,114 @@
+"""
+AquaHub Text Search Benchmark
+Times as-you-type search queries against the trigram index under concurrent traffic
+
+Entries are synthesised in memory in the SEARCH_ENTRIES_SQL row shape. Each
+simulated user types a vendor, area or service name one keystroke at a time
+(with an occasional typo) and issues a query per keystroke, so the numbers
+cover the prefix-heavy traffic a search box produces.
+Simulated users are threads in one process, so beyond a core's worth of
+traffic the tail latency is mostly waiting for the GIL; add gunicorn
+workers rather than threads to serve more concurrent typists.
+
+    python benchmarks/bench_text_search.py [--vendors 50000] [--users 1,4,16]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+CITIES = ['Bangalore', 'Chennai', 'Hyderabad', 'Mumbai', 'Pune', 'Delhi']
+PREFIXES = ['Aqua', 'Blue', 'Crystal', 'Pure', 'Sri', 'Ganga', 'Jal', 'Neer', 'River', 'Hydro']
+SUFFIXES = ['Services', 'Tankers', 'Supply', 'Water Works', 'Logistics', 'Suppliers', 'Carriers']
+AREA_PARTS = ['Kora', 'Indira', 'Jaya', 'Malle', 'White', 'Bana', 'Raja', 'Hebba', 'Yela', 'Vijaya']
+AREA_ENDS = ['mangala', 'nagar', 'field', 'swaram', 'halli', 'pura', 'shankari', 'layout']
+SERVICES = ['Potable {} L tanker', 'Drinking water {} L', 'Construction water {} L', 'Industrial tanker {} L']
+
+
+def make_entries(vendors, rng):
+    entries, names = [], []
+    for i in range(vendors):
+        vendor_id = str(uuid.uuid4())
+        name = f'{rng.choice(PREFIXES)} {rng.choice(SUFFIXES)} {i}'
+        city = rng.choice(CITIES)
+        entries.append(('vendor', vendor_id, name, city))
+        names.append(name)
+        for template in rng.sample(SERVICES, 3):
+            entries.append(('service', vendor_id, template.format(rng.choice([3000, 5000, 10000])), city))
+    for i, (part, end) in enumerate((p, e) for p in AREA_PARTS for e in AREA_ENDS):
+        area = f'{part}{end}'
+        entries.append(('area', i, area, None))
+        names.append(area)
+    return entries, names
+
+
+def keystrokes(name, rng):
+    """Queries typed while entering ``name``, with a typo a third of the time"""
+    if rng.random() < 0.33 and len(name) > 5:
+        i = rng.randrange(2, len(name) - 1)
+        name = name[:i] + name[i + 1:]
+    return [name[:n] for n in range(2, len(name) + 1)]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(index, names, users, queries_per_user, seed):
+    samples = []
+    lock = threading.Lock()
+
+    def user(n):
+        rng = random.Random(seed + n)
+        local = []
+        while len(local) < queries_per_user:
+            for query in keystrokes(rng.choice(names), rng):
+                city = rng.choice(CITIES) if rng.random() < 0.25 else None
+                started = time.perf_counter()
+                index.search(query, 10, city)
+                local.append(time.perf_counter() - started)
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--vendors', type=int, default=50000)
+    parser.add_argument('--users', default='1,4,16')
+    parser.add_argument('--queries', type=int, default=500, help='queries per simulated user')
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    entries, names = make_entries(args.vendors, rng)
+    started = time.perf_counter()
+    index = SearchIndex(entries)
+    build = time.perf_counter() - started
+    print(f"entries: {len(index)}, trigrams: {len(index.postings)}, build: {build:.2f} s")
+
+    print(f"\n{'concurrent users':<18} {'p50':>9} {'p95':>9} {'p99':>9} {'queries/s':>11}")
+    for users in (int(u) for u in args.users.split(',')):
+        samples, elapsed = run(index, names, users, args.queries, seed=users)
+        print(f"{users:<18} {percentile(samples, 50) * 1000:>6.2f} ms "
+              f"{percentile(samples, 95) * 1000:>6.2f} ms {percentile(samples, 99) * 1000:>6.2f} ms "
+              f"{len(samples) / elapsed:>11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+AquaHub Vendor Search Benchmark
+Builds the vendor grid index over synthetic vendors and times point searches
+
+Vendors are scattered around a handful of Indian metros with 5-50 km
+delivery radii and one to three services each, which is denser than any
+real city and so a pessimistic case for the per-cell candidate lists.
+
+    python benchmarks/bench_vendor_search.py [--vendors 50000] [--queries 5000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vendor_search import VendorGeoIndex, VendorLocation
+
+METROS = [
+    ('Bangalore', 12.97, 77.59), ('Chennai', 13.08, 80.27), ('Hyderabad', 17.39, 78.49),
+    ('Mumbai', 19.08, 72.88), ('Pune', 18.52, 73.86), ('Delhi', 28.61, 77.21),
+]
+WATER_TYPES = ['potable', 'industrial', 'construction', 'ro purified']
+CAPACITIES = [1000, 1500, 3000, 5000, 8000, 10000, 12000, 20000]
+
+
+def make_vendors(count, rng):
+    vendors = []
+    for i in range(count):
+        city, lat, lng = rng.choice(METROS)
+        services = [(rng.choice(WATER_TYPES), rng.choice(CAPACITIES)) for _ in range(rng.randint(1, 3))]
+        vendors.append(VendorLocation(
+            f'vendor-{i}', f'Bench Tankers {i}', city,
+            lat + rng.gauss(0, 0.15), lng + rng.gauss(0, 0.15), rng.randint(5, 50),
+            [capacity for _, capacity in services],
+            [water_type for water_type, _ in services], [capacity for _, capacity in services],
+        ))
+    return vendors
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--vendors', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--cell-deg', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vendors = make_vendors(args.vendors, rng)
+
+    started = time.perf_counter()
+    index = VendorGeoIndex(vendors, args.cell_deg)
+    build = time.perf_counter() - started
+    entries = sum(len(ids) for ids in index.cells.values())
+    print(f"vendors: {len(index)}, cell: {index.cell_deg} deg, cells: {len(index.cells)}, "
+          f"entries: {entries}, build: {build * 1000:.0f} ms")
+
+    scenarios = [
+        ('nearest 20', {}),
+        ('water_type', {'water_type': 'potable'}),
+        ('water_type + capacity', {'water_type': 'industrial', 'min_capacity': 10000}),
+        ('page 5 of 20', {'offset': 80}),
+    ]
+    points = []
+    for _ in range(args.queries):
+        _, lat, lng = rng.choice(METROS)
+        points.append((lat + rng.gauss(0, 0.2), lng + rng.gauss(0, 0.2)))
+
+    print(f"{'query':<24} {'p50':>9} {'p95':>9} {'p99':>9} {'avg hits':>10}")
+    for label, kwargs in scenarios:
+        samples, totals = [], 0
+        for lat, lng in points:
+            started = time.perf_counter()
+            _, total = index.search(lat, lng, **kwargs)
+            samples.append(time.perf_counter() - started)
+            totals += total
+        print(f"{label:<24} {percentile(samples, 50) * 1000:>6.2f} ms "
+              f"{percentile(samples, 95) * 1000:>6.2f} ms {percentile(samples, 99) * 1000:>6.2f} ms "
+              f"{totals / len(points):>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
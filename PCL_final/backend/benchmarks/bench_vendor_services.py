@@ -0,0 +1,106 @@
+"""
+AquaHub Vendor Services Benchmark
+Compares per-row and batched vendor_services inserts by round trips and time
+
+Runs against the database configured in backend/.env. Every measurement
+happens inside a transaction that is rolled back, so no data is kept.
+
+    python benchmarks/bench_vendor_services.py [--counts 1,10,50,200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extensions import cursor as base_cursor
+
+from db import get_pool
+from registration import create_vendor
+from vendor_services import insert_vendor_services, service_row
+
+
+class CountingCursor(base_cursor):
+    """Cursor that counts statements sent to the server"""
+
+    statements = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.statements += 1
+        return super().execute(query, vars)
+
+
+def per_row_insert(cur, vendor_id, services):
+    """The pre-batching behaviour: one INSERT per service"""
+    for service in services:
+        cur.execute("""
+            INSERT INTO vendor_services
+            (vendor_id, service_name, water_type, tanker_capacity, price_per_liter,
+             minimum_order_quantity, available_days, available_time_slots, coverage_areas)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, service_row(vendor_id, service))
+
+
+def sample_services(count):
+    return [{
+        'serviceName': f'Tanker {i}',
+        'waterType': ('potable', 'industrial', 'construction')[i % 3],
+        'tankerCapacity': (5000, 10000, 12000)[i % 3],
+        'pricePerLiter': 1.5,
+        'minimumOrder': 1000,
+        'availableDays': ['monday', 'wednesday', 'friday'],
+        'availableTimeSlots': ['morning'],
+        'coverageAreas': ['Koramangala', 'HSR Layout'],
+    } for i in range(count)]
+
+
+def sample_vendor():
+    return {
+        'email': f'bench-{uuid.uuid4()}@example.com',
+        'businessName': 'Benchmark Tankers',
+        'contactPersonName': 'Bench',
+        'phone': '9999999999',
+        'businessAddress': '1 Bench Road',
+        'city': 'Bangalore',
+        'state': 'Karnataka',
+        'postalCode': '560001',
+    }
+
+
+def measure(conn, insert, services):
+    cur = conn.cursor(cursor_factory=CountingCursor)
+    try:
+        _, vendor_id = create_vendor(cur, sample_vendor(), 'not-a-real-hash')
+        CountingCursor.statements = 0
+        started = time.perf_counter()
+        insert(cur, vendor_id, services)
+        elapsed = time.perf_counter() - started
+        return CountingCursor.statements, elapsed
+    finally:
+        cur.close()
+        conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--counts', default='1,10,50,200',
+                        help='comma-separated service counts to measure')
+    args = parser.parse_args()
+    counts = [int(c) for c in args.counts.split(',')]
+
+    print(f"{'services':>9} {'per-row trips':>14} {'per-row ms':>11} "
+          f"{'batched trips':>14} {'batched ms':>11}")
+    with get_pool().connection() as conn:
+        for count in counts:
+            services = sample_services(count)
+            row_trips, row_time = measure(conn, per_row_insert, services)
+            batch_trips, batch_time = measure(conn, insert_vendor_services, services)
+            print(f"{count:>9} {row_trips:>14} {row_time * 1000:>11.2f} "
+                  f"{batch_trips:>14} {batch_time * 1000:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
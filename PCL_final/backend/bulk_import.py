@@ -0,0 +1,498 @@
+"""
+AquaHub Bulk Onboarding Import
+Loads customers, vendors and vendor services from CSV or NDJSON via COPY
+
+Records use the same field names as the registration API payloads. In CSV
+files, list fields (serviceAreas, availableDays, ...) are separated with
+';' and nested fields use dotted headers such as waterRequirements.quantity.
+Vendor NDJSON records may embed a 'services' list; standalone service rows
+name their vendor with a 'vendorEmail' field.
+
+    python bulk_import.py vendors associations.ndjson
+    python bulk_import.py customers customers.csv --batch-size 1000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+
+import psycopg2
+
+from hashing import hash_passwords
+from registration import (
+    CUSTOMER_REQUIRED_FIELDS, VENDOR_REQUIRED_FIELDS,
+    customer_signup_params, validate_delivery_radius, validate_location, vendor_signup_params
+)
+from vendor_services import service_row
+
+DEFAULT_BATCH_SIZE = 500
+
+IMPORT_KINDS = ('customers', 'vendors', 'services')
+
+# CSV columns holding ';'-separated lists, per import kind
+LIST_FIELDS = {
+    'customers': {'preferredDays', 'preferredTimeSlots'},
+    'vendors': {'serviceAreas', 'tankerCapacity'},
+    'services': {'availableDays', 'availableTimeSlots', 'coverageAreas'},
+}
+
+# Staging tables mirror the signup parameters, typed like their targets so
+# COPY does the parsing. Rows are cleared at every commit.
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS import_customers (
+        line_no INTEGER, email TEXT, password_hash TEXT, first_name TEXT,
+        last_name TEXT, phone TEXT, date_of_birth DATE, gender TEXT,
+        address_line1 TEXT, address_line2 TEXT, city TEXT, state TEXT,
+        postal_code TEXT, country TEXT, emergency_contact_name TEXT,
+        emergency_contact_phone TEXT, has_requirements BOOLEAN,
+        required_quantity INTEGER, frequency TEXT, preferred_delivery_days TEXT[],
+        preferred_time_slots TEXT[], water_type TEXT, storage_capacity INTEGER,
+        special_instructions TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS import_vendors (
+        line_no INTEGER, email TEXT, password_hash TEXT, business_name TEXT,
+        contact_person_name TEXT, phone TEXT, alternate_phone TEXT,
+        business_address_line1 TEXT, business_address_line2 TEXT, city TEXT,
+        state TEXT, postal_code TEXT, country TEXT, business_type TEXT,
+        years_in_business INTEGER, license_number TEXT, tax_id TEXT,
+        service_areas TEXT[], tanker_capacity INTEGER[], delivery_radius_km INTEGER,
+        latitude DOUBLE PRECISION, longitude DOUBLE PRECISION
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS import_services (
+        line_no INTEGER, vendor_email TEXT, service_name TEXT, water_type TEXT,
+        tanker_capacity INTEGER, price_per_liter NUMERIC, minimum_order_quantity INTEGER,
+        available_days TEXT[], available_time_slots TEXT[], coverage_areas TEXT[]
+    ) ON COMMIT DELETE ROWS;
+"""
+
+CUSTOMER_STAGING_COLUMNS = (
+    'email', 'password_hash', 'first_name', 'last_name', 'phone', 'date_of_birth',
+    'gender', 'address_line1', 'address_line2', 'city', 'state', 'postal_code',
+    'country', 'emergency_contact_name', 'emergency_contact_phone', 'has_requirements',
+    'required_quantity', 'frequency', 'preferred_delivery_days', 'preferred_time_slots',
+    'water_type', 'storage_capacity', 'special_instructions'
+)
+
+VENDOR_STAGING_COLUMNS = (
+    'email', 'password_hash', 'business_name', 'contact_person_name', 'phone',
+    'alternate_phone', 'business_address_line1', 'business_address_line2', 'city',
+    'state', 'postal_code', 'country', 'business_type', 'years_in_business',
+    'license_number', 'tax_id', 'service_areas', 'tanker_capacity', 'delivery_radius_km',
+    'latitude', 'longitude'
+)
+
+SERVICE_STAGING_COLUMNS = (
+    'vendor_email', 'service_name', 'water_type', 'tanker_capacity', 'price_per_liter',
+    'minimum_order_quantity', 'available_days', 'available_time_slots', 'coverage_areas'
+)
+
+# Each merge inserts every staged row whose email is free and returns the
+# line numbers that lost to an existing account.
+MERGE_CUSTOMERS_SQL = """
+    WITH new_users AS (
+        INSERT INTO users (email, password_hash, user_type)
+        SELECT email, password_hash, 'customer' FROM import_customers
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id, email
+    ), new_profiles AS (
+        INSERT INTO customer_profiles
+        (user_id, first_name, last_name, phone, date_of_birth, gender,
+         address_line1, address_line2, city, state, postal_code, country,
+         emergency_contact_name, emergency_contact_phone)
+        SELECT nu.id, s.first_name, s.last_name, s.phone, s.date_of_birth, s.gender,
+               s.address_line1, s.address_line2, s.city, s.state, s.postal_code, s.country,
+               s.emergency_contact_name, s.emergency_contact_phone
+        FROM new_users nu
+        JOIN import_customers s ON s.email = nu.email
+        RETURNING id, user_id
+    ), new_requirements AS (
+        INSERT INTO customer_water_requirements
+        (customer_id, required_quantity, frequency, preferred_delivery_days,
+         preferred_time_slots, water_type, storage_capacity, special_instructions)
+        SELECT np.id, s.required_quantity, s.frequency, s.preferred_delivery_days,
+               s.preferred_time_slots, s.water_type, s.storage_capacity, s.special_instructions
+        FROM new_profiles np
+        JOIN new_users nu ON nu.id = np.user_id
+        JOIN import_customers s ON s.email = nu.email
+        WHERE s.has_requirements
+        RETURNING id
+    )
+    SELECT s.line_no
+    FROM import_customers s
+    LEFT JOIN new_users nu ON nu.email = s.email
+    WHERE nu.id IS NULL
+"""
+
+MERGE_VENDORS_SQL = """
+    WITH new_users AS (
+        INSERT INTO users (email, password_hash, user_type)
+        SELECT email, password_hash, 'vendor' FROM import_vendors
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id, email
+    ), new_profiles AS (
+        INSERT INTO vendor_profiles
+        (user_id, business_name, contact_person_name, phone, alternate_phone,
+         business_address_line1, business_address_line2, city, state, postal_code, country,
+         business_type, years_in_business, license_number, tax_id,
+         service_areas, tanker_capacity, delivery_radius_km, latitude, longitude)
+        SELECT nu.id, s.business_name, s.contact_person_name, s.phone, s.alternate_phone,
+               s.business_address_line1, s.business_address_line2, s.city, s.state,
+               s.postal_code, s.country, s.business_type, s.years_in_business,
+               s.license_number, s.tax_id, s.service_areas, s.tanker_capacity,
+               s.delivery_radius_km, s.latitude, s.longitude
+        FROM new_users nu
+        JOIN import_vendors s ON s.email = nu.email
+        RETURNING id
+    )
+    SELECT s.line_no
+    FROM import_vendors s
+    LEFT JOIN new_users nu ON nu.email = s.email
+    WHERE nu.id IS NULL
+"""
+
+MERGE_SERVICES_SQL = """
+    WITH matched AS (
+        SELECT s.*, vp.id AS vendor_id
+        FROM import_services s
+        LEFT JOIN users u ON u.email = s.vendor_email AND u.user_type = 'vendor'
+        LEFT JOIN vendor_profiles vp ON vp.user_id = u.id
+    ), new_services AS (
+        INSERT INTO vendor_services
+        (vendor_id, service_name, water_type, tanker_capacity, price_per_liter,
+         minimum_order_quantity, available_days, available_time_slots, coverage_areas)
+        SELECT vendor_id, service_name, water_type, tanker_capacity, price_per_liter,
+               minimum_order_quantity, available_days, available_time_slots, coverage_areas
+        FROM matched
+        WHERE vendor_id IS NOT NULL
+        RETURNING id
+    )
+    SELECT line_no FROM matched WHERE vendor_id IS NULL
+"""
+
+
+class ImportReport:
+    """Running totals and per-row errors for one import"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.total = 0
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line_no, message):
+        self.errors.append({'line': line_no, 'error': message})
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'total': self.total,
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda e: e['line']),
+        }
+
+
+# --- Parsing ---------------------------------------------------------------
+
+def _from_csv_row(row, list_fields):
+    record = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        value = value.strip()
+        if not value:
+            continue
+        field = key.strip()
+        if field.split('.')[-1] in list_fields:
+            value = [item.strip() for item in value.split(';') if item.strip()]
+        target = record
+        parts = field.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return record
+
+
+def iter_records(lines, fmt, list_fields=()):
+    """Yield (line_no, record, parse_error) from CSV or NDJSON text lines"""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, _from_csv_row(row, list_fields), None
+        return
+
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, 'Expected a JSON object'
+            continue
+        yield line_no, record, None
+
+
+# --- Validation ------------------------------------------------------------
+
+def _check_number(record, field, cast=int):
+    value = record.get(field)
+    if value is None:
+        return None
+    values = value if isinstance(value, list) else [value]
+    try:
+        for item in values:
+            cast(item)
+    except (TypeError, ValueError):
+        return f'Invalid number for {field}: {value}'
+    return None
+
+
+def _check_text(record, field, numbers=True):
+    """Reject values a text column cannot take (objects, lists, booleans)"""
+    value = record.get(field)
+    if isinstance(value, str) or (numbers and isinstance(value, (int, float)) and not isinstance(value, bool)):
+        return None
+    return f'Invalid value for {field}: expected text'
+
+
+def _validate_service(service):
+    for field, cast in (('tankerCapacity', int), ('pricePerLiter', float), ('minimumOrder', int)):
+        error = _check_number(service, field, cast)
+        if error:
+            return error
+    return None
+
+
+def validate_record(kind, record):
+    """Return an error message for an invalid record, or None"""
+    if kind == 'services':
+        if not record.get('vendorEmail'):
+            return 'Missing required field: vendorEmail'
+        return _check_text(record, 'vendorEmail', numbers=False) or _validate_service(record)
+
+    required = CUSTOMER_REQUIRED_FIELDS if kind == 'customers' else VENDOR_REQUIRED_FIELDS
+    for field in required:
+        if not record.get(field):
+            return f'Missing required field: {field}'
+        # Emails are matched and passwords hashed as strings
+        error = _check_text(record, field, numbers=field not in ('email', 'password'))
+        if error:
+            return error
+
+    if kind == 'customers':
+        reqs = record.get('waterRequirements')
+        if reqs is not None:
+            if not isinstance(reqs, dict):
+                return 'waterRequirements must be an object'
+            for field in ('quantity', 'storageCapacity'):
+                error = _check_number(reqs, field)
+                if error:
+                    return error
+        return None
+
+    for field in ('yearsInBusiness', 'deliveryRadius', 'tankerCapacity'):
+        error = _check_number(record, field)
+        if error:
+            return error
+    error = validate_location(record) or validate_delivery_radius(record)
+    if error:
+        return error
+    services = record.get('services') or []
+    if not isinstance(services, list):
+        return 'services must be a list'
+    for service in services:
+        error = _validate_service(service) if isinstance(service, dict) else 'Invalid service entry'
+        if error:
+            return error
+    return None
+
+
+# --- Loading ---------------------------------------------------------------
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        items = ('"%s"' % str(item).replace('\\', '\\\\').replace('"', '\\"') for item in value)
+        return '{%s}' % ','.join(items)
+    return str(value)
+
+
+def _copy_rows(cur, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(value) for value in row])
+    buffer.seek(0)
+    cur.copy_expert(
+        "COPY %s (line_no, %s) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        % (table, ', '.join(columns)),
+        buffer
+    )
+
+
+def _staging_rows(kind, batch):
+    """Turn validated (line_no, record, password_hash) items into staging rows"""
+    if kind == 'customers':
+        for line_no, record, password_hash in batch:
+            params = customer_signup_params(record, password_hash)
+            yield [line_no] + [params[c] for c in CUSTOMER_STAGING_COLUMNS]
+    elif kind == 'vendors':
+        for line_no, record, password_hash in batch:
+            params = vendor_signup_params(record, password_hash)
+            yield [line_no] + [params[c] for c in VENDOR_STAGING_COLUMNS]
+    else:
+        for line_no, record, _ in batch:
+            yield [line_no] + list(service_row(record['vendorEmail'], record))
+
+
+def _merge(cur, kind, batch):
+    """Stage and merge one batch; return {line_no: error} for rejected rows"""
+    cur.execute('TRUNCATE import_customers, import_vendors, import_services')
+    rejected = {}
+
+    if kind == 'customers':
+        _copy_rows(cur, 'import_customers', CUSTOMER_STAGING_COLUMNS, _staging_rows(kind, batch))
+        cur.execute(MERGE_CUSTOMERS_SQL)
+        for (line_no,) in cur.fetchall():
+            rejected[line_no] = 'Email already registered'
+        return rejected
+
+    if kind == 'vendors':
+        _copy_rows(cur, 'import_vendors', VENDOR_STAGING_COLUMNS, _staging_rows(kind, batch))
+        cur.execute(MERGE_VENDORS_SQL)
+        for (line_no,) in cur.fetchall():
+            rejected[line_no] = 'Email already registered'
+
+        # Embedded services only follow vendors that were actually created
+        services = [
+            [line_no] + list(service_row(record['email'], service))
+            for line_no, record, _ in batch if line_no not in rejected
+            for service in record.get('services') or []
+        ]
+        if services:
+            _copy_rows(cur, 'import_services', SERVICE_STAGING_COLUMNS, services)
+            cur.execute(MERGE_SERVICES_SQL)
+        return rejected
+
+    _copy_rows(cur, 'import_services', SERVICE_STAGING_COLUMNS, _staging_rows(kind, batch))
+    cur.execute(MERGE_SERVICES_SQL)
+    for (line_no,) in cur.fetchall():
+        rejected[line_no] = 'Unknown vendor email'
+    return rejected
+
+
+def _db_error_message(e):
+    return (e.pgerror or str(e)).strip().split('\n')[0]
+
+
+def load_batch_copy(conn, kind, batch, report):
+    """COPY one batch through the staging tables into Postgres
+
+    ``batch`` holds (line_no, record, password_hash) items. Failing rows are
+    isolated and reported instead of aborting the import.
+    """
+    with conn.cursor() as cur:
+        cur.execute(STAGING_DDL)
+        try:
+            cur.execute('SAVEPOINT import_batch')
+            rejected = _merge(cur, kind, batch)
+            cur.execute('RELEASE SAVEPOINT import_batch')
+        except psycopg2.Error:
+            # Something in the batch violates a constraint: retry row by
+            # row so only the offending rows are reported.
+            cur.execute('ROLLBACK TO SAVEPOINT import_batch')
+            rejected = {}
+            for item in batch:
+                try:
+                    cur.execute('SAVEPOINT import_row')
+                    rejected.update(_merge(cur, kind, [item]))
+                    cur.execute('RELEASE SAVEPOINT import_row')
+                except psycopg2.Error as e:
+                    cur.execute('ROLLBACK TO SAVEPOINT import_row')
+                    rejected[item[0]] = _db_error_message(e)
+    conn.commit()
+
+    for line_no, message in rejected.items():
+        report.add_error(line_no, message)
+    report.imported += len(batch) - len(rejected)
+
+
+def _hash_batch(kind, batch):
+    if kind == 'services':
+        hashes = [None] * len(batch)
+    else:
+        hashes = hash_passwords([record['password'] for _, record in batch])
+    return [(line_no, record, h) for (line_no, record), h in zip(batch, hashes)]
+
+
+def import_records(load_batch, kind, lines, fmt='ndjson', batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and load a CSV/NDJSON stream, committing batch by batch
+
+    ``load_batch(kind, batch, report)`` writes one batch of validated
+    (line_no, record, password_hash) items to the storage backend.
+    Returns an ImportReport. Invalid, duplicate and conflicting rows are
+    reported with their line number; the rest of the file still loads.
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f'Unknown import kind: {kind}')
+
+    report = ImportReport(kind)
+    seen_emails = set()
+    batch = []
+
+    for line_no, record, error in iter_records(lines, fmt, LIST_FIELDS[kind]):
+        report.total += 1
+        if error is None:
+            error = validate_record(kind, record)
+        if error is None and kind != 'services':
+            if record['email'] in seen_emails:
+                error = 'Duplicate email in import file'
+            seen_emails.add(record['email'])
+        if error:
+            report.add_error(line_no, error)
+            continue
+
+        batch.append((line_no, record))
+        if len(batch) >= batch_size:
+            load_batch(kind, _hash_batch(kind, batch), report)
+            batch = []
+
+    if batch:
+        load_batch(kind, _hash_batch(kind, batch), report)
+    return report
+
+
+def main():
+    from storage import get_storage
+
+    parser = argparse.ArgumentParser(description='Bulk import AquaHub customers, vendors or services')
+    parser.add_argument('kind', choices=IMPORT_KINDS)
+    parser.add_argument('path', help='CSV or NDJSON file')
+    parser.add_argument('--format', choices=('csv', 'ndjson'),
+                        help='input format (default: from the file extension)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ('csv' if os.path.splitext(args.path)[1].lower() == '.csv' else 'ndjson')
+    with open(args.path, newline='', encoding='utf-8') as f:
+        report = get_storage().import_records(args.kind, f, fmt, args.batch_size).as_dict()
+
+    print(f"📥 {report['kind']}: {report['imported']} imported, "
+          f"{report['failed']} failed, {report['total']} total")
+    for error in report['errors']:
+        print(f"  line {error['line']}: {error['error']}")
+
+
+if __name__ == '__main__':
+    main()
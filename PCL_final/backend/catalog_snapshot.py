@@ -0,0 +1,301 @@
+"""
+AquaHub Catalog Snapshot
+Columnar in-memory snapshot of active vendor services with bitmap facets
+
+Each worker holds one immutable snapshot of every active service joined to
+its vendor. Columns are numpy arrays (strings are dictionary-encoded), rows
+are sorted cheapest tanker first, and every facet value owns a bitmap (a
+Python int, bit i = row i). A filtered listing is the AND of the selected
+facets' bitmaps; facet counts are popcounts of each value's bitmap against
+the other facets' filters, so dropdown changes never touch the database.
+
+Per-city catalog documents are serialized at most once per snapshot and
+carry a content-hash ETag, so unchanged cities keep their ETag across
+catalog versions.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+
+from areas import area_key
+from serialization import dumps
+from snapshots import SnapshotHolder
+from vendor_search import normalize_water_type
+
+# Load environment variables
+load_dotenv()
+
+CATALOG_CONFIG = {
+    'max_age': int(os.getenv('CATALOG_MAX_AGE') or 60),
+}
+
+DEFAULT_CATALOG_LIMIT = 20
+MAX_CATALOG_LIMIT = 100
+
+FACETS = ('water_type', 'price_band', 'capacity', 'city')
+
+# Per-tanker price bands, matching the buyer dashboard's price filter
+PRICE_BANDS = (
+    ('0-500', 0, 500), ('500-1000', 500, 1000), ('1000-2000', 1000, 2000), ('2000+', 2000, None),
+)
+
+# Tanker size bands, matching the dashboard's small/medium/large cards
+CAPACITY_BANDS = (('small', 0, 3000), ('medium', 3000, 8000), ('large', 8000, None))
+
+CATALOG_SERVICES_SQL = """
+    SELECT vs.id, vp.id, vp.business_name, vp.city, vs.service_name, vs.water_type,
+           vs.tanker_capacity, vs.price_per_liter, vs.minimum_order_quantity
+    FROM vendor_services vs
+    JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+    JOIN users u ON u.id = vp.user_id AND u.is_active
+    WHERE vs.is_active
+"""
+
+
+@dataclass(slots=True)
+class CatalogItem:
+    """One service in a catalog listing"""
+
+    service_id: str
+    vendor_id: str
+    business_name: str
+    city: str
+    service_name: str
+    water_type: str
+    tanker_capacity: int
+    price_per_liter: float
+    tanker_price: float
+    minimum_order_quantity: int
+
+
+@dataclass(slots=True)
+class CatalogDocument:
+    """A serialized catalog document and its strong ETag"""
+
+    body: bytes
+    etag: str
+
+
+def iter_catalog_services(conn):
+    """Yield every active service as a CATALOG_SERVICES_SQL tuple"""
+    with conn.cursor(name='catalog_services') as cur:
+        cur.itersize = 10000
+        cur.execute(CATALOG_SERVICES_SQL)
+        yield from cur
+
+
+def _encode(values, key):
+    """Dictionary-encode ``values``: (codes, keys, labels) with labels as first seen
+
+    ``key`` runs once per distinct raw value, not once per row.
+    """
+    index, keys, labels, codes = {}, [], [], {}
+    for value in dict.fromkeys(values):
+        k = key(value)
+        code = index.get(k)
+        if code is None:
+            code = index[k] = len(keys)
+            keys.append(k)
+            labels.append(value)
+        codes[value] = code
+    return np.fromiter(map(codes.__getitem__, values), dtype=np.int32, count=len(values)), keys, labels
+
+
+def _bitmap(mask):
+    """Pack a boolean row mask into a Python int bitmap"""
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+
+def _band_mask(values, low, high):
+    mask = values >= low
+    if high is not None:
+        mask &= values < high
+    return mask
+
+
+class CatalogSnapshot:
+    """Immutable columnar view of the active catalog"""
+
+    def __init__(self, rows, version=None):
+        rows = list(rows)
+        self.version = version
+        self.size = count = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 9
+        (service_ids, vendor_ids, business_names, cities, service_names,
+         water_types, capacities, prices, minimum_orders) = columns
+
+        capacity = np.array(capacities, dtype=np.int64)
+        price = np.array([np.nan if p is None else p for p in prices], dtype=np.float64)
+        tanker_price = price * capacity
+        service_ids = np.frombuffer(
+            bytes.fromhex(''.join(map(str, service_ids)).replace('-', '')), dtype=np.uint8
+        ).reshape(count, 16)
+        # Ties on price and capacity are broken by service id, so every worker
+        # orders (and serializes) the same data identically.
+        id_keys = service_ids.view('>u8').reshape(count, 2)
+        order = np.lexsort((id_keys[:, 1], id_keys[:, 0], capacity, tanker_price))
+
+        self.capacity = capacity[order]
+        self.price_per_liter = price[order]
+        self.tanker_price = tanker_price[order]
+        self.minimum_order = np.array(
+            [-1 if m is None else m for m in minimum_orders], dtype=np.int64
+        )[order]
+        self.service_ids = service_ids[order]
+
+        vendor_codes, self.vendor_ids, _ = _encode([str(v) for v in vendor_ids], str)
+        self.vendor_code = vendor_codes[order]
+        self.vendor_names = [None] * len(self.vendor_ids)
+        for code, name in zip(vendor_codes, business_names):
+            self.vendor_names[code] = name
+
+        name_codes, _, self.service_names = _encode(service_names, str)
+        self.service_name_code = name_codes[order]
+
+        city_codes, city_keys, self.cities = _encode(cities, area_key)
+        self.city_code = city_codes[order]
+        water_codes, water_keys, self.water_types = _encode(water_types, normalize_water_type)
+        self.water_code = water_codes[order]
+
+        self.facets = {facet: {} for facet in FACETS}
+        self.labels = {facet: {} for facet in FACETS}
+        for facet, codes, keys, labels in (
+                ('water_type', self.water_code, water_keys, self.water_types),
+                ('city', self.city_code, city_keys, self.cities)):
+            for code, (key, label) in enumerate(zip(keys, labels)):
+                self.facets[facet][key] = _bitmap(codes == code)
+                self.labels[facet][key] = label
+        for facet, values, bands in (
+                ('price_band', self.tanker_price, PRICE_BANDS),
+                ('capacity', self.capacity, CAPACITY_BANDS)):
+            for key, low, high in bands:
+                self.facets[facet][key] = _bitmap(_band_mask(values, low, high))
+                self.labels[facet][key] = key
+
+        self.all_rows = (1 << count) - 1
+        self._documents = {}
+        self._documents_lock = threading.Lock()
+
+    @staticmethod
+    def normalize(facet, value):
+        """The facet key a filter value refers to"""
+        if facet == 'city':
+            return area_key(value)
+        if facet == 'water_type':
+            return normalize_water_type(value)
+        return value.strip()
+
+    def _facet_filter(self, facet, values):
+        """OR of the bitmaps of the selected values of one facet"""
+        bitmaps = self.facets[facet]
+        selected = 0
+        for value in values:
+            selected |= bitmaps.get(self.normalize(facet, value), 0)
+        return selected
+
+    def match(self, filters):
+        """Bitmap of rows matching every facet filter in ``filters``"""
+        matched = self.all_rows
+        for facet, values in filters.items():
+            if values:
+                matched &= self._facet_filter(facet, values)
+        return matched
+
+    def facet_counts(self, filters):
+        """Per-value counts, each facet counted under the other facets' filters"""
+        selected = {facet: self._facet_filter(facet, values)
+                    for facet, values in filters.items() if values}
+        counts = {}
+        for facet in FACETS:
+            others = self.all_rows
+            for other, bitmap in selected.items():
+                if other != facet:
+                    others &= bitmap
+            counts[facet] = sorted((
+                {'value': key, 'label': self.labels[facet][key], 'count': (bitmap & others).bit_count()}
+                for key, bitmap in self.facets[facet].items()
+            ), key=lambda entry: (-entry['count'], entry['label']))
+        return counts
+
+    def rows(self, bitmap, offset=0, limit=DEFAULT_CATALOG_LIMIT):
+        """Row numbers of one page of the rows set in ``bitmap``"""
+        if not bitmap:
+            return np.empty(0, dtype=np.int64)
+        packed = np.frombuffer(bitmap.to_bytes((self.size + 7) // 8, 'little'), dtype=np.uint8)
+        mask = np.unpackbits(packed, bitorder='little', count=self.size)
+        return np.flatnonzero(mask)[offset:offset + limit]
+
+    def item(self, i):
+        price = self.price_per_liter[i]
+        minimum_order = int(self.minimum_order[i])
+        vendor = self.vendor_code[i]
+        return CatalogItem(
+            str(uuid.UUID(bytes=self.service_ids[i].tobytes())),
+            self.vendor_ids[vendor], self.vendor_names[vendor],
+            self.cities[self.city_code[i]], self.service_names[self.service_name_code[i]],
+            self.water_types[self.water_code[i]], int(self.capacity[i]),
+            None if np.isnan(price) else float(price),
+            None if np.isnan(price) else round(float(self.tanker_price[i]), 2),
+            None if minimum_order < 0 else minimum_order,
+        )
+
+    def search(self, filters, offset=0, limit=DEFAULT_CATALOG_LIMIT):
+        """Return (items, total, facet_counts) for one page of a filtered listing"""
+        matched = self.match(filters)
+        items = [self.item(i) for i in self.rows(matched, offset, limit)]
+        return items, matched.bit_count(), self.facet_counts(filters)
+
+    def document(self, city=None):
+        """The catalog document for ``city``, or the city index without one
+
+        Returns None for an unknown city. Documents are built on first use
+        and reused for the life of this snapshot.
+        """
+        key = area_key(city) if city else ''
+        document = self._documents.get(key)
+        if document is not None:
+            return document
+        if key and key not in self.facets['city']:
+            return None
+
+        with self._documents_lock:
+            document = self._documents.get(key)
+            if document is None:
+                if key:
+                    bitmap = self.facets['city'][key]
+                    services = [self.item(i) for i in self.rows(bitmap, 0, self.size)]
+                    payload = {'city': self.labels['city'][key], 'count': len(services),
+                               'services': services}
+                else:
+                    payload = {'cities': self.facet_counts({})['city']}
+                body = dumps(payload)
+                etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+                document = self._documents[key] = CatalogDocument(body, etag)
+        return document
+
+    def memory_bytes(self):
+        """Approximate size of the columns and bitmaps"""
+        arrays = (self.capacity, self.price_per_liter, self.tanker_price, self.minimum_order,
+                  self.service_ids, self.vendor_code, self.service_name_code,
+                  self.city_code, self.water_code)
+        total = sum(a.nbytes for a in arrays)
+        total += sum(sys.getsizeof(b) for bitmaps in self.facets.values() for b in bitmaps.values())
+        total += sum(sys.getsizeof(s) for s in self.vendor_ids + self.vendor_names + self.service_names)
+        return total
+
+
+catalog = SnapshotHolder('catalog', 'catalog', lambda storage, version: CatalogSnapshot(
+    storage.iter_catalog_services(), version
+))
+
+
+def get_catalog(storage):
+    """Return this worker's catalog snapshot, rebuilt when the catalog changed"""
+    return catalog.get(storage)
@@ -0,0 +1,309 @@
+"""
+AquaHub Coverage Polygons
+Vendor service areas drawn as polygons, and which services cover a point
+
+A vendor can draw the territory it actually serves instead of relying on
+its delivery circle or area names. A polygon belongs to one service, or
+to every service of the vendor when it has no service. Vertices are
+stored packed: little-endian int32 (lat, lng) pairs in microdegrees,
+8 bytes a vertex and about 0.1 m of precision.
+
+Point lookups run against a per-worker snapshot (see snapshots.py): the
+polygons' bounding boxes are packed into an R-tree with Sort-Tile-
+Recursive (STR) bulk loading, so a lookup visits the few nodes whose
+boxes contain the point, then runs an exact even-odd ray test against
+just the candidate polygons' edges.
+"""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from snapshots import SnapshotHolder
+from vendor_search import normalize_water_type
+
+MAX_POLYGON_VERTICES = 5000
+MAX_POLYGON_NAME = 255
+NODE_CAPACITY = 16
+
+COVERAGE_POLYGONS_SQL = """
+    SELECT cp.id, cp.vendor_id, cp.service_id, cp.name, cp.vertices
+    FROM coverage_polygons cp
+    JOIN vendor_profiles vp ON vp.id = cp.vendor_id
+    JOIN users u ON u.id = vp.user_id AND u.is_active
+"""
+
+INSERT_POLYGON_SQL = """
+    INSERT INTO coverage_polygons (vendor_id, service_id, name, vertices)
+    SELECT vp.id, %(service_id)s, %(name)s, %(vertices)s
+    FROM vendor_profiles vp
+    WHERE vp.id = %(vendor_id)s
+      AND (%(service_id)s IS NULL OR EXISTS (
+          SELECT 1 FROM vendor_services vs WHERE vs.id = %(service_id)s AND vs.vendor_id = vp.id
+      ))
+    RETURNING id
+"""
+
+VENDOR_POLYGONS_SQL = """
+    SELECT id, vendor_id, service_id, name, vertices
+    FROM coverage_polygons
+    WHERE vendor_id = %(vendor_id)s
+    ORDER BY id
+"""
+
+DELETE_POLYGON_SQL = """
+    DELETE FROM coverage_polygons WHERE id = %(polygon_id)s AND vendor_id = %(vendor_id)s
+"""
+
+
+@dataclass(slots=True)
+class CoveragePolygon:
+    """One stored polygon; ``vertices`` is the packed vertex blob"""
+
+    id: int
+    vendor_id: str
+    service_id: str
+    name: str
+    vertices: bytes
+
+
+@dataclass(slots=True)
+class PolygonRow:
+    """A vendor's polygon as the API lists it"""
+
+    id: int
+    service_id: str
+    name: str
+    polygon: list
+
+
+@dataclass(slots=True)
+class CoverageHit:
+    """A service whose coverage polygon contains the looked-up point"""
+
+    service_id: str
+    vendor_id: str
+    business_name: str
+    city: str
+    service_name: str
+    water_type: str
+    tanker_capacity: int
+    price_per_liter: float
+    polygon_id: int
+    polygon_name: str
+
+
+def parse_polygon(value):
+    """(lat, lng) vertices of a polygon given as [[lat, lng], ...]
+
+    A closing vertex repeating the first is dropped. Raises ValueError
+    with a message for the client when the polygon is unusable.
+    """
+    if not isinstance(value, list) or not 3 <= len(value) <= MAX_POLYGON_VERTICES + 1:
+        raise ValueError(f'polygon must be a list of 3 to {MAX_POLYGON_VERTICES} [lat, lng] vertices')
+    try:
+        vertices = [(float(lat), float(lng)) for lat, lng in value]
+    except (TypeError, ValueError):
+        raise ValueError('polygon vertices must be [lat, lng] pairs') from None
+    if not all(-90 <= lat <= 90 and -180 <= lng <= 180 for lat, lng in vertices):
+        raise ValueError('polygon vertices must be valid coordinates')
+    if vertices[0] == vertices[-1]:
+        vertices.pop()
+    if len(set(vertices)) < 3 or len(vertices) > MAX_POLYGON_VERTICES:
+        raise ValueError(f'polygon must have 3 to {MAX_POLYGON_VERTICES} distinct vertices')
+    return vertices
+
+
+def encode_vertices(vertices):
+    """Pack (lat, lng) vertices as int32 microdegrees"""
+    return np.round(np.asarray(vertices, dtype=np.float64) * 1e6).astype('<i4').tobytes()
+
+
+def decode_vertices(blob):
+    """(n, 2) float array of the (lat, lng) vertices in a packed blob"""
+    return np.frombuffer(bytes(blob), dtype='<i4').reshape(-1, 2) / 1e6
+
+
+def polygon_row(polygon):
+    return PolygonRow(
+        polygon.id, polygon.service_id, polygon.name,
+        [[round(lat, 6), round(lng, 6)] for lat, lng in decode_vertices(polygon.vertices).tolist()],
+    )
+
+
+def str_order(boxes, capacity=NODE_CAPACITY):
+    """Sort-Tile-Recursive order of (n, 4) (min_lat, min_lng, max_lat, max_lng) boxes
+
+    Boxes are cut into vertical slices by centre longitude, each slice
+    sorted by centre latitude, so consecutive runs of ``capacity`` boxes
+    are compact tiles.
+    """
+    count = len(boxes)
+    slices = math.ceil(math.sqrt(math.ceil(count / capacity))) or 1
+    per_slice = slices * capacity
+    centre_lng = boxes[:, 1] + boxes[:, 3]
+    centre_lat = boxes[:, 0] + boxes[:, 2]
+    slice_of = np.empty(count, dtype=np.int64)
+    slice_of[np.argsort(centre_lng, kind='stable')] = np.arange(count) // per_slice
+    return np.lexsort((centre_lat, slice_of))
+
+
+def _containing(boxes, lat, lng):
+    return (boxes[:, 0] <= lat) & (boxes[:, 2] >= lat) & (boxes[:, 1] <= lng) & (boxes[:, 3] >= lng)
+
+
+def _expand(lo, hi):
+    """Concatenated ranges [lo[i], hi[i])"""
+    counts = hi - lo
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(lo, counts) + np.arange(int(counts.sum())) - offsets
+
+
+class STRTree:
+    """Static R-tree over bounding boxes, packed bottom-up in STR order"""
+
+    def __init__(self, boxes, capacity=NODE_CAPACITY):
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.entries = str_order(boxes, capacity)
+        self.item_boxes = boxes[self.entries]
+
+        # levels[k] = (node boxes, first child, end of children) with the
+        # children in the level below (the items below the last level)
+        self.levels = []
+        level = self.item_boxes
+        while len(level) > capacity:
+            starts = np.arange(0, len(level), capacity)
+            ends = np.minimum(starts + capacity, len(level))
+            parents = np.column_stack([
+                np.minimum.reduceat(level[:, 0], starts), np.minimum.reduceat(level[:, 1], starts),
+                np.maximum.reduceat(level[:, 2], starts), np.maximum.reduceat(level[:, 3], starts),
+            ])
+            order = str_order(parents, capacity)
+            level = parents[order]
+            self.levels.append((level, starts[order], ends[order]))
+        self.levels.reverse()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def query(self, lat, lng):
+        """Indexes of the boxes containing (lat, lng)"""
+        nodes = np.arange(len(self.levels[0][0]) if self.levels else len(self.item_boxes))
+        for boxes, first_child, end_child in self.levels:
+            nodes = nodes[_containing(boxes[nodes], lat, lng)]
+            nodes = _expand(first_child[nodes], end_child[nodes])
+        return self.entries[nodes[_containing(self.item_boxes[nodes], lat, lng)]]
+
+
+class CoverageIndex:
+    """Immutable point-in-polygon index over every active vendor's polygons"""
+
+    def __init__(self, polygons, services):
+        self.polygons = list(polygons)
+        self.services = {}
+        self.vendor_services = {}
+        for row in services:
+            self.services[row[0]] = row
+            self.vendor_services.setdefault(row[1], []).append(row)
+
+        vertices = [decode_vertices(p.vertices) for p in self.polygons]
+        counts = np.array([len(v) for v in vertices], dtype=np.int64)
+        self.vertex_start = np.concatenate([[0], np.cumsum(counts)])
+        self.vertices = np.concatenate(vertices) if vertices else np.empty((0, 2))
+        # Each vertex's successor around its ring
+        self.next_vertex = np.arange(1, len(self.vertices) + 1)
+        self.next_vertex[self.vertex_start[1:] - 1] = self.vertex_start[:-1]
+
+        boxes = np.array([
+            (v[:, 0].min(), v[:, 1].min(), v[:, 0].max(), v[:, 1].max()) for v in vertices
+        ]).reshape(-1, 4)
+        self.tree = STRTree(boxes)
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def containing(self, lat, lng):
+        """Positions of the polygons containing (lat, lng)"""
+        candidates = self.tree.query(lat, lng)
+        if not len(candidates):
+            return candidates
+        edges = _expand(self.vertex_start[candidates], self.vertex_start[candidates + 1])
+        y1, x1 = self.vertices[edges, 0], self.vertices[edges, 1]
+        following = self.next_vertex[edges]
+        y2, x2 = self.vertices[following, 0], self.vertices[following, 1]
+
+        # Even-odd rule: count edges crossing the ray running east of the point
+        straddles = (y1 > lat) != (y2 > lat)
+        crossing = np.zeros(len(edges), dtype=bool)
+        crossing[straddles] = lng < x1[straddles] + (lat - y1[straddles]) * (
+            (x2[straddles] - x1[straddles]) / (y2[straddles] - y1[straddles])
+        )
+        counts = self.vertex_start[candidates + 1] - self.vertex_start[candidates]
+        crossings = np.add.reduceat(crossing, np.cumsum(counts) - counts, dtype=np.int64)
+        return np.sort(candidates[crossings % 2 == 1])
+
+    def covering(self, lat, lng, water_type=None):
+        """Active services covering (lat, lng), cheapest first"""
+        water_type = normalize_water_type(water_type)
+        hits = {}
+        for i in self.containing(lat, lng).tolist():
+            polygon = self.polygons[i]
+            if polygon.service_id is None:
+                rows = self.vendor_services.get(polygon.vendor_id, [])
+            else:
+                rows = [self.services[polygon.service_id]] if polygon.service_id in self.services else []
+            for row in rows:
+                if row[0] in hits or (water_type and normalize_water_type(row[5]) != water_type):
+                    continue
+                hits[row[0]] = CoverageHit(*row[:8], polygon.id, polygon.name)
+        return sorted(hits.values(), key=lambda hit: (
+            hit.price_per_liter is None, hit.price_per_liter or 0, hit.business_name, hit.service_id
+        ))
+
+
+def iter_coverage_polygons(conn):
+    """Yield every active vendor's CoveragePolygon"""
+    with conn.cursor(name='coverage_polygons') as cur:
+        cur.itersize = 5000
+        cur.execute(COVERAGE_POLYGONS_SQL)
+        for row in cur:
+            yield CoveragePolygon(row[0], str(row[1]), row[2] and str(row[2]), row[3], bytes(row[4]))
+
+
+def insert_coverage_polygon(conn, vendor_id, service_id, name, vertices):
+    """Store a polygon; returns its id, or None for an unknown vendor or service"""
+    with conn.cursor() as cur:
+        cur.execute(INSERT_POLYGON_SQL, {
+            'vendor_id': vendor_id, 'service_id': service_id, 'name': name,
+            'vertices': encode_vertices(vertices),
+        })
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def fetch_vendor_polygons(conn, vendor_id):
+    with conn.cursor() as cur:
+        cur.execute(VENDOR_POLYGONS_SQL, {'vendor_id': vendor_id})
+        return [
+            polygon_row(CoveragePolygon(row[0], str(row[1]), row[2] and str(row[2]), row[3], bytes(row[4])))
+            for row in cur
+        ]
+
+
+def delete_coverage_polygon(conn, vendor_id, polygon_id):
+    """Delete one of a vendor's polygons; returns whether it existed"""
+    with conn.cursor() as cur:
+        cur.execute(DELETE_POLYGON_SQL, {'vendor_id': vendor_id, 'polygon_id': polygon_id})
+        return cur.rowcount > 0
+
+
+coverage_index = SnapshotHolder(
+    'coverage_index', 'catalog',
+    lambda storage, version: CoverageIndex(storage.iter_coverage_polygons(), storage.iter_catalog_services())
+)
+
+
+def get_coverage_index(storage):
+    """Return this worker's index, rebuilding it when the catalog changed"""
+    return coverage_index.get(storage)
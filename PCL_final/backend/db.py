@@ -0,0 +1,410 @@
+"""
+AquaHub Database Connection Pool
+Process-wide pool of PostgreSQL connections shared by the request handlers
+"""
+
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Database configuration
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'database': os.getenv('DB_NAME', 'aquahub_db'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', 'your_password'),
+    'port': os.getenv('DB_PORT', '5432')
+}
+
+# Pool sizing is per process, so with gunicorn the server-side total is
+# workers * DB_POOL_MAX and must stay below Postgres max_connections.
+POOL_CONFIG = {
+    'min_size': int(os.getenv('DB_POOL_MIN', '1')),
+    'max_size': int(os.getenv('DB_POOL_MAX', '10')),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '5')),
+    'ping_interval': float(os.getenv('DB_POOL_PING_INTERVAL', '30')),
+    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+}
+
+# Debug mode: remember where every connection and cursor was acquired and
+# report the ones still open when a request finishes.
+LEAK_DEBUG = os.getenv('DB_LEAK_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+
+class LeakTracker:
+    """Tracks outstanding connections and cursors per request scope"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._outstanding = {}  # id(obj) -> (kind, scope, weakref, stack)
+        self.leaks_detected = 0
+
+    def begin_scope(self, name):
+        """Start attributing acquisitions on this thread to ``name``"""
+        self._local.scope = name
+
+    def current_scope(self):
+        return getattr(self._local, 'scope', None)
+
+    def track(self, kind, obj):
+        stack = traceback.extract_stack()[:-2]
+        key = id(obj)
+        ref = weakref.ref(obj, lambda _: self._forget(key))
+        with self._lock:
+            self._outstanding[key] = (kind, self.current_scope(), ref, stack)
+
+    def untrack(self, obj):
+        self._forget(id(obj))
+
+    def _forget(self, key):
+        with self._lock:
+            self._outstanding.pop(key, None)
+
+    def end_scope(self):
+        """Close the current scope and return its leaks as readable reports"""
+        scope = self.current_scope()
+        self._local.scope = None
+        if scope is None:
+            return []
+
+        leaks = []
+        with self._lock:
+            for key, (kind, owner, ref, stack) in list(self._outstanding.items()):
+                if owner != scope:
+                    continue
+                obj = ref()
+                if obj is None or obj.closed:
+                    del self._outstanding[key]
+                    continue
+                # Report once; the object stays open, so stop tracking it
+                del self._outstanding[key]
+                leaks.append(f"Leaked {kind} in {scope}, acquired at:\n"
+                             + ''.join(traceback.format_list(stack)))
+            self.leaks_detected += len(leaks)
+        return leaks
+
+
+leak_tracker = LeakTracker()
+
+
+class PooledConnection(extensions.connection):
+    """psycopg2 connection that remembers its prepared statements and
+    registers its cursors with the leak tracker"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # PREPARE is session-level: a rollback does not undo it
+        self.prepared_statements = set()
+
+    def cursor(self, *args, **kwargs):
+        cur = super().cursor(*args, **kwargs)
+        if LEAK_DEBUG:
+            leak_tracker.track('cursor', cur)
+        return cur
+
+
+class UnitOfWork:
+    """One transaction on a borrowed connection
+
+    Used as a context manager: cursors opened through it are closed, the
+    transaction is committed on success and rolled back on any exception,
+    and the connection always goes back to the pool.
+    """
+
+    def __init__(self, pool, conn):
+        self.pool = pool
+        self.conn = conn
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cur = self.conn.cursor(*args, **kwargs)
+        self._cursors.append(cur)
+        return cur
+
+    def _close_cursors(self):
+        for cur in self._cursors:
+            if not cur.closed:
+                try:
+                    cur.close()
+                except psycopg2.Error:
+                    pass
+        self._cursors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._close_cursors()
+            if exc_type is None:
+                self.conn.commit()
+            elif not self.conn.closed:
+                self.conn.rollback()
+        finally:
+            self.pool.putconn(self.conn)
+        return False
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections with liveness checks"""
+
+    def __init__(self, dsn_config, min_size=1, max_size=10, timeout=5.0,
+                 ping_interval=30.0, max_lifetime=1800.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('Invalid pool size: min=%s max=%s' % (min_size, max_size))
+
+        self.dsn_config = dict(dsn_config)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.max_lifetime = max_lifetime
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (conn, last_used_at)
+        self._created_at = {}
+        self._size = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'connections_opened': 0,
+            'connections_discarded': 0,
+            'failed_pings': 0,
+        }
+
+        for _ in range(min_size):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.dsn_config)
+        self._created_at[id(conn)] = time.monotonic()
+        self._size += 1
+        self._stats['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        self._size -= 1
+        self._stats['connections_discarded'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_expired(self, conn):
+        """Closed or past its lifetime; checked under the lock, no I/O"""
+        if conn.closed:
+            return True
+        now = time.monotonic()
+        return now - self._created_at.get(id(conn), now) > self.max_lifetime
+
+    @staticmethod
+    def _ping(conn):
+        """Round-trip to the server; called without holding the lock"""
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Borrow a connection, waiting up to the pool timeout"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolTimeout('Connection pool is closed')
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    if self._is_expired(conn):
+                        self._discard(conn)
+                        self._lock.notify()
+                        continue
+                    if time.monotonic() - last_used >= self.ping_interval:
+                        # The connection is ours now; ping it outside the
+                        # lock so a slow server does not stall other threads
+                        self._lock.release()
+                        try:
+                            alive = self._ping(conn)
+                        finally:
+                            self._lock.acquire()
+                        if not alive:
+                            self._stats['failed_pings'] += 1
+                            self._discard(conn)
+                            self._lock.notify()
+                            continue
+                    break
+
+                if self._size < self.max_size:
+                    # Reserve the slot so other threads see it as taken
+                    # while the (slow) connect happens outside the lock.
+                    self._size += 1
+                    self._lock.release()
+                    try:
+                        conn = psycopg2.connect(
+                            connection_factory=PooledConnection, **self.dsn_config)
+                    except Exception:
+                        self._lock.acquire()
+                        self._size -= 1
+                        self._lock.notify()
+                        raise
+                    self._lock.acquire()
+                    self._created_at[id(conn)] = time.monotonic()
+                    self._stats['connections_opened'] += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        'No database connection available after %.1fs' % self.timeout)
+                waited = True
+                self._lock.wait(remaining)
+
+            wait_time = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += wait_time
+            if waited:
+                self._stats['waits'] += 1
+            if wait_time > self._stats['wait_time_max']:
+                self._stats['wait_time_max'] = wait_time
+
+        if LEAK_DEBUG:
+            leak_tracker.track('connection', conn)
+        return conn
+
+    def putconn(self, conn):
+        """Return a borrowed connection to the pool"""
+        if LEAK_DEBUG:
+            leak_tracker.untrack(conn)
+
+        # Never hand the next borrower a connection with an open transaction
+        if not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                pass
+
+        with self._lock:
+            if self._closed or conn.closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def begin(self):
+        """Borrow a connection wrapped in a UnitOfWork"""
+        return UnitOfWork(self, self.getconn())
+
+    @contextmanager
+    def connection(self):
+        """Context-managed checkout: the connection always goes back to the pool"""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        """Snapshot of pool sizing, wait-time and saturation figures"""
+        with self._lock:
+            in_use = self._size - len(self._idle)
+            checkouts = self._stats['checkouts']
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': in_use,
+                'saturation': in_use / self.max_size,
+                'checkouts': checkouts,
+                'waits': self._stats['waits'],
+                'timeouts': self._stats['timeouts'],
+                'wait_time_avg_ms': (self._stats['wait_time_total'] / checkouts * 1000) if checkouts else 0.0,
+                'wait_time_max_ms': self._stats['wait_time_max'] * 1000,
+                'connections_opened': self._stats['connections_opened'],
+                'connections_discarded': self._stats['connections_discarded'],
+                'failed_pings': self._stats['failed_pings'],
+                'leaks_detected': leak_tracker.leaks_detected,
+            }
+
+    def close(self):
+        """Close every idle connection; borrowed ones are closed on return"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._lock.notify_all()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it lazily after any fork"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            # A pool inherited from the gunicorn master shares sockets
+            # with it, so each worker builds its own.
+            _pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+            _pool_pid = pid
+        return _pool
+
+
+def unit_of_work():
+    """Start a UnitOfWork on the process-wide pool"""
+    return get_pool().begin()
+
+
+def report_leaks():
+    """Print and return the leaks of the current request scope"""
+    leaks = leak_tracker.end_scope()
+    for leak in leaks:
+        print(leak, file=sys.stderr)
+    return leaks
+
+
+def close_pool():
+    """Close the process-wide pool (used on worker shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
@@ -0,0 +1,219 @@
+"""
+AquaHub Disk Cache
+Size-bounded persistent blob cache and request pacing shared by workers
+
+Both live in one SQLite file, so every worker process on a host shares
+the cache and the pacing. BlobCache entries carry an expiry time and a
+last-used time; once the cached bytes pass ``max_bytes`` the least
+recently used entries are evicted down to 90% of it. RateShaper hands
+out upstream request slots at most every ``interval`` seconds across all
+processes: a caller reserves the next free slot and sleeps until it.
+CachedFetcher puts the two in front of an upstream, so each missing key
+is fetched once even when many requests want it at the same moment.
+"""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        body BLOB NOT NULL,
+        content_type TEXT,
+        size INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_entries_last_used ON cache_entries(last_used);
+    CREATE TABLE IF NOT EXISTS rate_slots (
+        name TEXT PRIMARY KEY,
+        next_at REAL NOT NULL
+    );
+"""
+
+# last_used is rewritten on a hit at most this often, to keep hits read-only
+TOUCH_INTERVAL = 60.0
+
+# Puts between checks of the total cache size
+EVICT_CHECK_EVERY = 64
+
+
+class RateLimited(Exception):
+    """The next upstream slot is further away than the caller will wait"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Upstream busy, retry in {retry_after:.1f} s')
+        self.retry_after = retry_after
+
+
+class _Database:
+    """One SQLite connection per thread to a shared cache file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.conn().executescript(CACHE_SCHEMA)
+
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5.0)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+
+class BlobCache:
+    """Persistent LRU cache of (body, content_type) by key with per-entry TTLs"""
+
+    def __init__(self, path, max_bytes):
+        self.db = _Database(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts = 0
+
+    def get(self, key):
+        """(body, content_type) of a live entry, or None"""
+        now = time.time()
+        conn = self.db.conn()
+        row = conn.execute(
+            'SELECT body, content_type, expires_at, last_used FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[2] <= now:
+            self.misses += 1
+            return None
+        if now - row[3] > TOUCH_INTERVAL:
+            conn.execute('UPDATE cache_entries SET last_used = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        return row[0], row[1]
+
+    def put(self, key, body, content_type, ttl):
+        now = time.time()
+        self.db.conn().execute("""
+            INSERT OR REPLACE INTO cache_entries (key, body, content_type, size, expires_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (key, body, content_type, len(body) + len(key), now + ttl, now))
+        self._puts += 1
+        if self._puts % EVICT_CHECK_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones down to 90% of max_bytes"""
+        conn = self.db.conn()
+        conn.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),))
+        total, count = conn.execute('SELECT total(size), count(*) FROM cache_entries').fetchone()
+        if total <= self.max_bytes or not count:
+            return 0
+        # Entries are of similar size, so evict by the average
+        excess = total - self.max_bytes * 0.9
+        victims = min(count, int(excess / (total / count)) + 1)
+        conn.execute("""
+            DELETE FROM cache_entries WHERE key IN (
+                SELECT key FROM cache_entries ORDER BY last_used LIMIT ?
+            )
+        """, (victims,))
+        self.evictions += victims
+        return victims
+
+    def stats(self):
+        total, count = self.db.conn().execute(
+            'SELECT total(size), count(*) FROM cache_entries'
+        ).fetchone()
+        return {
+            'entries': count, 'bytes': int(total), 'max_bytes': self.max_bytes,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+        }
+
+
+class RateShaper:
+    """Paces requests named ``name`` to one per ``interval`` seconds across processes"""
+
+    def __init__(self, path, name, interval, max_wait):
+        self.db = _Database(path)
+        self.name = name
+        self.interval = interval
+        self.max_wait = max_wait
+
+    def acquire(self):
+        """Block until this caller's slot; raises RateLimited past ``max_wait``"""
+        if self.interval <= 0:
+            return
+        conn = self.db.conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT next_at FROM rate_slots WHERE name = ?', (self.name,)).fetchone()
+            now = time.time()
+            slot = max(now, row[0] if row else 0.0)
+            if slot - now > self.max_wait:
+                raise RateLimited(slot - now)
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_slots (name, next_at) VALUES (?, ?)',
+                (self.name, slot + self.interval)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CachedFetcher:
+    """A BlobCache filled from an upstream through a RateShaper
+
+    Concurrent misses for one key in a process wait for a single fetch;
+    other processes see its result in the shared cache.
+    """
+
+    def __init__(self, cache, shaper):
+        self.cache = cache
+        self.shaper = shaper
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch, ttl):
+        """(body, content_type, cache hit) for ``key``
+
+        On a miss ``fetch()`` returns (body, content_type), and ``ttl(body)``
+        the seconds to keep it.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached[0], cached[1], True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return *future.result(), False
+
+        try:
+            # Another worker process may have filled it meanwhile
+            cached = self.cache.get(key)
+            if cached is None:
+                self.shaper.acquire()
+                self.upstream_calls += 1
+                cached = fetch()
+                self.cache.put(key, cached[0], cached[1], ttl(cached[0]))
+            future.set_result(cached)
+            return cached[0], cached[1], False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stats(self):
+        return {**self.cache.stats(), 'upstream_calls': self.upstream_calls, 'coalesced': self.coalesced}
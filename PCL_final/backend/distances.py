@@ -0,0 +1,172 @@
+"""
+AquaHub Distances
+Vectorized customer-to-vendor distance matrices and a cache of distance rows
+
+pairwise_km() measures many pairs of points in one NumPy pass and
+distance_matrix() every customer against every vendor. Both use the
+haversine formula or, with method='equirectangular', a flat-earth
+approximation that skips the half-angle sines and arcsine; over delivery
+distances (tens of km) the two agree to within metres.
+
+Searches from the same customer (paging, changing filters) measure the
+same vendors again. DistanceCache keeps the rows it computed, keyed by
+the customer's location cell (DISTANCE_CELL_DEG, about 55 m at 0.0005)
+and the vendor set version (the catalog data version the vendor snapshot
+was built at), and evicts the least recently used rows beyond
+DISTANCE_CACHE_MAX_MB per worker. A cached row is measured from the
+centre of the cell, so it can be off by up to the customer's distance
+from there (error_km()); it is good for ordering, and exact tests measure
+the points near a threshold again. DISTANCE_CELL_DEG=0 turns caching off.
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DISTANCE_CONFIG = {
+    'method': os.getenv('DISTANCE_METHOD') or 'haversine',
+    'cell_deg': float(os.getenv('DISTANCE_CELL_DEG') or 0.0005),
+    'cache_max_bytes': int(float(os.getenv('DISTANCE_CACHE_MAX_MB') or 64) * 2**20),
+}
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _haversine(lat1, lng1, cos_lat1, lat2, lng2, cos_lat2):
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _equirectangular(lat1, lng1, cos_lat1, lat2, lng2, cos_lat2):
+    x = (lng2 - lng1) * np.cos((lat1 + lat2) / 2)
+    return EARTH_RADIUS_KM * np.hypot(lat2 - lat1, x)
+
+
+METHODS = {'haversine': _haversine, 'equirectangular': _equirectangular}
+
+
+def _formula(method):
+    try:
+        return METHODS[method or DISTANCE_CONFIG['method']]
+    except KeyError:
+        raise ValueError(f'Unknown distance method: {method}') from None
+
+
+def _radians(values):
+    return np.radians(np.asarray(values, dtype=np.float64))
+
+
+def pairwise_km(lat1, lng1, lat2, lng2, method=None):
+    """Distances in km between points given in degrees, broadcast like NumPy arrays"""
+    lat1, lng1, lat2, lng2 = _radians(lat1), _radians(lng1), _radians(lat2), _radians(lng2)
+    return _formula(method)(lat1, lng1, np.cos(lat1), lat2, lng2, np.cos(lat2))
+
+
+class PointSet:
+    """Fixed points (vendor depots) in radians, ready to be measured against"""
+
+    def __init__(self, latitudes, longitudes):
+        self.lat = _radians(latitudes)
+        self.lng = _radians(longitudes)
+        self.cos_lat = np.cos(self.lat)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def distances_from(self, lat, lng, subset=None, method=None):
+        """Distances in km from one point to every point (or those at ``subset``)"""
+        lat_r, lng_r = math.radians(lat), math.radians(lng)
+        if subset is None:
+            lat2, lng2, cos_lat2 = self.lat, self.lng, self.cos_lat
+        else:
+            lat2, lng2, cos_lat2 = self.lat[subset], self.lng[subset], self.cos_lat[subset]
+        return _formula(method)(lat_r, lng_r, math.cos(lat_r), lat2, lng2, cos_lat2)
+
+
+def distance_matrix(latitudes, longitudes, points, method=None):
+    """(customers, len(points)) matrix of distances in km from each customer to each point"""
+    lat, lng = _radians(latitudes)[:, None], _radians(longitudes)[:, None]
+    return _formula(method)(lat, lng, np.cos(lat), points.lat, points.lng, points.cos_lat)
+
+
+class DistanceCache:
+    """Least recently used distance rows keyed by customer cell and vendor set"""
+
+    def __init__(self, max_bytes=None, cell_deg=None, method=None):
+        self.max_bytes = DISTANCE_CONFIG['cache_max_bytes'] if max_bytes is None else max_bytes
+        self.cell_deg = DISTANCE_CONFIG['cell_deg'] if cell_deg is None else cell_deg
+        self.method = method or DISTANCE_CONFIG['method']
+        _formula(self.method)
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _caches(self, version):
+        return version is not None and bool(self.cell_deg) and bool(self.max_bytes)
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def _centre(self, cell):
+        return (cell[0] + 0.5) * self.cell_deg, (cell[1] + 0.5) * self.cell_deg
+
+    def error_km(self, lat, lng, version):
+        """How far row() for (lat, lng) and ``version`` can be from the exact distances"""
+        if not self._caches(version):
+            return 0.0
+        return float(pairwise_km(lat, lng, *self._centre(self._cell(lat, lng)), self.method))
+
+    def row(self, lat, lng, points, version, subset=None, subset_key=None):
+        """Distances in km from (lat, lng) to ``points`` (or those at ``subset``)
+
+        ``version`` identifies the vendor set; rows of an unversioned set
+        are computed exactly and not cached. ``subset_key`` names
+        ``subset`` within the set. The returned array is read-only.
+        """
+        if not self._caches(version):
+            return points.distances_from(lat, lng, subset, self.method)
+
+        cell = self._cell(lat, lng)
+        key = (version, subset_key, cell)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                self._rows.move_to_end(key)
+                self.hits += 1
+                return row
+
+        # Computed outside the lock; two threads missing the same key both
+        # compute it, and the second store wins
+        row = points.distances_from(*self._centre(cell), subset, self.method)
+        row.flags.writeable = False
+        with self._lock:
+            self.misses += 1
+            previous = self._rows.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self._rows[key] = row
+            self.bytes += row.nbytes
+            while self.bytes > self.max_bytes:
+                self.bytes -= self._rows.popitem(last=False)[1].nbytes
+        return row
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._rows), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+distance_cache = DistanceCache()
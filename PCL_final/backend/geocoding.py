@@ -0,0 +1,175 @@
+"""
+AquaHub Geocoding Proxy
+Server-side forward and reverse geocoding with a shared persistent cache
+
+Browsers ask the backend instead of Nominatim. Lookups are normalised
+into cache keys (queries case- and whitespace-folded, reverse lookups
+rounded to GEOCODER_REVERSE_DECIMALS, about 11 m at 4), answered from a
+size-bounded LRU cache on disk (disk_cache.BlobCache) when possible, and
+otherwise fetched once: concurrent requests for the same key wait for the
+first one, and upstream calls from every worker are paced by one
+RateShaper to Nominatim's one request per second.
+
+The upstream is pluggable. GEOCODER_UPSTREAM names a factory as
+``module:callable`` returning an object with ``search(params)`` and
+``reverse(params)`` methods that return JSON bytes; set_geocoder()
+installs a Geocoder built around any upstream directly.
+"""
+
+import importlib
+import json
+import os
+import re
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from dotenv import load_dotenv
+
+from disk_cache import BlobCache, CachedFetcher, RateLimited, RateShaper
+
+# Load environment variables
+load_dotenv()
+
+GEOCODER_CONFIG = {
+    'upstream': os.getenv('GEOCODER_UPSTREAM') or 'nominatim',
+    'url': (os.getenv('GEOCODER_URL') or 'https://nominatim.openstreetmap.org').rstrip('/'),
+    'user_agent': os.getenv('GEOCODER_USER_AGENT') or 'AquaHub Water Booking App',
+    'timeout': float(os.getenv('GEOCODER_TIMEOUT') or 10),
+    'cache_path': os.getenv('GEOCODER_CACHE_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'geocode_cache.sqlite3'
+    ),
+    'cache_max_bytes': int(float(os.getenv('GEOCODER_CACHE_MAX_MB') or 256) * 2**20),
+    'ttl': int(os.getenv('GEOCODER_CACHE_TTL') or 30 * 86400),
+    # Empty answers are retried sooner: the upstream data may catch up
+    'negative_ttl': int(os.getenv('GEOCODER_NEGATIVE_TTL') or 86400),
+    'reverse_decimals': int(os.getenv('GEOCODER_REVERSE_DECIMALS') or 4),
+    'min_interval': float(os.getenv('GEOCODER_MIN_INTERVAL') or 1.0),
+    'max_wait': float(os.getenv('GEOCODER_MAX_WAIT') or 5),
+}
+
+MAX_GEOCODE_RESULTS = 10
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class UpstreamError(Exception):
+    """The upstream geocoder failed or answered with an error"""
+
+
+class NominatimUpstream:
+    """Nominatim's /search and /reverse over HTTP"""
+
+    def __init__(self, url=None, user_agent=None, timeout=None):
+        self.url = url or GEOCODER_CONFIG['url']
+        self.user_agent = user_agent or GEOCODER_CONFIG['user_agent']
+        self.timeout = timeout or GEOCODER_CONFIG['timeout']
+
+    def _get(self, path, params):
+        query = urllib.parse.urlencode({**params, 'format': 'json', 'addressdetails': 1})
+        request = urllib.request.Request(f'{self.url}/{path}?{query}', headers={
+            'User-Agent': self.user_agent, 'Accept-Language': 'en',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except (urllib.error.URLError, TimeoutError) as e:
+            raise UpstreamError(f'{path} failed: {e}') from e
+
+    def search(self, params):
+        return self._get('search', {**params, 'countrycodes': 'in'})
+
+    def reverse(self, params):
+        return self._get('reverse', params)
+
+
+def load_upstream(name):
+    """Build the upstream GEOCODER_UPSTREAM names"""
+    if name == 'nominatim':
+        return NominatimUpstream()
+    module, _, attr = name.partition(':')
+    return getattr(importlib.import_module(module), attr)()
+
+
+def search_key(query, limit):
+    """Cache key and upstream parameters of a forward lookup"""
+    query = _WHITESPACE.sub(' ', (query or '').strip().lower())
+    return f'search:{limit}:{query}', {'q': query, 'limit': limit}
+
+
+def reverse_key(lat, lng, zoom=18, decimals=None):
+    """Cache key and upstream parameters of a reverse lookup, coordinates rounded"""
+    decimals = GEOCODER_CONFIG['reverse_decimals'] if decimals is None else decimals
+    lat, lng = round(lat, decimals), round(lng, decimals)
+    return f'reverse:{zoom}:{lat:.{decimals}f},{lng:.{decimals}f}', {'lat': lat, 'lon': lng, 'zoom': zoom}
+
+
+def _is_empty(body):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return True
+    return not data or (isinstance(data, dict) and 'error' in data)
+
+
+class Geocoder:
+    """Cached, deduplicated and paced access to one upstream"""
+
+    def __init__(self, upstream, cache, shaper, ttl=None, negative_ttl=None):
+        self.upstream = upstream
+        self.fetcher = CachedFetcher(cache, shaper)
+        self.ttl = GEOCODER_CONFIG['ttl'] if ttl is None else ttl
+        self.negative_ttl = GEOCODER_CONFIG['negative_ttl'] if negative_ttl is None else negative_ttl
+
+    def search(self, query, limit=1):
+        """Returns (JSON bytes, cache hit) for a forward lookup"""
+        key, params = search_key(query, limit)
+        return self._lookup(key, self.upstream.search, params)
+
+    def reverse(self, lat, lng, zoom=18):
+        """Returns (JSON bytes, cache hit) for a reverse lookup"""
+        key, params = reverse_key(lat, lng, zoom)
+        return self._lookup(key, self.upstream.reverse, params)
+
+    def _lookup(self, key, fetch, params):
+        body, _, hit = self.fetcher.get(
+            key, lambda: (fetch(params), 'application/json'),
+            lambda body: self.negative_ttl if _is_empty(body) else self.ttl,
+        )
+        return body, hit
+
+    def stats(self):
+        return self.fetcher.stats()
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """The process-wide Geocoder, built from GEOCODER_CONFIG on first use"""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                path = GEOCODER_CONFIG['cache_path']
+                _geocoder = Geocoder(
+                    load_upstream(GEOCODER_CONFIG['upstream']),
+                    BlobCache(path, GEOCODER_CONFIG['cache_max_bytes']),
+                    RateShaper(path, 'geocoder', GEOCODER_CONFIG['min_interval'], GEOCODER_CONFIG['max_wait']),
+                )
+    return _geocoder
+
+
+def set_geocoder(geocoder):
+    """Install a Geocoder explicitly (a local upstream stand-in, benchmarks)"""
+    global _geocoder
+    with _geocoder_lock:
+        _geocoder = geocoder
+
+
+__all__ = [
+    'GEOCODER_CONFIG', 'MAX_GEOCODE_RESULTS', 'Geocoder', 'NominatimUpstream', 'RateLimited',
+    'UpstreamError', 'get_geocoder', 'set_geocoder',
+]
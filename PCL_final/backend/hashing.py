@@ -0,0 +1,140 @@
+"""
+AquaHub Password Hashing
+bcrypt hashing on a dedicated process pool with latency-targeted cost
+
+Hashes and checks (signup, login, imports) run on a per-worker process
+pool sized to the worker's share of the cores: os.cpu_count() /
+WEB_CONCURRENCY unless BCRYPT_WORKERS says otherwise. The web workers
+are threaded (procfile), so while one request thread waits on its hash
+the others keep serving, and the pool caps how many cores hashing can
+take from them. BCRYPT_WORKERS=0 hashes inline on the request thread.
+"""
+
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# BCRYPT_ROUNDS pins the cost factor; otherwise it is calibrated at startup
+# to the highest cost whose single hash fits in BCRYPT_TARGET_MS.
+HASHING_CONFIG = {
+    'rounds': int(os.getenv('BCRYPT_ROUNDS') or 0) or None,
+    'target_ms': float(os.getenv('BCRYPT_TARGET_MS', '100')),
+    'min_rounds': int(os.getenv('BCRYPT_MIN_ROUNDS', '10')),
+    'max_rounds': int(os.getenv('BCRYPT_MAX_ROUNDS', '14')),
+    'workers': int(os.getenv('BCRYPT_WORKERS') or max(
+        1, (os.cpu_count() or 1) // max(1, int(os.getenv('WEB_CONCURRENCY') or 1))
+    )),
+}
+
+_rounds = None
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def time_hash(rounds, samples=3):
+    """Best-of-``samples`` wall time in milliseconds for one hash at ``rounds``"""
+    best = None
+    for _ in range(samples):
+        started = time.perf_counter()
+        _hash('calibration-password', rounds)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate_rounds(target_ms, min_rounds=10, max_rounds=14):
+    """Pick the highest bcrypt cost whose hash time stays within ``target_ms``
+
+    Each extra round doubles the work, so one measurement at ``min_rounds``
+    is enough to extrapolate the rest. Never goes below ``min_rounds``.
+    """
+    base_ms = time_hash(min_rounds)
+    rounds = min_rounds
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    return rounds
+
+
+def get_rounds():
+    """Return the configured or calibrated bcrypt cost, calibrating once"""
+    global _rounds
+    if _rounds is None:
+        with _lock:
+            if _rounds is None:
+                _rounds = HASHING_CONFIG['rounds'] or calibrate_rounds(
+                    HASHING_CONFIG['target_ms'],
+                    HASHING_CONFIG['min_rounds'],
+                    HASHING_CONFIG['max_rounds']
+                )
+    return _rounds
+
+
+def get_executor():
+    """Return the hashing process pool, or None when hashing runs inline"""
+    global _executor, _executor_pid
+    if HASHING_CONFIG['workers'] <= 0:
+        return None
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor
+    with _lock:
+        if _executor is None or _executor_pid != pid:
+            # Created lazily so each gunicorn worker owns its own pool
+            _executor = ProcessPoolExecutor(max_workers=HASHING_CONFIG['workers'])
+            _executor_pid = pid
+        return _executor
+
+
+def shutdown_executor():
+    """Stop the hashing process pool"""
+    global _executor
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+atexit.register(shutdown_executor)
+
+
+def hash_password(password):
+    """Hash password using bcrypt"""
+    rounds = get_rounds()
+    executor = get_executor()
+    if executor is None:
+        return _hash(password, rounds)
+    return executor.submit(_hash, password, rounds).result()
+
+
+def hash_passwords(passwords):
+    """Hash many passwords, spread across the whole pool"""
+    rounds = get_rounds()
+    executor = get_executor()
+    if executor is None:
+        return [_hash(password, rounds) for password in passwords]
+    return list(executor.map(_hash, passwords, [rounds] * len(passwords)))
+
+
+def verify_password(password, hashed):
+    """Verify password against hash"""
+    executor = get_executor()
+    if executor is None:
+        return _check(password, hashed)
+    return executor.submit(_check, password, hashed).result()
@@ -0,0 +1,330 @@
+"""
+AquaHub Requirement Matching
+Nightly batch that matches customer water requirements to vendor offers
+
+A service is a compatible offer for a requirement when it delivers to the
+customer's pincode (pincode_serviceability), has the same water type, a
+tanker that fits the customer's storage and a minimum order the required
+quantity meets, and shares at least one delivery day and one hour of the
+day with the customer's preferences (no preference means any). Offers are
+ranked cheapest per delivery first and the best MATCH_TOP_N are stored in
+requirement_matches.
+
+Runs are incremental. Each run queues the requirements changed since the
+previous run's watermark, plus those whose candidate services changed, in
+requirement_match_queue and drains the queue in batches: the coarse
+filters run in SQL, the day/slot overlap and ranking over whole batches
+with numpy. An interrupted run resumes from the queue. Changes that
+leave no updated_at behind (deleted services and vendors, serviceability
+gained or lost through areas, coverage or the pincode directory) queue
+the requirements they affect from database triggers (migrations/011).
+
+    python matching.py run            # nightly, from cron
+    python matching.py run --full     # after a pincode directory load
+"""
+
+import argparse
+import math
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+# Load environment variables
+load_dotenv()
+
+MATCHING_CONFIG = {
+    'top_n': int(os.getenv('MATCH_TOP_N') or 5),
+    'batch_size': int(os.getenv('MATCH_BATCH_SIZE') or 5000),
+    # Changes committed while the previous run was starting can carry an
+    # updated_at just before its watermark; re-matching them is harmless
+    'overlap_seconds': int(os.getenv('MATCH_WATERMARK_OVERLAP') or 300),
+}
+
+WATERMARK_NAME = 'requirement_matches'
+
+ALL_DAYS = 0x7F
+ALL_HOURS = (1 << 24) - 1
+
+_DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+_DAY_GROUPS = {
+    'daily': ALL_DAYS, 'everyday': ALL_DAYS, 'all': ALL_DAYS, 'any': ALL_DAYS,
+    'weekdays': 0x1F, 'weekday': 0x1F, 'weekends': 0x60, 'weekend': 0x60,
+}
+_NAMED_SLOTS = {
+    'morning': (6, 12), 'afternoon': (12, 16), 'evening': (16, 20), 'night': (20, 24),
+    'anytime': (0, 24), 'any': (0, 24), 'all day': (0, 24),
+}
+# "10:00-12:00", "9am-12pm", "9:30 am to 1 pm"
+_SLOT = re.compile(
+    r'^(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?\s*(?:-|–|to)\s*(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?$'
+)
+
+# Requirements to queue since %(since)s: changed requirements or customer
+# addresses, requirements a changed service may now match, and those it
+# may no longer match. Vendor profile and user changes count as changes to
+# all the vendor's services.
+QUEUE_CHANGED_SQL = """
+    WITH changed_services AS (
+        SELECT vs.id FROM vendor_services vs
+        JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+        JOIN users u ON u.id = vp.user_id
+        WHERE vs.updated_at > %(since)s OR vp.updated_at > %(since)s OR u.updated_at > %(since)s
+    )
+    INSERT INTO requirement_match_queue (requirement_id)
+    SELECT r.id FROM customer_water_requirements r
+    WHERE r.updated_at > %(since)s
+    UNION
+    SELECT r.id FROM customer_water_requirements r
+    JOIN customer_profiles cp ON cp.id = r.customer_id
+    WHERE cp.updated_at > %(since)s
+    UNION
+    SELECT r.id
+    FROM changed_services c
+    JOIN vendor_services vs ON vs.id = c.id
+    JOIN pincode_serviceability ps ON ps.service_id = vs.id
+    JOIN customer_profiles cp ON replace(cp.postal_code, ' ', '') = ps.pincode
+    JOIN customer_water_requirements r
+      ON r.customer_id = cp.id AND lower(btrim(r.water_type)) = lower(btrim(vs.water_type))
+    UNION
+    SELECT m.requirement_id FROM requirement_matches m
+    JOIN changed_services c ON c.id = m.service_id
+    ON CONFLICT (requirement_id) DO NOTHING
+"""
+
+QUEUE_ALL_SQL = """
+    INSERT INTO requirement_match_queue (requirement_id)
+    SELECT id FROM customer_water_requirements
+    ON CONFLICT (requirement_id) DO NOTHING
+"""
+
+# The previous watermark, and the new one: the start of this transaction,
+# so nothing committed after it can be older
+ADVANCE_WATERMARK_SQL = """
+    WITH previous AS (
+        SELECT watermark FROM job_watermarks WHERE name = %(name)s
+    ), advanced AS (
+        INSERT INTO job_watermarks (name, watermark) VALUES (%(name)s, CURRENT_TIMESTAMP)
+        ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark
+    )
+    SELECT watermark - make_interval(secs => %(overlap)s) FROM previous
+"""
+
+CLAIM_MATCH_QUEUE_SQL = """
+    DELETE FROM requirement_match_queue
+    WHERE requirement_id IN (
+        SELECT requirement_id FROM requirement_match_queue
+        ORDER BY requirement_id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING requirement_id
+"""
+
+# Candidate rows: (requirement_id, required_quantity, preferred_delivery_days,
+# preferred_time_slots, service_id, vendor_id, tanker_capacity,
+# price_per_liter, available_days, available_time_slots). Serviceability
+# already excludes inactive services and vendors.
+MATCH_CANDIDATES_SQL = """
+    SELECT r.id, r.required_quantity, r.preferred_delivery_days, r.preferred_time_slots,
+           vs.id, vs.vendor_id, vs.tanker_capacity, vs.price_per_liter,
+           vs.available_days, vs.available_time_slots
+    FROM customer_water_requirements r
+    JOIN customer_profiles cp ON cp.id = r.customer_id
+    JOIN pincode_serviceability ps ON ps.pincode = replace(cp.postal_code, ' ', '')
+    JOIN vendor_services vs ON vs.id = ps.service_id
+    WHERE r.id = ANY (%(ids)s::uuid[])
+      AND lower(btrim(vs.water_type)) = lower(btrim(r.water_type))
+      AND vs.tanker_capacity > 0
+      AND (r.storage_capacity IS NULL OR vs.tanker_capacity <= r.storage_capacity)
+      AND (vs.minimum_order_quantity IS NULL OR vs.minimum_order_quantity <= r.required_quantity)
+"""
+
+
+@dataclass(slots=True)
+class MatchRun:
+    """Outcome of one matching run"""
+
+    queued: int
+    matched: int
+    full: bool
+    seconds: float
+
+
+@lru_cache(maxsize=4096)
+def day_mask(days):
+    """Bit mask of a tuple of day names (bit 0 = Monday); 0 when none parse"""
+    mask = 0
+    for day in days:
+        day = str(day).strip().lower()
+        if day in _DAY_GROUPS:
+            mask |= _DAY_GROUPS[day]
+        elif day[:3] in _DAYS:
+            mask |= 1 << _DAYS.index(day[:3])
+    return mask
+
+
+def _hour(hour, minute, meridiem):
+    hour = int(hour)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem[0] == 'p' else 0)
+    return hour + int(minute or 0) / 60
+
+
+@lru_cache(maxsize=4096)
+def hour_mask(slots):
+    """Bit mask of the hours a tuple of time slots touches (bit h = h:00-h+1:00)
+
+    Unrecognised slots count as any time, since they cannot rule a
+    delivery out; 0 means no slots were given. A slot with one meridiem
+    shares it only while that keeps the slot running forwards:
+
+    >>> hour_mask(('9-11am',)) == 0b11 << 9
+    True
+    >>> hour_mask(('11-1pm',)) == 0b11 << 11
+    True
+    >>> hour_mask(('11am-1',)) == 0b11 << 11
+    True
+    >>> hour_mask(('10-2am',)) == 0b11 << 22 | 0b11
+    True
+    """
+    mask = 0
+    for slot in slots:
+        slot = str(slot).strip().lower()
+        if slot in _NAMED_SLOTS:
+            start, end = _NAMED_SLOTS[slot]
+        else:
+            match = _SLOT.match(slot)
+            if not match:
+                return ALL_HOURS
+            h1, m1, p1, h2, m2, p2 = match.groups()
+            start, end = _hour(h1, m1, p1 or p2), _hour(h2, m2, p2 or p1)
+            if start >= end and bool(p1) != bool(p2):
+                # "11-1pm" starts in the morning, "11am-1" ends after noon
+                if p1:
+                    end = _hour(h2, m2, 'am' if p1[0] == 'p' else 'pm')
+                else:
+                    start = _hour(h1, m1, 'am' if p2[0] == 'p' else 'pm')
+            start, end = math.floor(start) % 24, math.ceil(end)
+            if end <= start:
+                end += 24
+        for hour in range(start, end):
+            mask |= 1 << (hour % 24)
+    return mask
+
+
+def match_candidates(rows, top_n=None):
+    """Turn MATCH_CANDIDATES_SQL rows into requirement_matches rows
+
+    Returns (requirement_id, rank, service_id, vendor_id,
+    tankers_per_delivery, cost_per_delivery, common_days, common_hours)
+    tuples, the best ``top_n`` per requirement: cheapest delivery first,
+    then most common days, then fewest tankers.
+    """
+    top_n = top_n or MATCHING_CONFIG['top_n']
+    rows = list(rows)
+    if not rows:
+        return []
+
+    requirement_ids = [str(row[0]) for row in rows]
+    _, group = np.unique(requirement_ids, return_inverse=True)
+    quantity = np.array([row[1] for row in rows], dtype=np.int64)
+    capacity = np.array([row[6] for row in rows], dtype=np.int64)
+    price = np.array([np.nan if row[7] is None else float(row[7]) for row in rows])
+    # No preference (mask 0) is compatible with anything
+    wanted_days = np.array([day_mask(tuple(row[2] or ())) or ALL_DAYS for row in rows], dtype=np.int64)
+    wanted_hours = np.array([hour_mask(tuple(row[3] or ())) or ALL_HOURS for row in rows], dtype=np.int64)
+    offered_days = np.array([day_mask(tuple(row[8] or ())) or ALL_DAYS for row in rows], dtype=np.int64)
+    offered_hours = np.array([hour_mask(tuple(row[9] or ())) or ALL_HOURS for row in rows], dtype=np.int64)
+
+    common_days = wanted_days & offered_days
+    common_hours = wanted_hours & offered_hours
+    keep = np.flatnonzero((common_days != 0) & (common_hours != 0))
+    if not len(keep):
+        return []
+
+    tankers = -(-quantity[keep] // capacity[keep])
+    cost = tankers * capacity[keep] * price[keep]
+    day_count = np.zeros(len(keep), dtype=np.int64)
+    for bit in range(7):
+        day_count += (common_days[keep] >> bit) & 1
+
+    # Unpriced offers sort after priced ones; lexsort's last key is primary
+    order = keep[np.lexsort((tankers, -day_count, np.nan_to_num(cost, nan=np.inf), group[keep]))]
+    position = np.empty(len(rows), dtype=np.int64)
+    position[keep] = np.arange(len(keep))
+    ordered_groups = group[order]
+    starts = np.flatnonzero(np.r_[True, ordered_groups[1:] != ordered_groups[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)])) + 1
+
+    matches = []
+    for i in np.flatnonzero(rank <= top_n):
+        row_index = order[i]
+        at = position[row_index]
+        row = rows[row_index]
+        matches.append((
+            requirement_ids[row_index], int(rank[i]), str(row[4]), str(row[5]),
+            int(tankers[at]), None if np.isnan(cost[at]) else round(float(cost[at]), 2),
+            int(common_days[row_index]), int(common_hours[row_index]),
+        ))
+    return matches
+
+
+def queue_requirement_matches(conn, full=False):
+    """Advance the watermark and queue what changed since; returns (queued, full)
+
+    The first run, or ``full``, queues every requirement.
+    """
+    with conn.cursor() as cur:
+        cur.execute(ADVANCE_WATERMARK_SQL, {
+            'name': WATERMARK_NAME, 'overlap': MATCHING_CONFIG['overlap_seconds']
+        })
+        row = cur.fetchone()
+        full = full or row is None
+        if full:
+            cur.execute(QUEUE_ALL_SQL)
+        else:
+            cur.execute(QUEUE_CHANGED_SQL, {'since': row[0]})
+        return cur.rowcount, full
+
+
+def match_requirement_batch(conn, batch_size=None):
+    """Re-match one batch of queued requirements; returns how many were claimed"""
+    with conn.cursor() as cur:
+        cur.execute(CLAIM_MATCH_QUEUE_SQL, {'limit': batch_size or MATCHING_CONFIG['batch_size']})
+        ids = [str(row[0]) for row in cur.fetchall()]
+        if not ids:
+            return 0
+        cur.execute(MATCH_CANDIDATES_SQL, {'ids': ids})
+        matches = match_candidates(cur.fetchall())
+        cur.execute('DELETE FROM requirement_matches WHERE requirement_id = ANY (%s::uuid[])', (ids,))
+        if matches:
+            execute_values(cur, """
+                INSERT INTO requirement_matches
+                (requirement_id, rank, service_id, vendor_id, tankers_per_delivery,
+                 cost_per_delivery, common_days, common_hours)
+                VALUES %s
+            """, matches)
+    return len(ids)
+
+
+def main():
+    from storage import get_storage
+
+    parser = argparse.ArgumentParser(description='Match AquaHub customer requirements to vendor offers')
+    parser.add_argument('command', choices=('run',))
+    parser.add_argument('--full', action='store_true', help='re-match every requirement')
+    args = parser.parse_args()
+
+    run = get_storage().match_requirements(full=args.full)
+    kind = 'full' if run.full else 'incremental'
+    print(f"🤝 {kind} run: {run.queued} requirements queued, {run.matched} matched "
+          f"in {run.seconds:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+AquaHub Memory-Mapped Indexes
+Read-only binary index files shared by the offline place and pincode lookups
+
+An index file is a header (magic, JSON table of contents) followed by
+8-byte aligned sections, each a flat numpy array. MappedIndex maps the
+file and exposes the sections as zero-copy arrays: opening is O(1), pages
+load on first touch and every worker process shares one copy through the
+page cache. Variable-length strings are stored as a table: a byte blob
+plus an offsets array.
+
+Builders write to a temporary file and rename it into place, so readers
+never see a half-written index; IndexHolder reopens an index when its
+file has been replaced.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b'AQIDX001'
+_HEADER = struct.Struct('<8sI')
+_ALIGN = 8
+
+
+class IndexFormatError(Exception):
+    """The file is not an index of the expected kind"""
+
+
+def pack_strings(strings):
+    """Encode strings as (offsets, blob) arrays; string i is blob[offsets[i]:offsets[i + 1]]"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def write_index(path, kind, arrays, meta=None):
+    """Atomically write ``arrays`` (name -> numpy array) as an index of ``kind``"""
+    sections, offset = {}, 0
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, array in arrays.items():
+        sections[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    toc = json.dumps({'kind': kind, 'meta': meta or {}, 'sections': sections}).encode('utf-8')
+    data_start = -(-(_HEADER.size + len(toc)) // _ALIGN) * _ALIGN
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(toc)))
+            f.write(toc)
+            f.write(b'\0' * (data_start - _HEADER.size - len(toc)))
+            for name, array in arrays.items():
+                f.write(array.tobytes())
+                f.write(b'\0' * (-array.nbytes % _ALIGN))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return data_start + offset
+
+
+class MappedIndex:
+    """A read-only, memory-mapped index file of one ``kind``"""
+
+    kind = None
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, toc_size = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise IndexFormatError(f'{path} is not an AquaHub index')
+        toc = json.loads(self._mmap[_HEADER.size:_HEADER.size + toc_size])
+        if self.kind and toc['kind'] != self.kind:
+            raise IndexFormatError(f"{path} is a {toc['kind']} index, expected {self.kind}")
+        self.meta = toc['meta']
+        data_start = -(-(_HEADER.size + toc_size) // _ALIGN) * _ALIGN
+        self.arrays = {}
+        for name, section in toc['sections'].items():
+            dtype = np.dtype(section['dtype'])
+            count = int(np.prod(section['shape'], dtype=np.int64))
+            self.arrays[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=count, offset=data_start + section['offset']
+            ).reshape(section['shape'])
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def string(self, table, i):
+        """String ``i`` of the string table stored as ``<table>_offsets``/``<table>_blob``"""
+        offsets = self.arrays[f'{table}_offsets']
+        return self.arrays[f'{table}_blob'][int(offsets[i]):int(offsets[i + 1])].tobytes().decode('utf-8')
+
+    def memory_bytes(self):
+        return len(self._mmap)
+
+
+class IndexHolder:
+    """Opens ``index_class(path)`` on first use and again after a rebuild
+
+    The file is stat()ed at most every ``check_interval`` seconds; a
+    missing file makes get() return None.
+    """
+
+    def __init__(self, path, index_class, check_interval=5.0):
+        self.path = path
+        self.index_class = index_class
+        self.check_interval = check_interval
+        self.index = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        index = self.index
+        if index is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return index
+        with self._lock:
+            if self.index is None or time.monotonic() - self._checked_at >= self.check_interval:
+                try:
+                    stat = os.stat(self.path)
+                except FileNotFoundError:
+                    self.index = None
+                else:
+                    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                    if self.index is None or self.index.identity != identity:
+                        # The old map stays valid for readers still holding it
+                        self.index = self.index_class(self.path)
+                self._checked_at = time.monotonic()
+            return self.index
@@ -0,0 +1,135 @@
+"""
+AquaHub Pincode Directory
+Offline pincode lookups (post offices, district, state, centroid)
+
+Built from the same post office directory CSV as serviceability.py into
+one memory-mapped file (see mmap_index). Pincodes are six digits, so the
+index keeps a slot per possible pincode pointing at its record: a lookup
+is one array read, with no search and no external call.
+
+    python pincode_directory.py build all_india_pincode_directory.csv [--output data/pincodes.idx]
+"""
+
+import argparse
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+
+from mmap_index import IndexHolder, MappedIndex, pack_strings, write_index
+from serviceability import normalize_pincode, read_directory
+
+# Load environment variables
+load_dotenv()
+
+PINCODE_DIRECTORY_CONFIG = {
+    'index_path': os.getenv('PINCODE_DIRECTORY_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'pincodes.idx'
+    ),
+}
+
+MAX_PINCODE_BATCH = 1000
+
+# Pincodes run from 110001; slots cover every six-digit number from here
+FIRST_PINCODE = 100000
+PINCODE_SLOTS = 900000
+
+
+@dataclass(slots=True)
+class PincodeRecord:
+    pincode: str
+    district: str
+    state: str
+    latitude: float
+    longitude: float
+    post_offices: list
+
+
+def build_pincode_directory(entries, path=None):
+    """Write the directory for (Pincode, office names) entries; returns the count"""
+    entries = sorted(entries, key=lambda entry: entry[0].pincode)
+    districts, states = {}, {}
+    for pincode, _ in entries:
+        districts.setdefault(pincode.district or '', len(districts))
+        states.setdefault(pincode.state or '', len(states))
+
+    slots = np.full(PINCODE_SLOTS, -1, dtype=np.int32)
+    office_start = np.zeros(len(entries) + 1, dtype=np.uint32)
+    offices = []
+    for i, (pincode, names) in enumerate(entries):
+        slots[int(pincode.pincode) - FIRST_PINCODE] = i
+        offices.extend(names)
+        office_start[i + 1] = len(offices)
+
+    district_offsets, district_blob = pack_strings(districts)
+    state_offsets, state_blob = pack_strings(states)
+    office_offsets, office_blob = pack_strings(offices)
+    write_index(path or PINCODE_DIRECTORY_CONFIG['index_path'], PincodeDirectory.kind, {
+        'slots': slots,
+        'pincode': np.array([int(p.pincode) for p, _ in entries], dtype=np.uint32),
+        'district_id': np.array([districts[p.district or ''] for p, _ in entries], dtype=np.uint16),
+        'state_id': np.array([states[p.state or ''] for p, _ in entries], dtype=np.uint16),
+        'latitude': np.array([np.nan if p.latitude is None else p.latitude for p, _ in entries], dtype=np.float32),
+        'longitude': np.array([np.nan if p.longitude is None else p.longitude for p, _ in entries], dtype=np.float32),
+        'office_start': office_start,
+        'district_offsets': district_offsets, 'district_blob': district_blob,
+        'state_offsets': state_offsets, 'state_blob': state_blob,
+        'office_offsets': office_offsets, 'office_blob': office_blob,
+    }, meta={'pincodes': len(entries), 'post_offices': len(offices)})
+    return len(entries)
+
+
+class PincodeDirectory(MappedIndex):
+    """Memory-mapped pincode directory"""
+
+    kind = 'pincodes'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.size = self.meta['pincodes']
+
+    def lookup(self, pincode):
+        """The PincodeRecord of a pincode, or None when it is invalid or unknown"""
+        pincode = normalize_pincode(pincode)
+        if pincode is None:
+            return None
+        i = int(self['slots'][int(pincode) - FIRST_PINCODE])
+        if i < 0:
+            return None
+        start, end = int(self['office_start'][i]), int(self['office_start'][i + 1])
+        lat, lng = float(self['latitude'][i]), float(self['longitude'][i])
+        return PincodeRecord(
+            pincode,
+            self.string('district', int(self['district_id'][i])) or None,
+            self.string('state', int(self['state_id'][i])) or None,
+            None if math.isnan(lat) else round(lat, 5), None if math.isnan(lng) else round(lng, 5),
+            [self.string('office', j) for j in range(start, end)],
+        )
+
+
+pincode_directory = IndexHolder(PINCODE_DIRECTORY_CONFIG['index_path'], PincodeDirectory)
+
+
+def get_pincode_directory():
+    """The current pincode directory, or None when it has not been built"""
+    return pincode_directory.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the AquaHub offline pincode directory')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='build the directory from a post office CSV')
+    build.add_argument('path', help='CSV file, one row per post office')
+    build.add_argument('--output', default=PINCODE_DIRECTORY_CONFIG['index_path'])
+    args = parser.parse_args()
+
+    with open(args.path, newline='', encoding='utf-8') as f:
+        count = build_pincode_directory(read_directory(f), args.output)
+    print(f"📮 {count} pincodes written to {args.output} "
+          f"({os.path.getsize(args.output) / 2**20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
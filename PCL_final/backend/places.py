@@ -0,0 +1,286 @@
+"""
+AquaHub Place Autocomplete
+Offline as-you-type suggestions for Indian localities, areas and landmarks
+
+The index is built from a local gazetteer file into one memory-mapped
+file (see mmap_index). Every word of a place name starts a key
+("Koramangala 4th Block" is found from "kor", "4th" and "blo"), keys are
+stored sorted, and a query is a binary search for the range of keys with
+the typed prefix followed by a top-K over that range's precomputed
+scores. No external services are called.
+
+Gazetteers are either CSV files with a header (name, kind, district,
+state, pincode, latitude, longitude, population; the India Post office
+directory works as is) or a GeoNames country dump such as IN.txt:
+
+    python places.py build IN.txt [--output data/places.idx]
+"""
+
+import argparse
+import csv
+import math
+import os
+from bisect import bisect_left
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+
+from areas import area_key
+from mmap_index import IndexHolder, MappedIndex, pack_strings, write_index
+from serviceability import locality_name, normalize_pincode
+
+# Load environment variables
+load_dotenv()
+
+PLACES_CONFIG = {
+    'index_path': os.getenv('PLACES_INDEX_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'places.idx'
+    ),
+}
+
+DEFAULT_PLACE_RESULTS = 8
+MAX_PLACE_RESULTS = 20
+
+KINDS = ('locality', 'area', 'landmark')
+KIND_WEIGHTS = {'locality': 1.0, 'area': 0.9, 'landmark': 0.8}
+
+# Keys starting at a later word of the name rank below ones at its start
+LATER_WORD_PENALTY = 0.15
+EXACT_MATCH_BOOST = 1.0
+
+# Accepted CSV header spellings per column
+PLACE_COLUMNS = {
+    'name': ('name', 'place', 'officename', 'office_name', 'locality'),
+    'kind': ('kind', 'type', 'category'),
+    'district': ('district', 'districtname', 'city'),
+    'state': ('state', 'statename'),
+    'pincode': ('pincode', 'pin', 'postal_code'),
+    'latitude': ('latitude', 'lat'),
+    'longitude': ('longitude', 'lng', 'lon'),
+    'population': ('population', 'importance'),
+}
+
+# GeoNames feature classes: P populated places, A/L administrative and
+# named areas, S/T/H spots, buildings and natural landmarks
+GEONAMES_KINDS = {'P': 'locality', 'A': 'area', 'L': 'area', 'S': 'landmark', 'T': 'landmark', 'H': 'landmark'}
+GEONAMES_FIELDS = 19
+
+
+@dataclass(slots=True)
+class Place:
+    name: str
+    kind: str
+    district: str
+    state: str
+    pincode: str
+    latitude: float
+    longitude: float
+
+
+def _number(value, limit=None):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number) or (limit is not None and not -limit <= number <= limit):
+        return None
+    return number
+
+
+def read_gazetteer(lines):
+    """Yield (Place, population) from a gazetteer CSV or a GeoNames dump"""
+    lines = iter(lines)
+    first = next(lines, '')
+    if first.count('\t') == GEONAMES_FIELDS - 1:
+        yield from _read_geonames(first, lines)
+        return
+
+    reader = csv.DictReader(_chain(first, lines))
+    headers = {(h or '').strip().lower(): h for h in reader.fieldnames or []}
+    columns = {
+        column: next((headers[a] for a in aliases if a in headers), None)
+        for column, aliases in PLACE_COLUMNS.items()
+    }
+    if columns['name'] is None:
+        raise ValueError('Gazetteer has no name column')
+
+    def get(row, column):
+        header = columns[column]
+        return (row.get(header) or '').strip() if header else ''
+
+    for row in reader:
+        name = locality_name(get(row, 'name'))
+        if not area_key(name):
+            continue
+        kind = get(row, 'kind').lower()
+        yield Place(
+            name, kind if kind in KINDS else 'locality',
+            get(row, 'district') or None, get(row, 'state') or None,
+            normalize_pincode(get(row, 'pincode')),
+            _number(get(row, 'latitude'), 90), _number(get(row, 'longitude'), 180),
+        ), int(_number(get(row, 'population')) or 0)
+
+
+def _chain(first, lines):
+    yield first
+    yield from lines
+
+
+def _read_geonames(first, lines):
+    for line in _chain(first, lines):
+        fields = line.rstrip('\r\n').split('\t')
+        if len(fields) != GEONAMES_FIELDS or fields[6] not in GEONAMES_KINDS:
+            continue
+        if not area_key(fields[1]):
+            continue
+        yield Place(
+            fields[1], GEONAMES_KINDS[fields[6]], None, None, None,
+            _number(fields[4], 90), _number(fields[5], 180),
+        ), int(_number(fields[14]) or 0)
+
+
+def importance(place, population):
+    """Static rank of a place: its kind, then its population"""
+    return KIND_WEIGHTS[place.kind] + math.log10(1 + max(population, 0)) / 10
+
+
+def build_place_index(entries, path=None):
+    """Write the index for (Place, population) entries; returns (places, keys)
+
+    Duplicate places (same name, kind, district and state) keep the most
+    important one.
+    """
+    unique = {}
+    for place, population in entries:
+        score = importance(place, population)
+        identity = (area_key(place.name), place.kind, place.district, place.state)
+        if identity not in unique or score > unique[identity][0]:
+            unique[identity] = (score, place)
+    ranked = sorted(unique.values(), key=lambda item: (-item[0], item[1].name))
+    places = [place for _, place in ranked]
+
+    keys = []
+    for entry, (base, place) in enumerate(ranked):
+        words = area_key(place.name).split(' ')
+        for position in range(len(words)):
+            keys.append((' '.join(words[position:]).encode('utf-8'), entry,
+                         base - (LATER_WORD_PENALTY if position else 0.0)))
+    keys.sort()
+
+    key_offsets = np.zeros(len(keys) + 1, dtype=np.uint64)
+    np.cumsum([len(k[0]) for k in keys], out=key_offsets[1:])
+    record_offsets, record_blob = pack_strings(
+        '\x1f'.join((p.name, p.district or '', p.state or '', p.pincode or '')) for p in places
+    )
+    write_index(path or PLACES_CONFIG['index_path'], PlaceIndex.kind, {
+        'key_offsets': key_offsets,
+        'key_blob': np.frombuffer(b''.join(k[0] for k in keys), dtype=np.uint8),
+        'key_entry': np.array([k[1] for k in keys], dtype=np.uint32),
+        'key_score': np.array([k[2] for k in keys], dtype=np.float32),
+        'record_offsets': record_offsets,
+        'record_blob': record_blob,
+        'kind': np.array([KINDS.index(p.kind) for p in places], dtype=np.uint8),
+        'latitude': np.array([np.nan if p.latitude is None else p.latitude for p in places], dtype=np.float32),
+        'longitude': np.array([np.nan if p.longitude is None else p.longitude for p in places], dtype=np.float32),
+    }, meta={'places': len(places), 'keys': len(keys)})
+    return len(places), len(keys)
+
+
+class _Keys:
+    """Sequence view of the sorted key blob for bisect"""
+
+    __slots__ = ('offsets', 'blob')
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes()
+
+
+class PlaceIndex(MappedIndex):
+    """Memory-mapped autocomplete index over places"""
+
+    kind = 'places'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.keys = _Keys(self['key_offsets'], self['key_blob'])
+        self.size = self.meta['places']
+
+    def place(self, entry):
+        name, district, state, pincode = self.string('record', entry).split('\x1f')
+        lat, lng = float(self['latitude'][entry]), float(self['longitude'][entry])
+        return Place(
+            name, KINDS[self['kind'][entry]], district or None, state or None, pincode or None,
+            None if math.isnan(lat) else round(lat, 5), None if math.isnan(lng) else round(lng, 5),
+        )
+
+    def complete(self, query, limit=DEFAULT_PLACE_RESULTS):
+        """Places with a word starting with ``query``, best first"""
+        prefix = area_key(query or '').encode('utf-8')
+        if not prefix:
+            return []
+        lo = bisect_left(self.keys, prefix)
+        # No UTF-8 byte is 0xff, so this bounds every key starting with prefix
+        hi = bisect_left(self.keys, prefix + b'\xff', lo)
+        if lo == hi:
+            return []
+
+        # Keys equal to the query sort first in the range
+        exact_hi = bisect_left(self.keys, prefix + b'\0', lo, hi)
+
+        # Over-fetch: one place can own several matching keys
+        wanted = min(hi - lo, limit * 4)
+        scores = self['key_score'][lo:hi]
+        if hi - lo > wanted:
+            candidates = lo + np.argpartition(-scores, wanted - 1)[:wanted]
+            candidates = np.union1d(candidates, np.arange(lo, min(exact_hi, lo + wanted)))
+        else:
+            candidates = np.arange(lo, hi)
+
+        ranked = []
+        for i in candidates.tolist():
+            score = float(self['key_score'][i]) + (EXACT_MATCH_BOOST if i < exact_hi else 0.0)
+            ranked.append((-score, int(self['key_entry'][i])))
+        ranked.sort()
+
+        seen, places = set(), []
+        for _, entry in ranked:
+            if entry not in seen:
+                seen.add(entry)
+                places.append(self.place(entry))
+                if len(places) == limit:
+                    break
+        return places
+
+
+place_index = IndexHolder(PLACES_CONFIG['index_path'], PlaceIndex)
+
+
+def get_place_index():
+    """The current place index, or None when it has not been built"""
+    return place_index.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the AquaHub place autocomplete index')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='build the index from a gazetteer file')
+    build.add_argument('path', help='gazetteer CSV or GeoNames dump')
+    build.add_argument('--output', default=PLACES_CONFIG['index_path'])
+    args = parser.parse_args()
+
+    with open(args.path, newline='', encoding='utf-8') as f:
+        places, keys = build_place_index(read_gazetteer(f), args.output)
+    print(f"🗺️  {places} places, {keys} keys written to {args.output} "
+          f"({os.path.getsize(args.output) / 2**20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
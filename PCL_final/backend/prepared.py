@@ -0,0 +1,156 @@
+"""
+AquaHub Prepared Statements
+Named registry of hot queries, PREPAREd once per pooled connection
+
+Queries are written with psycopg2 ``%(name)s`` placeholders and declared
+once with register_query(). The first time a connection runs one it is
+PREPAREd server-side; later calls send only ``EXECUTE name (...)``, so
+Postgres skips parsing and planning.
+
+pgbouncer in transaction mode hands each transaction a different server
+connection, so session-level prepared statements cannot be relied on.
+Set DB_PREPARED_STATEMENTS=off there (or DB_PGBOUNCER_TRANSACTION_MODE=1)
+to send the plain SQL instead.
+"""
+
+import os
+import re
+import threading
+
+from psycopg2 import errors, extensions
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+PREPARE_ENABLED = (
+    os.getenv('DB_PREPARED_STATEMENTS', 'on').lower() not in ('0', 'off', 'false', 'no')
+    and os.getenv('DB_PGBOUNCER_TRANSACTION_MODE', '').lower() not in ('1', 'true', 'yes')
+)
+
+_PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+
+
+class PreparedQuery:
+    """A registered query with its positional ($n) form"""
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        self.param_names = []
+
+        def number(match):
+            param = match.group(1)
+            if param not in self.param_names:
+                self.param_names.append(param)
+            return '$%d' % (self.param_names.index(param) + 1)
+
+        self.prepare_sql = 'PREPARE %s AS %s' % (name, _PLACEHOLDER.sub(number, sql))
+        self.execute_sql = 'EXECUTE %s (%s)' % (name, ', '.join(['%s'] * len(self.param_names)))
+
+    def positional(self, params):
+        return [params[param] for param in self.param_names]
+
+
+_queries = {}
+_stats_lock = threading.Lock()
+_stats = {'prepares': 0, 'hits': 0, 'unprepared': 0, 'fallbacks': 0}
+_enabled = PREPARE_ENABLED
+
+
+def register_query(name, sql):
+    """Declare a hot query under ``name``; returns the name for convenience"""
+    if name in _queries and _queries[name].sql != sql:
+        raise ValueError(f'Prepared query {name} is already registered')
+    _queries[name] = PreparedQuery(name, sql)
+    return name
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+_MISMATCH = (errors.InvalidSqlStatementName, errors.DuplicatePreparedStatement)
+
+
+def _execute_recoverable(cur, sql, params=None, savepoint=True):
+    """Run ``sql`` so a prepared statement mismatch leaves the transaction usable
+
+    A statement that opens the transaction is simply rolled back when it
+    fails that way. Inside a transaction it runs under a savepoint, set in
+    the same round trip, and only the savepoint is rolled back; on success
+    the savepoint is left for the commit to free. With ``savepoint`` off a
+    statement inside a transaction runs as is.
+    """
+    conn = cur.connection
+    if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            cur.execute(sql, params)
+        except _MISMATCH:
+            conn.rollback()
+            raise
+        return
+
+    if not savepoint:
+        cur.execute(sql, params)
+        return
+
+    try:
+        cur.execute('SAVEPOINT execute_prepared; ' + sql, params)
+    except _MISMATCH:
+        # A second cursor keeps ``cur``'s state for the caller
+        with conn.cursor() as other:
+            other.execute('ROLLBACK TO SAVEPOINT execute_prepared')
+        raise
+
+
+def execute_prepared(cur, name, params):
+    """Run registered query ``name`` with a dict of ``params`` on ``cur``"""
+    global _enabled
+    query = _queries[name]
+    prepared = getattr(cur.connection, 'prepared_statements', None)
+
+    if not _enabled or prepared is None:
+        _count('unprepared')
+        cur.execute(query.sql, params)
+        return
+
+    # Only the PREPARE and first EXECUTE of a query on a connection pay for
+    # a savepoint; that is where a transaction-mode pooler shows up
+    first_use = name not in prepared
+    try:
+        if first_use:
+            try:
+                _execute_recoverable(cur, query.prepare_sql)
+            except errors.DuplicatePreparedStatement:
+                # Already prepared in this session; only the bookkeeping
+                # missed it
+                pass
+            prepared.add(name)
+            _count('prepares')
+        else:
+            _count('hits')
+        _execute_recoverable(cur, query.execute_sql, query.positional(params), savepoint=first_use)
+    except errors.InvalidSqlStatementName:
+        # The server session lacks what this connection prepared, which is
+        # what a transaction-mode pooler in front of us looks like. Stop
+        # preparing for the rest of this process and answer this call
+        # with the plain SQL, unless it failed without a savepoint and
+        # took its transaction down with it.
+        _enabled = False
+        _count('fallbacks')
+        if cur.connection.get_transaction_status() == extensions.TRANSACTION_STATUS_INERROR:
+            raise
+        cur.execute(query.sql, params)
+
+
+def stats():
+    """Prepare/hit counters and the resulting plan-cache hit rate"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    executions = snapshot['prepares'] + snapshot['hits']
+    snapshot['enabled'] = _enabled
+    snapshot['registered'] = sorted(_queries)
+    snapshot['hit_rate'] = snapshot['hits'] / executions if executions else 0.0
+    return snapshot
@@ -0,0 +1,285 @@
+"""
+AquaHub Vendor Ranking
+Top-K "best vendor services for this address" per pincode and water type
+
+Candidates are a pincode's serviceable services (pincode_serviceability).
+Each is scored on price per litre, distance from the vendor's depot to the
+pincode centroid, vendor rating and estimated delivery time, with the
+weights in RANKING_CONFIG. Price, distance and delivery time are scaled
+against the other candidates of the same pincode and water type (best 1,
+worst 0); ratings are shrunk towards RATING_PRIOR so a single 5-star
+review does not outrank a long track record.
+
+Only the top RANKING_TOP_K of each pincode and water type are stored, in
+pincode_rankings, so the dashboard's default listing is a K-row read.
+Writes queue the pincodes they affect in ranking_queue (database triggers)
+and refresh_rankings() re-scores just those. The API re-ranks a single
+batch after its own writes; the watcher drains whatever is left:
+
+    python ranking.py refresh [--watch 30]
+    python ranking.py rebuild       # after changing the weights
+"""
+
+import argparse
+import math
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+from distances import pairwise_km
+from prepared import execute_prepared, register_query
+from vendor_search import normalize_water_type
+
+# Load environment variables
+load_dotenv()
+
+RANKING_CONFIG = {
+    'weights': {
+        'price': float(os.getenv('RANKING_WEIGHT_PRICE') or 0.4),
+        'distance': float(os.getenv('RANKING_WEIGHT_DISTANCE') or 0.2),
+        'rating': float(os.getenv('RANKING_WEIGHT_RATING') or 0.25),
+        'eta': float(os.getenv('RANKING_WEIGHT_ETA') or 0.15),
+    },
+    'top_k': int(os.getenv('RANKING_TOP_K') or 10),
+    'speed_kmh': float(os.getenv('RANKING_SPEED_KMH') or 25),
+    'batch_size': int(os.getenv('RANKING_BATCH_SIZE') or 500),
+}
+
+DEFAULT_DISPATCH_MINUTES = 60
+
+# Bayesian average: every vendor starts with RATING_PRIOR_WEIGHT ratings
+# of RATING_PRIOR
+RATING_PRIOR = 3.5
+RATING_PRIOR_WEIGHT = 5
+
+# Candidate rows: (pincode, water_type, service_id, vendor_id, price_per_liter,
+# vendor lat, vendor lng, pincode lat, pincode lng, delivery_radius_km,
+# rating_total, rating_count, dispatch_minutes)
+RANKING_CANDIDATES_SQL = """
+    SELECT ps.pincode, vs.water_type, vs.id, vs.vendor_id, vs.price_per_liter,
+           vp.latitude, vp.longitude, p.latitude, p.longitude,
+           COALESCE(vp.delivery_radius_km, 50), vp.rating_total, vp.rating_count,
+           vp.dispatch_minutes
+    FROM pincode_serviceability ps
+    JOIN pincodes p ON p.pincode = ps.pincode
+    JOIN vendor_services vs ON vs.id = ps.service_id
+    JOIN vendor_profiles vp ON vp.id = ps.vendor_id
+    WHERE ps.pincode = ANY (%(pincodes)s)
+"""
+
+# Claims a batch of queued pincodes; SKIP LOCKED lets several refreshers
+# drain the queue side by side, and a failed refresh rolls the claim back.
+CLAIM_RANKING_QUEUE_SQL = """
+    DELETE FROM ranking_queue
+    WHERE pincode IN (
+        SELECT pincode FROM ranking_queue
+        ORDER BY queued_at
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING pincode
+"""
+
+TOP_SERVICES_SQL = """
+    SELECT r.rank, r.service_id, r.vendor_id, vp.business_name, vp.city, vs.service_name,
+           vs.water_type, vs.tanker_capacity, vs.price_per_liter, vp.rating_total,
+           vp.rating_count, r.distance_km, r.eta_minutes, r.score
+    FROM pincode_rankings r
+    JOIN vendor_services vs ON vs.id = r.service_id
+    JOIN vendor_profiles vp ON vp.id = r.vendor_id
+    WHERE r.pincode = %(pincode)s AND r.water_type = %(water_type)s
+    ORDER BY r.rank
+    LIMIT %(limit)s
+"""
+register_query('top_services', TOP_SERVICES_SQL)
+
+RATE_VENDOR_SQL = """
+    UPDATE vendor_profiles
+    SET rating_total = rating_total + %(rating)s, rating_count = rating_count + 1
+    WHERE id = %(vendor_id)s
+    RETURNING rating_total, rating_count
+"""
+
+
+@dataclass(slots=True)
+class RankedService:
+    """One entry of a pincode's ranked listing"""
+
+    rank: int
+    service_id: str
+    vendor_id: str
+    business_name: str
+    city: str
+    service_name: str
+    water_type: str
+    tanker_capacity: int
+    price_per_liter: float
+    tanker_price: float
+    rating: float
+    rating_count: int
+    distance_km: float
+    eta_minutes: int
+    score: float
+
+
+def average_rating(total, count):
+    """Mean star rating, or None without ratings"""
+    return round(total / count, 2) if count else None
+
+
+def validate_rating(value):
+    """The rating as an int from 1 to 5, or None"""
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value if 1 <= value <= 5 else None
+
+
+def _lower_is_better(values):
+    """Scale values to 1 (lowest) .. 0 (highest); missing values score 0"""
+    known = [v for v in values if v is not None]
+    if not known:
+        return [0.0] * len(values)
+    low, high = min(known), max(known)
+    if high == low:
+        return [0.0 if v is None else 1.0 for v in values]
+    return [0.0 if v is None else (high - v) / (high - low) for v in values]
+
+
+def _score_group(candidates, weights):
+    """Score one pincode/water type group; returns [(score, candidate)]"""
+    price = _lower_is_better([c['price'] for c in candidates])
+    distance = _lower_is_better([c['distance_km'] for c in candidates])
+    eta = _lower_is_better([c['eta_minutes'] for c in candidates])
+    total_weight = sum(weights.values()) or 1.0
+    scored = []
+    for i, c in enumerate(candidates):
+        score = (weights['price'] * price[i] + weights['distance'] * distance[i]
+                 + weights['rating'] * c['rating'] + weights['eta'] * eta[i]) / total_weight
+        scored.append((round(score, 4), c))
+    return scored
+
+
+def rank_candidates(rows, config=None):
+    """Turn RANKING_CANDIDATES_SQL rows into pincode_rankings rows
+
+    Returns (pincode, water_type, rank, service_id, vendor_id, score,
+    distance_km, eta_minutes) tuples, top_k per pincode and water type.
+    """
+    config = config or RANKING_CONFIG
+    rows = list(rows)
+    groups = {}
+    # Every depot-to-centroid distance in one pass; rows served by area
+    # name without a located depot come out NaN
+    coordinates = np.array([
+        [np.nan if value is None else float(value) for value in row[5:9]] for row in rows
+    ], dtype=np.float64).reshape(-1, 4)
+    distances = pairwise_km(coordinates[:, 0], coordinates[:, 1], coordinates[:, 2], coordinates[:, 3])
+    for (pincode, water_type, service_id, vendor_id, price, v_lat, v_lng, p_lat, p_lng,
+         radius_km, rating_total, rating_count, dispatch_minutes), distance_km in zip(rows, distances.tolist()):
+        if math.isnan(distance_km):
+            # Assume the far edge of the delivery radius
+            distance_km = float(radius_km)
+        if dispatch_minutes is None:
+            dispatch_minutes = DEFAULT_DISPATCH_MINUTES
+        rating = ((rating_total or 0) + RATING_PRIOR * RATING_PRIOR_WEIGHT) / \
+            ((rating_count or 0) + RATING_PRIOR_WEIGHT)
+        groups.setdefault((pincode, normalize_water_type(water_type)), []).append({
+            'service_id': str(service_id), 'vendor_id': str(vendor_id),
+            'price': None if price is None else float(price),
+            'distance_km': distance_km,
+            'eta_minutes': dispatch_minutes + distance_km / config['speed_kmh'] * 60,
+            'rating': (rating - 1) / 4,
+        })
+
+    rankings = []
+    for (pincode, water_type), candidates in groups.items():
+        scored = _score_group(candidates, config['weights'])
+        scored.sort(key=lambda item: (
+            -item[0], math.inf if item[1]['price'] is None else item[1]['price'],
+            item[1]['service_id']
+        ))
+        for rank, (score, c) in enumerate(scored[:config['top_k']], 1):
+            rankings.append((
+                pincode, water_type, rank, c['service_id'], c['vendor_id'], score,
+                round(c['distance_km'], 2), int(round(c['eta_minutes'])),
+            ))
+    return rankings
+
+
+def ranked_service(row):
+    """Build a RankedService from a TOP_SERVICES_SQL row"""
+    (rank, service_id, vendor_id, business_name, city, service_name, water_type,
+     capacity, price, rating_total, rating_count, distance_km, eta_minutes, score) = row
+    price = None if price is None else float(price)
+    return RankedService(
+        rank, str(service_id), str(vendor_id), business_name, city, service_name, water_type,
+        capacity, price, None if price is None else round(price * capacity, 2),
+        average_rating(rating_total, rating_count), rating_count,
+        distance_km, eta_minutes, score,
+    )
+
+
+def refresh_ranking_batch(conn, batch_size=None):
+    """Re-rank one batch of queued pincodes; returns how many were claimed"""
+    with conn.cursor() as cur:
+        cur.execute(CLAIM_RANKING_QUEUE_SQL, {'limit': batch_size or RANKING_CONFIG['batch_size']})
+        pincodes = [row[0] for row in cur.fetchall()]
+        if not pincodes:
+            return 0
+        cur.execute(RANKING_CANDIDATES_SQL, {'pincodes': pincodes})
+        rankings = rank_candidates(cur.fetchall())
+        cur.execute('DELETE FROM pincode_rankings WHERE pincode = ANY (%s)', (pincodes,))
+        if rankings:
+            execute_values(cur, """
+                INSERT INTO pincode_rankings
+                (pincode, water_type, rank, service_id, vendor_id, score, distance_km, eta_minutes)
+                VALUES %s
+            """, rankings)
+    return len(pincodes)
+
+
+def fetch_top_services(conn, pincode, water_type, limit):
+    """The ranked services of a pincode and water type, best first"""
+    with conn.cursor() as cur:
+        execute_prepared(cur, 'top_services', {
+            'pincode': pincode, 'water_type': normalize_water_type(water_type), 'limit': limit
+        })
+        return [ranked_service(row) for row in cur]
+
+
+def rate_vendor(conn, vendor_id, rating):
+    """Add a rating; returns (average, count) or None for an unknown vendor"""
+    with conn.cursor() as cur:
+        cur.execute(RATE_VENDOR_SQL, {'vendor_id': vendor_id, 'rating': rating})
+        row = cur.fetchone()
+    return (average_rating(*row), row[1]) if row else None
+
+
+def main():
+    from storage import get_storage
+
+    parser = argparse.ArgumentParser(description='Refresh AquaHub pincode rankings')
+    parser.add_argument('command', choices=('refresh', 'rebuild'))
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='keep refreshing, polling the queue this often')
+    args = parser.parse_args()
+
+    storage = get_storage()
+    if args.command == 'rebuild':
+        print(f"🗂️  {storage.queue_all_rankings()} pincodes queued")
+    while True:
+        started = time.perf_counter()
+        count = storage.refresh_rankings()
+        if count or not args.watch:
+            print(f"🏆 {count} pincodes re-ranked in {time.perf_counter() - started:.2f} s")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == '__main__':
+    main()
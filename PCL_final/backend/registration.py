@@ -0,0 +1,196 @@
+"""
+AquaHub Registration Queries
+Single-statement customer and vendor signups
+"""
+
+from prepared import execute_prepared, register_query
+
+CUSTOMER_REQUIRED_FIELDS = ['email', 'password', 'firstName', 'lastName', 'phone', 'address', 'city', 'state', 'postalCode']
+VENDOR_REQUIRED_FIELDS = ['email', 'password', 'businessName', 'contactPersonName', 'phone', 'businessAddress', 'city', 'state', 'postalCode']
+
+# Larger radii are rejected here and clamped by the vendor search index,
+# which registers a vendor in every cell its circle's bounding box touches
+MAX_DELIVERY_RADIUS_KM = 200
+
+# Each signup is one statement: the users INSERT relies on the UNIQUE
+# constraint on users.email instead of a SELECT pre-check, and the profile
+# rows hang off its RETURNING clause. When the email is already taken the
+# first CTE returns nothing, so none of the dependent INSERTs run and the
+# statement yields no row.
+
+CUSTOMER_SIGNUP_SQL = """
+    WITH new_user AS (
+        INSERT INTO users (email, password_hash, user_type)
+        VALUES (%(email)s, %(password_hash)s, 'customer')
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id
+    ), new_profile AS (
+        INSERT INTO customer_profiles
+        (user_id, first_name, last_name, phone, date_of_birth, gender,
+         address_line1, address_line2, city, state, postal_code, country,
+         emergency_contact_name, emergency_contact_phone)
+        SELECT id, %(first_name)s, %(last_name)s, %(phone)s, %(date_of_birth)s::date,
+               %(gender)s, %(address_line1)s, %(address_line2)s, %(city)s, %(state)s,
+               %(postal_code)s, %(country)s, %(emergency_contact_name)s,
+               %(emergency_contact_phone)s
+        FROM new_user
+        RETURNING id
+    ), new_requirements AS (
+        INSERT INTO customer_water_requirements
+        (customer_id, required_quantity, frequency, preferred_delivery_days,
+         preferred_time_slots, water_type, storage_capacity, special_instructions)
+        SELECT id, %(required_quantity)s::integer, %(frequency)s,
+               %(preferred_delivery_days)s::text[], %(preferred_time_slots)s::text[],
+               %(water_type)s, %(storage_capacity)s::integer, %(special_instructions)s
+        FROM new_profile
+        WHERE %(has_requirements)s
+        RETURNING id
+    )
+    SELECT new_user.id AS user_id, new_profile.id AS profile_id
+    FROM new_user, new_profile
+"""
+register_query('customer_signup', CUSTOMER_SIGNUP_SQL)
+
+VENDOR_SIGNUP_SQL = """
+    WITH new_user AS (
+        INSERT INTO users (email, password_hash, user_type)
+        VALUES (%(email)s, %(password_hash)s, 'vendor')
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id
+    ), new_profile AS (
+        INSERT INTO vendor_profiles
+        (user_id, business_name, contact_person_name, phone, alternate_phone,
+         business_address_line1, business_address_line2, city, state, postal_code, country,
+         business_type, years_in_business, license_number, tax_id,
+         service_areas, tanker_capacity, delivery_radius_km, latitude, longitude)
+        SELECT id, %(business_name)s, %(contact_person_name)s, %(phone)s, %(alternate_phone)s,
+               %(business_address_line1)s, %(business_address_line2)s, %(city)s, %(state)s,
+               %(postal_code)s, %(country)s, %(business_type)s,
+               %(years_in_business)s::integer, %(license_number)s, %(tax_id)s,
+               %(service_areas)s::text[], %(tanker_capacity)s::integer[],
+               %(delivery_radius_km)s::integer, %(latitude)s::double precision,
+               %(longitude)s::double precision
+        FROM new_user
+        RETURNING id
+    )
+    SELECT new_user.id AS user_id, new_profile.id AS profile_id
+    FROM new_user, new_profile
+"""
+register_query('vendor_signup', VENDOR_SIGNUP_SQL)
+
+
+def customer_signup_params(data, password_hash):
+    """Map a customer registration payload onto CUSTOMER_SIGNUP_SQL parameters"""
+    has_requirements = 'waterRequirements' in data
+    reqs = data.get('waterRequirements') or {}
+    return {
+        'email': data['email'],
+        'password_hash': password_hash,
+        'first_name': data['firstName'],
+        'last_name': data['lastName'],
+        'phone': data['phone'],
+        'date_of_birth': data.get('dateOfBirth'),
+        'gender': data.get('gender'),
+        'address_line1': data['address'],
+        'address_line2': data.get('address2', ''),
+        'city': data['city'],
+        'state': data['state'],
+        'postal_code': data['postalCode'],
+        'country': data.get('country', 'India'),
+        'emergency_contact_name': data.get('emergencyContactName', ''),
+        'emergency_contact_phone': data.get('emergencyContactPhone', ''),
+        'has_requirements': has_requirements,
+        'required_quantity': reqs.get('quantity', 5000),
+        'frequency': reqs.get('frequency', 'weekly'),
+        'preferred_delivery_days': reqs.get('preferredDays', []),
+        'preferred_time_slots': reqs.get('preferredTimeSlots', []),
+        'water_type': reqs.get('waterType', 'potable'),
+        'storage_capacity': reqs.get('storageCapacity'),
+        'special_instructions': reqs.get('specialInstructions', ''),
+    }
+
+
+def vendor_signup_params(data, password_hash):
+    """Map a vendor registration payload onto VENDOR_SIGNUP_SQL parameters"""
+    return {
+        'email': data['email'],
+        'password_hash': password_hash,
+        'business_name': data['businessName'],
+        'contact_person_name': data['contactPersonName'],
+        'phone': data['phone'],
+        'alternate_phone': data.get('alternatePhone', ''),
+        'business_address_line1': data['businessAddress'],
+        'business_address_line2': data.get('businessAddress2', ''),
+        'city': data['city'],
+        'state': data['state'],
+        'postal_code': data['postalCode'],
+        'country': data.get('country', 'India'),
+        'business_type': data.get('businessType', ''),
+        'years_in_business': data.get('yearsInBusiness'),
+        'license_number': data.get('licenseNumber', ''),
+        'tax_id': data.get('taxId', ''),
+        'service_areas': data.get('serviceAreas', []),
+        'tanker_capacity': data.get('tankerCapacity', []),
+        'delivery_radius_km': data.get('deliveryRadius', 50),
+        'latitude': data.get('latitude'),
+        'longitude': data.get('longitude'),
+    }
+
+
+def validate_delivery_radius(data):
+    """Return an error message for a bad vendor delivery radius, or None"""
+    radius = data.get('deliveryRadius')
+    if radius is None:
+        return None
+    try:
+        if isinstance(radius, bool) or float(radius) != int(radius):
+            raise ValueError(radius)
+        radius = int(radius)
+    except (TypeError, ValueError):
+        return 'deliveryRadius must be a whole number of km'
+    if not 1 <= radius <= MAX_DELIVERY_RADIUS_KM:
+        return f'deliveryRadius must be between 1 and {MAX_DELIVERY_RADIUS_KM} km'
+    return None
+
+
+def validate_location(data):
+    """Return an error message for bad vendor coordinates, or None
+
+    Coordinates are optional, but must come as a valid pair.
+    """
+    lat, lng = data.get('latitude'), data.get('longitude')
+    if lat is None and lng is None:
+        return None
+    try:
+        if isinstance(lat, bool) or isinstance(lng, bool):
+            raise TypeError(lat, lng)
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return 'latitude and longitude must both be numbers'
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return 'latitude/longitude out of range'
+    return None
+
+
+def create_customer(cur, data, password_hash):
+    """Insert user, profile and requirements in one round trip
+
+    Returns (user_id, profile_id), or None if the email is already registered.
+    """
+    execute_prepared(cur, 'customer_signup', customer_signup_params(data, password_hash))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return str(row[0]), str(row[1])
+
+
+def create_vendor(cur, data, password_hash):
+    """Insert user and vendor profile in one round trip
+
+    Returns (user_id, profile_id), or None if the email is already registered.
+    """
+    execute_prepared(cur, 'vendor_signup', vendor_signup_params(data, password_hash))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return str(row[0]), str(row[1])
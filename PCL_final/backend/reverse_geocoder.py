@@ -0,0 +1,347 @@
+"""
+AquaHub Offline Reverse Geocoder
+Nearest locality, city, state and pincode of a coordinate, without external calls
+
+Localities and areas from the gazetteer (the same files places.py reads)
+and pincode centroids from the post office directory are indexed in one
+memory-mapped file (see mmap_index) as k-d trees over unit vectors on the
+sphere, where straight-line distance orders points like great-circle
+distance does. The trees are implicit and balanced: a node's children
+are at 2i + 1 and 2i + 2, and every leaf holds LEAF_SIZE points or fewer.
+
+A batch of queries is answered together in numpy: every query descends
+to its leaf, whose nearest point bounds the answer's distance. A query
+whose bounding ball lies inside its leaf's cell is done; the others
+descend again into every cell the ball reaches and take the nearest of
+those leaves' points. Batches of a few queries, where numpy's per-call
+overhead would dominate, walk the tree one query at a time instead.
+
+    python reverse_geocoder.py build IN.txt [--pincodes directory.csv] [--output data/localities.idx]
+"""
+
+import argparse
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+
+from distances import EARTH_RADIUS_KM
+from mmap_index import IndexHolder, MappedIndex, pack_strings, write_index
+from places import read_gazetteer
+from serviceability import read_directory
+
+# Load environment variables
+load_dotenv()
+
+REVERSE_GEOCODER_CONFIG = {
+    'index_path': os.getenv('REVERSE_GEOCODER_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'localities.idx'
+    ),
+    # Nothing farther than this is reported as "nearest"
+    'max_km': float(os.getenv('REVERSE_GEOCODER_MAX_KM') or 25),
+}
+
+MAX_REVERSE_BATCH = 1000
+LEAF_SIZE = 16
+
+# Batches up to this size are searched one query at a time
+SCALAR_BATCH = 4
+
+# Widens query balls past float rounding, well under a metre on the unit sphere
+BALL_SLACK = 1e-9
+
+# Landmarks are not an address's area
+LOCALITY_KINDS = ('locality', 'area')
+
+
+@dataclass(slots=True)
+class Location:
+    area: str
+    city: str
+    state: str
+    pincode: str
+    latitude: float
+    longitude: float
+    distance_km: float
+
+
+def unit_vectors(lat, lng):
+    """(n, 3) points on the unit sphere for degree coordinates"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.radians(np.asarray(lng, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord):
+    """Great-circle distance for a straight-line distance between unit vectors"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+def build_kdtree(points, leaf_size=LEAF_SIZE):
+    """Implicit k-d tree over (n, 3) points
+
+    Returns the point order (tree position -> input row) and the tree's
+    arrays: split dimension and value per internal node, each leaf's
+    start in that order, and each leaf's cell bounds.
+    """
+    count = len(points)
+    depth = math.ceil(math.log2(count / leaf_size)) if count > leaf_size else 0
+    internal = 2 ** depth - 1
+    order = np.arange(count)
+    split_dim = np.zeros(internal, dtype=np.uint8)
+    split_value = np.zeros(internal, dtype=points.dtype)
+    cell_lo = np.full((2 * internal + 1, 3), -np.inf, dtype=points.dtype)
+    cell_hi = np.full((2 * internal + 1, 3), np.inf, dtype=points.dtype)
+
+    ranges = [(0, count)]
+    for level in range(depth):
+        children = []
+        for i, (lo, hi) in enumerate(ranges):
+            node = 2 ** level - 1 + i
+            block = points[order[lo:hi]]
+            # Split the widest dimension at its median; lo < mid < hi at every level
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (lo + hi) // 2
+            order[lo:hi] = order[lo:hi][np.argpartition(block[:, dim], mid - lo)]
+            split_dim[node] = dim
+            split_value[node] = points[order[mid], dim]
+            for child in (2 * node + 1, 2 * node + 2):
+                cell_lo[child], cell_hi[child] = cell_lo[node], cell_hi[node]
+            cell_hi[2 * node + 1, dim] = split_value[node]
+            cell_lo[2 * node + 2, dim] = split_value[node]
+            children += [(lo, mid), (mid, hi)]
+        ranges = children
+
+    leaf_start = np.array([lo for lo, _ in ranges] + [count], dtype=np.int64)
+    return order, {
+        'split_dim': split_dim, 'split_value': split_value, 'leaf_start': leaf_start,
+        'cell_lo': cell_lo[internal:], 'cell_hi': cell_hi[internal:],
+    }
+
+
+class KDTree:
+    """Nearest-neighbour queries on a tree stored as ``<prefix>_*`` index sections"""
+
+    def __init__(self, index, prefix):
+        self.points = index[f'{prefix}_points']
+        self.split_dim = index[f'{prefix}_split_dim']
+        self.split_value = index[f'{prefix}_split_value']
+        self.leaf_start = index[f'{prefix}_leaf_start']
+        self.cell_lo = index[f'{prefix}_cell_lo']
+        self.cell_hi = index[f'{prefix}_cell_hi']
+        self.internal = len(self.split_dim)
+        self.depth = int(math.log2(self.internal + 1))
+        self._nodes = None
+
+    def nearest(self, queries):
+        """Tree position and straight-line distance of the point nearest each (m, 3) query"""
+        if len(queries) <= SCALAR_BATCH:
+            found = [self._nearest_one(query) for query in queries.tolist()]
+            return (np.array([f[0] for f in found], dtype=np.int64),
+                    np.sqrt(np.array([f[1] for f in found], dtype=np.float64)))
+
+        rows = np.arange(len(queries))
+        node = np.zeros(len(queries), dtype=np.int64)
+        for _ in range(self.depth):
+            right = queries[rows, self.split_dim[node]] >= self.split_value[node]
+            node = 2 * node + 1 + right
+        leaf = node - self.internal
+
+        best, best_d2 = self._nearest_in_leaves(queries, leaf)
+
+        # Done where the ball to the best leaf point lies within the leaf's cell
+        radius = np.sqrt(best_d2) + BALL_SLACK
+        inside = ((queries - radius[:, None] >= self.cell_lo[leaf])
+                  & (queries + radius[:, None] <= self.cell_hi[leaf])).all(axis=1)
+        crossing = np.flatnonzero(~inside)
+        if len(crossing):
+            best[crossing], best_d2[crossing] = self._nearest_in_ball(queries[crossing], radius[crossing])
+        return best, np.sqrt(best_d2)
+
+    def _nearest_one(self, query):
+        """(tree position, squared distance) of the point nearest one query, in plain Python"""
+        if self._nodes is None:
+            self._nodes = (self.split_dim.tolist(), self.split_value.tolist(), self.leaf_start.tolist())
+        split_dim, split_value, leaf_start = self._nodes
+        best, best_d2 = -1, math.inf
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= best_d2:
+                continue
+            if node >= self.internal:
+                lo, hi = leaf_start[node - self.internal], leaf_start[node - self.internal + 1]
+                for position, point in enumerate(self.points[lo:hi].tolist(), lo):
+                    d2 = ((point[0] - query[0]) ** 2 + (point[1] - query[1]) ** 2
+                          + (point[2] - query[2]) ** 2)
+                    if d2 < best_d2:
+                        best, best_d2 = position, d2
+                continue
+            diff = query[split_dim[node]] - split_value[node]
+            near, far = (2 * node + 2, 2 * node + 1) if diff >= 0 else (2 * node + 1, 2 * node + 2)
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        return best, best_d2
+
+    def _nearest_in_leaves(self, queries, leaf):
+        """Nearest point of leaf[i] to queries[i], as (tree position, squared distance)"""
+        rows = np.arange(len(queries))
+        start, end = self.leaf_start[leaf], self.leaf_start[leaf + 1]
+        candidates = start[:, None] + np.arange(int((end - start).max()))
+        outside = candidates >= end[:, None]
+        candidates[outside] = start[np.nonzero(outside)[0]]
+        d2 = ((self.points[candidates] - queries[:, None, :]) ** 2).sum(axis=2)
+        nearest = d2.argmin(axis=1)
+        return candidates[rows, nearest], d2[rows, nearest]
+
+    def _nearest_in_ball(self, queries, radius):
+        """Nearest point to each query over every leaf whose cell meets its ball"""
+        owner = np.arange(len(queries))
+        node = np.zeros(len(queries), dtype=np.int64)
+        for _ in range(self.depth):
+            coordinate = queries[owner, self.split_dim[node]]
+            value = self.split_value[node]
+            left = coordinate - radius[owner] <= value
+            right = coordinate + radius[owner] >= value
+            owner = np.concatenate([owner[left], owner[right]])
+            node = np.concatenate([2 * node[left] + 1, 2 * node[right] + 2])
+
+        positions, d2 = self._nearest_in_leaves(queries[owner], node - self.internal)
+        # Per query, the (owner, distance)-sorted first pair is the nearest
+        ranked = np.lexsort((d2, owner))
+        first = ranked[np.r_[True, owner[ranked][1:] != owner[ranked][:-1]]]
+        return positions[first], d2[first]
+
+
+def _tree_sections(prefix, lat, lng):
+    """Index sections of a tree over coordinates, and its point order"""
+    points = unit_vectors(lat, lng).astype(np.float32)
+    order, tree = build_kdtree(points)
+    sections = {f'{prefix}_{name}': array for name, array in tree.items()}
+    sections[f'{prefix}_points'] = points[order]
+    sections[f'{prefix}_latitude'] = np.asarray(lat, dtype=np.float32)[order]
+    sections[f'{prefix}_longitude'] = np.asarray(lng, dtype=np.float32)[order]
+    return sections, order
+
+
+def build_reverse_index(places, pincodes=(), path=None):
+    """Write the index for (Place, population) and (Pincode, office names) entries
+
+    Landmarks and entries without coordinates are left out. Returns the
+    number of (places, pincodes) indexed.
+    """
+    places = [
+        place for place, _ in places
+        if place.kind in LOCALITY_KINDS and place.latitude is not None and place.longitude is not None
+    ]
+    pincodes = [
+        pincode for pincode, _ in pincodes
+        if pincode.latitude is not None and pincode.longitude is not None
+    ]
+
+    arrays = {}
+    for prefix, entries, record in (
+        ('place', places, lambda p: (p.name, p.district or '', p.state or '', p.pincode or '')),
+        ('pincode', pincodes, lambda p: (p.district or '', p.state or '', p.pincode)),
+    ):
+        if not entries:
+            continue
+        sections, order = _tree_sections(
+            prefix, [e.latitude for e in entries], [e.longitude for e in entries]
+        )
+        arrays.update(sections)
+        offsets, blob = pack_strings('\x1f'.join(record(entries[i])) for i in order.tolist())
+        arrays[f'{prefix}_record_offsets'], arrays[f'{prefix}_record_blob'] = offsets, blob
+
+    write_index(path or REVERSE_GEOCODER_CONFIG['index_path'], ReverseGeocoder.kind, arrays,
+                meta={'places': len(places), 'pincodes': len(pincodes)})
+    return len(places), len(pincodes)
+
+
+class ReverseGeocoder(MappedIndex):
+    """Memory-mapped nearest-locality and nearest-pincode index"""
+
+    kind = 'localities'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.places = KDTree(self, 'place') if self.meta['places'] else None
+        self.pincodes = KDTree(self, 'pincode') if self.meta['pincodes'] else None
+
+    def _nearest(self, tree, queries, max_km):
+        if tree is None:
+            return np.full(len(queries), -1), np.full(len(queries), np.inf)
+        positions, chords = tree.nearest(queries)
+        distances = chord_to_km(chords)
+        return np.where(distances <= max_km, positions, -1), distances
+
+    def locate(self, points, max_km=None):
+        """Location of each (lat, lng) point, or None when nothing indexed is within ``max_km``
+
+        The area is the nearest locality; city, state and pincode come from
+        it or, where the gazetteer lacks them, from the nearest pincode.
+        """
+        max_km = REVERSE_GEOCODER_CONFIG['max_km'] if max_km is None else max_km
+        if not len(points):
+            return []
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        queries = unit_vectors(points[:, 0], points[:, 1])
+        place, place_km = self._nearest(self.places, queries, max_km)
+        pincode, pincode_km = self._nearest(self.pincodes, queries, max_km)
+
+        locations = []
+        for i in range(len(points)):
+            area = city = state = code = ''
+            if place[i] >= 0:
+                area, city, state, code = self.string('place_record', place[i]).split('\x1f')
+                prefix, j, km = 'place', place[i], place_km[i]
+            if pincode[i] >= 0:
+                pincode_city, pincode_state, pincode_code = self.string('pincode_record', pincode[i]).split('\x1f')
+                city, state, code = city or pincode_city, state or pincode_state, code or pincode_code
+                if place[i] < 0:
+                    prefix, j, km = 'pincode', pincode[i], pincode_km[i]
+            elif place[i] < 0:
+                locations.append(None)
+                continue
+            locations.append(Location(
+                area or None, city or None, state or None, code or None,
+                round(float(self[f'{prefix}_latitude'][j]), 5),
+                round(float(self[f'{prefix}_longitude'][j]), 5),
+                round(float(km), 3),
+            ))
+        return locations
+
+
+reverse_geocoder = IndexHolder(REVERSE_GEOCODER_CONFIG['index_path'], ReverseGeocoder)
+
+
+def get_reverse_geocoder():
+    """The current reverse geocoding index, or None when it has not been built"""
+    return reverse_geocoder.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the AquaHub offline reverse geocoding index')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='build the index from a gazetteer and a post office CSV')
+    build.add_argument('path', help='gazetteer CSV or GeoNames dump')
+    build.add_argument('--pincodes', help='CSV file, one row per post office')
+    build.add_argument('--output', default=REVERSE_GEOCODER_CONFIG['index_path'])
+    args = parser.parse_args()
+
+    with open(args.path, newline='', encoding='utf-8') as f:
+        places = list(read_gazetteer(f))
+    pincodes = []
+    if args.pincodes:
+        with open(args.pincodes, newline='', encoding='utf-8') as f:
+            pincodes = list(read_directory(f))
+    places, pincodes = build_reverse_index(places, pincodes, args.output)
+    print(f"🧭 {places} localities, {pincodes} pincodes written to {args.output} "
+          f"({os.path.getsize(args.output) / 2**20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
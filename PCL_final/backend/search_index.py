@@ -0,0 +1,220 @@
+"""
+AquaHub Search Index
+Typo-tolerant, as-you-type search over vendor names, service names and areas
+
+Every searchable name is split into pg_trgm-style trigrams (each word padded
+with two leading blanks and one trailing blank). Posting lists map trigrams
+to entries; a query counts shared trigrams per entry in one vectorised pass
+and ranks candidates by trigram similarity, with boosts for prefix and exact
+matches. The query's last word is treated as a prefix still being typed, so
+it gets no trailing blank.
+"""
+
+import heapq
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from areas import area_key
+from snapshots import SnapshotHolder
+
+DEFAULT_SEARCH_RESULTS = 10
+MAX_SEARCH_RESULTS = 50
+MIN_QUERY_LENGTH = 2
+
+# Share of the query's trigrams an entry must contain to be a match
+MIN_WORD_SIMILARITY = 0.3
+
+# Entries considered for final ranking after the trigram pass
+CANDIDATE_POOL = 100
+
+KIND_WEIGHTS = {'vendor': 1.0, 'area': 0.95, 'service': 0.8}
+
+SEARCH_ENTRIES_SQL = """
+    SELECT 'vendor', vp.id, vp.business_name, vp.city
+    FROM vendor_profiles vp
+    JOIN users u ON u.id = vp.user_id AND u.is_active
+    UNION ALL
+    SELECT DISTINCT 'service', vs.vendor_id, vs.service_name, vp.city
+    FROM vendor_services vs
+    JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+    JOIN users u ON u.id = vp.user_id AND u.is_active
+    WHERE vs.is_active
+    UNION ALL
+    SELECT 'area', a.id, a.name, NULL
+    FROM areas a
+    WHERE EXISTS (SELECT 1 FROM vendor_service_areas WHERE area_id = a.id)
+       OR EXISTS (SELECT 1 FROM vendor_service_coverage WHERE area_id = a.id)
+"""
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """A ranked search result; ``matched`` is the name that matched"""
+
+    type: str
+    id: str
+    name: str
+    city: str
+    matched: str
+    score: float
+
+
+def iter_search_entries(conn):
+    """Yield (kind, id, name, city) for everything searchable"""
+    with conn.cursor(name='search_entries') as cur:
+        cur.itersize = 10000
+        cur.execute(SEARCH_ENTRIES_SQL)
+        yield from cur
+
+
+def trigrams(text, prefix=False):
+    """Set of trigrams of normalised ``text``
+
+    With ``prefix`` the last word is left open-ended, so "aqu" shares all
+    its trigrams with "aqua".
+    """
+    words = area_key(text).split()
+    grams = set()
+    for position, word in enumerate(words):
+        padded = '  ' + word
+        if not (prefix and position == len(words) - 1):
+            padded += ' '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """Immutable trigram index over search entries
+
+    Trigrams index distinct normalised names rather than entries: thousands
+    of vendors offering a "5000 L tanker" share one name, which is scored
+    once and expanded to vendors only if it ranks.
+    """
+
+    def __init__(self, entries):
+        self.kinds, self.ids, self.names, self.cities = [], [], [], []
+        key_ids, key_entries, postings, sizes = {}, [], {}, []
+        for kind, entry_id, name, city in entries:
+            key = area_key(name) if name else ''
+            if not key:
+                continue
+            code = key_ids.get(key)
+            if code is None:
+                code = key_ids[key] = len(sizes)
+                grams = trigrams(key)
+                sizes.append(len(grams))
+                key_entries.append([])
+                for gram in grams:
+                    postings.setdefault(gram, []).append(code)
+            key_entries[code].append(len(self.ids))
+            self.kinds.append(kind)
+            self.ids.append(str(entry_id))
+            self.names.append(name)
+            self.cities.append(city)
+
+        # Vendor names double as the display name of their service entries
+        vendor_names = {
+            entry_id: (name, city)
+            for kind, entry_id, name, city in zip(self.kinds, self.ids, self.names, self.cities)
+            if kind == 'vendor'
+        }
+        self.display = [
+            vendor_names.get(entry_id, (name, city)) if kind == 'service' else (name, city)
+            for kind, entry_id, name, city in zip(self.kinds, self.ids, self.names, self.cities)
+        ]
+        self.city_codes = {}
+        self.city_code = np.array([
+            self.city_codes.setdefault(area_key(city), len(self.city_codes)) if city else -1
+            for _, city in self.display
+        ], dtype=np.int32)
+        self.is_area = np.array([kind == 'area' for kind in self.kinds], dtype=bool)
+
+        self.keys = list(key_ids)
+        # Entries of a name, best kind first and then in display order, so
+        # the first few of a name are its best hits
+        self.key_entries = [
+            np.array(sorted(codes, key=lambda entry: (
+                -KIND_WEIGHTS[self.kinds[entry]], self.display[entry][0]
+            )), dtype=np.int32)
+            for codes in key_entries
+        ]
+        self.sizes = np.array(sizes, dtype=np.int32)
+        self.postings = {gram: np.array(codes, dtype=np.int32) for gram, codes in postings.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, limit=DEFAULT_SEARCH_RESULTS, city=None):
+        """Best-matching vendors and areas for a (possibly partial) query"""
+        query_key = area_key(query)
+        if len(query_key) < MIN_QUERY_LENGTH or not self.keys:
+            return []
+        grams = trigrams(query, prefix=True)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+        candidates = np.flatnonzero(shared >= math.ceil(MIN_WORD_SIMILARITY * len(grams)))
+        if not len(candidates):
+            return []
+
+        shared = shared[candidates]
+        similarity = shared / (len(grams) + self.sizes[candidates] - shared)
+        score = 0.6 * shared / len(grams) + 0.4 * similarity
+        if len(candidates) > CANDIDATE_POOL:
+            top = np.argpartition(-score, CANDIDATE_POOL)[:CANDIDATE_POOL]
+            candidates, score = candidates[top], score[top]
+
+        last_word = query_key.split()[-1]
+        ranked = []
+        for code, base in zip(candidates.tolist(), score.tolist()):
+            key = self.keys[code]
+            if key == query_key:
+                base += 0.5
+            elif key.startswith(query_key):
+                base += 0.3
+            elif any(word.startswith(last_word) for word in key.split()):
+                base += 0.15
+            ranked.append((base, code))
+        ranked.sort(reverse=True)
+
+        # Expand names best first; kind weights never exceed 1, so once
+        # ``limit`` hits beat the next name's score nothing later can rank
+        city_code = self.city_codes.get(area_key(city), -2) if city else None
+        best = {}
+        for base, code in ranked:
+            if len(best) >= limit and base < heapq.nlargest(limit, (hit.score for hit in best.values()))[-1]:
+                break
+            entries = self.key_entries[code]
+            if city_code is not None:
+                # Areas are not tied to a city and always stay in the running
+                entries = entries[(self.city_code[entries] == city_code) | self.is_area[entries]]
+            # A vendor appears at most twice under one name (its own entry and
+            # a service), so the first 2 * limit entries hold every hit that
+            # can make the cut
+            for entry in entries[:2 * limit].tolist():
+                kind = self.kinds[entry]
+                entry_score = round(base * KIND_WEIGHTS[kind], 4)
+                result_type = 'area' if kind == 'area' else 'vendor'
+                ident = (result_type, self.ids[entry])
+                if ident not in best or entry_score > best[ident].score:
+                    name, entry_city = self.display[entry]
+                    best[ident] = SearchHit(
+                        result_type, self.ids[entry], name, entry_city, self.names[entry], entry_score
+                    )
+
+        return sorted(best.values(), key=lambda hit: (-hit.score, hit.name))[:limit]
+
+
+search_index = SnapshotHolder(
+    'search_index', 'catalog',
+    lambda storage, version: SearchIndex(storage.iter_search_entries())
+)
+
+
+def get_search_index(storage):
+    """Return this worker's search index, rebuilt when the catalog changed"""
+    return search_index.get(storage)
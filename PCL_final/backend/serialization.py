@@ -0,0 +1,117 @@
+"""
+AquaHub Serialization
+Fast JSON and MessagePack encoding for API responses
+
+orjson and msgpack are optional: without orjson the app keeps Flask's
+standard-library JSON provider (taught about row types), and without msgpack
+clients asking for MessagePack simply get JSON.
+"""
+
+import dataclasses
+import datetime
+import decimal
+import json
+import uuid
+
+from flask import current_app, jsonify, request
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+
+def row_dict(row):
+    """Plain dict of a __slots__ dataclass row, without asdict()'s deep copy"""
+    return {name: getattr(row, name) for name in row.__slots__}
+
+
+def to_primitive(value):
+    """Fallback encoder for the types our rows carry"""
+    if dataclasses.is_dataclass(value):
+        return row_dict(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not serializable')
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj):
+        """Encode ``obj`` as compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=to_primitive, option=_ORJSON_OPTIONS)
+
+    class FastJSONProvider(JSONProvider):
+        """Flask JSON provider backed by orjson
+
+        Dataclass rows, datetimes and UUIDs are encoded natively; anything
+        else goes through to_primitive.
+        """
+
+        mimetype = 'application/json'
+
+        def dumps(self, obj, **kwargs):
+            return dumps(obj).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            body = orjson.dumps(
+                obj, default=to_primitive,
+                option=_ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+            )
+            return self._app.response_class(body, mimetype=self.mimetype)
+else:
+    def dumps(obj):
+        """Encode ``obj`` as compact UTF-8 JSON bytes"""
+        return json.dumps(obj, default=to_primitive, separators=(',', ':')).encode('utf-8')
+
+    class FastJSONProvider(DefaultJSONProvider):
+        """Flask's standard-library JSON provider, taught about row types"""
+
+        sort_keys = False
+
+        @staticmethod
+        def default(o):
+            return to_primitive(o)
+
+
+def packb(obj):
+    """Encode ``obj`` as MessagePack bytes"""
+    return msgpack.packb(obj, default=to_primitive, use_bin_type=True)
+
+
+def wants_msgpack():
+    """True when the current request negotiated MessagePack"""
+    if msgpack is None:
+        return False
+    if request.args.get('format') == 'msgpack':
+        return True
+    return request.accept_mimetypes.best in MSGPACK_MIMETYPES
+
+
+def negotiated_response(payload, status=200):
+    """jsonify() that answers MessagePack to clients asking for it"""
+    if wants_msgpack():
+        response = current_app.response_class(packb(payload), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(payload)
+    response.status_code = status
+    response.vary.add('Accept')
+    return response
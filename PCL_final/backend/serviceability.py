@@ -0,0 +1,257 @@
+"""
+AquaHub Pincode Serviceability
+Precomputed "which services deliver to this pincode" lookups
+
+pincode_serviceability holds one row per (pincode, vendor, service) that
+can deliver there; migrations/005 documents the rules. PostgreSQL keeps it
+current with triggers that recompute only the vendors or pincodes that
+changed, and the SQLite backend does the same from its write paths.
+
+Pincode centroids and locality names come from a post office directory CSV
+(India Post's export or any file with pincode, officename, district,
+statename, latitude and longitude columns):
+
+    python serviceability.py load all_india_pincode_directory.csv
+"""
+
+import argparse
+import csv
+import re
+from dataclasses import dataclass
+
+from psycopg2.extras import execute_values
+
+from areas import FIRST_VENDOR_ID, area_key
+from prepared import execute_prepared, register_query
+
+DEFAULT_PINCODE_PAGE_SIZE = 50
+MAX_PINCODE_PAGE_SIZE = 500
+
+_PINCODE = re.compile(r'^[1-9][0-9]{5}$')
+
+# India Post office names end in a branch/sub/head office suffix
+_OFFICE_SUFFIX = re.compile(r'\s+(?:[BSH]\.?\s?O|G\.?P\.?O)\.?$', re.IGNORECASE)
+
+# Accepted header spellings per directory column, India Post's first
+DIRECTORY_COLUMNS = {
+    'pincode': ('pincode', 'pin', 'postal_code'),
+    'name': ('officename', 'office_name', 'locality', 'name'),
+    'district': ('district', 'districtname', 'city'),
+    'state': ('statename', 'state'),
+    'latitude': ('latitude', 'lat'),
+    'longitude': ('longitude', 'lng', 'lon'),
+}
+
+PINCODE_SQL = """
+    SELECT pincode, district, state, latitude, longitude FROM pincodes WHERE pincode = %(pincode)s
+"""
+register_query('pincode_by_code', PINCODE_SQL)
+
+# The page is an index-only range scan on the primary key; the services of
+# the page's vendors come from the same key range.
+PINCODE_VENDORS_SQL = """
+    WITH page AS (
+        SELECT DISTINCT vendor_id FROM pincode_serviceability
+        WHERE pincode = %(pincode)s AND vendor_id > %(after)s::uuid
+        ORDER BY vendor_id
+        LIMIT %(limit)s
+    )
+    SELECT vp.id, vp.business_name, vp.city, vp.phone,
+           vs.id, vs.service_name, vs.water_type, vs.tanker_capacity, vs.price_per_liter
+    FROM page
+    JOIN pincode_serviceability ps ON ps.pincode = %(pincode)s AND ps.vendor_id = page.vendor_id
+    JOIN vendor_profiles vp ON vp.id = page.vendor_id
+    JOIN vendor_services vs ON vs.id = ps.service_id
+    ORDER BY vp.id, vs.tanker_capacity, vs.id
+"""
+register_query('pincode_vendors', PINCODE_VENDORS_SQL)
+
+
+@dataclass(slots=True)
+class Pincode:
+    pincode: str
+    district: str
+    state: str
+    latitude: float
+    longitude: float
+
+
+@dataclass(slots=True)
+class ServiceableService:
+    id: str
+    service_name: str
+    water_type: str
+    tanker_capacity: int
+    price_per_liter: float
+
+
+@dataclass(slots=True)
+class ServiceableVendor:
+    """A vendor delivering to a pincode and its services that do"""
+
+    id: str
+    business_name: str
+    city: str
+    phone: str
+    services: list
+
+
+def normalize_pincode(value):
+    """The 6-digit pincode in ``value`` ("560 001" -> "560001"), or None"""
+    pincode = re.sub(r'\s+', '', str(value or ''))
+    return pincode if _PINCODE.match(pincode) else None
+
+
+def locality_name(office_name):
+    """Locality of a post office name ("Koramangala S.O" -> "Koramangala")"""
+    return _OFFICE_SUFFIX.sub('', (office_name or '').strip())
+
+
+def _coordinate(value, limit):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # Missing centroids are often exported as 0
+    return number if number and -limit <= number <= limit else None
+
+
+def read_directory(lines):
+    """Yield (Pincode, locality names) per pincode of a directory CSV
+
+    Rows are post offices; a pincode's centroid is the mean of its
+    offices' coordinates. Rows without a valid pincode are skipped.
+    """
+    reader = csv.DictReader(lines)
+    headers = {(h or '').strip().lower(): h for h in reader.fieldnames or []}
+    columns = {
+        column: next((headers[a] for a in aliases if a in headers), None)
+        for column, aliases in DIRECTORY_COLUMNS.items()
+    }
+    if columns['pincode'] is None:
+        raise ValueError('Directory has no pincode column')
+
+    def get(row, column):
+        header = columns[column]
+        return (row.get(header) or '').strip() if header else ''
+
+    offices = {}
+    for row in reader:
+        pincode = normalize_pincode(get(row, 'pincode'))
+        if pincode is None:
+            continue
+        entry = offices.setdefault(pincode, {
+            'district': get(row, 'district') or None, 'state': get(row, 'state') or None,
+            'points': [], 'names': {},
+        })
+        lat, lng = _coordinate(get(row, 'latitude'), 90), _coordinate(get(row, 'longitude'), 180)
+        if lat is not None and lng is not None:
+            entry['points'].append((lat, lng))
+        name = locality_name(get(row, 'name'))
+        if area_key(name):
+            entry['names'].setdefault(area_key(name), name)
+
+    for pincode in sorted(offices):
+        entry = offices[pincode]
+        points = entry['points']
+        lat = sum(p[0] for p in points) / len(points) if points else None
+        lng = sum(p[1] for p in points) / len(points) if points else None
+        yield Pincode(pincode, entry['district'], entry['state'], lat, lng), list(entry['names'].values())
+
+
+def locality_rows(pincode, names):
+    """pincode_localities rows of one pincode, including its own number"""
+    rows = {pincode: (pincode, pincode, pincode)}
+    for name in names:
+        rows.setdefault(area_key(name), (area_key(name), pincode, name))
+    return list(rows.values())
+
+
+def group_vendor_rows(rows, limit):
+    """Fold PINCODE_VENDORS_SQL rows into (vendors, next_cursor)"""
+    vendors = []
+    for vendor_id, business_name, city, phone, *service in rows:
+        vendor_id = str(vendor_id)
+        if not vendors or vendors[-1].id != vendor_id:
+            vendors.append(ServiceableVendor(vendor_id, business_name, city, phone, []))
+        service[0] = str(service[0])
+        vendors[-1].services.append(ServiceableService(*service))
+
+    next_cursor = None
+    if len(vendors) > limit:
+        vendors = vendors[:limit]
+        next_cursor = vendors[-1].id
+    return vendors, next_cursor
+
+
+def fetch_pincode_vendors(conn, pincode, limit=DEFAULT_PINCODE_PAGE_SIZE, cursor=None):
+    """Return (pincode, vendors, next_cursor) for one page of a pincode's vendors
+
+    pincode is None when it is not in the directory. Vendors are ordered
+    by id and ``cursor`` is the last id of the previous page.
+    """
+    with conn.cursor() as cur:
+        execute_prepared(cur, 'pincode_by_code', {'pincode': pincode})
+        row = cur.fetchone()
+        if row is None:
+            return None, [], None
+        execute_prepared(cur, 'pincode_vendors', {
+            'pincode': pincode, 'after': cursor or FIRST_VENDOR_ID, 'limit': limit + 1
+        })
+        vendors, next_cursor = group_vendor_rows(cur.fetchall(), limit)
+    return Pincode(*row), vendors, next_cursor
+
+
+def load_pincodes(conn, entries, batch_size=1000):
+    """Upsert directory entries and refresh serviceability of their pincodes
+
+    Everything happens in the caller's transaction.
+    """
+    codes = []
+    with conn.cursor() as cur:
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                codes.extend(_upsert_pincodes(cur, batch))
+                batch = []
+        if batch:
+            codes.extend(_upsert_pincodes(cur, batch))
+        if codes:
+            # One refresh for the whole directory: each vendor's radius scan
+            # runs once instead of once per batch
+            cur.execute('SELECT refresh_pincode_serviceability(%s)', (codes,))
+    return len(codes)
+
+
+def _upsert_pincodes(cur, batch):
+    execute_values(cur, """
+        INSERT INTO pincodes (pincode, district, state, latitude, longitude) VALUES %s
+        ON CONFLICT (pincode) DO UPDATE SET
+            district = EXCLUDED.district, state = EXCLUDED.state,
+            latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude
+    """, [(p.pincode, p.district, p.state, p.latitude, p.longitude) for p, _ in batch])
+    codes = [p.pincode for p, _ in batch]
+    cur.execute('DELETE FROM pincode_localities WHERE pincode = ANY (%s)', (codes,))
+    execute_values(cur, 'INSERT INTO pincode_localities (area_key, pincode, name) VALUES %s', [
+        row for p, names in batch for row in locality_rows(p.pincode, names)
+    ])
+    return codes
+
+
+def main():
+    from storage import get_storage
+
+    parser = argparse.ArgumentParser(description='Manage the AquaHub pincode directory')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    load = subcommands.add_parser('load', help='load a post office directory CSV')
+    load.add_argument('path', help='CSV file, one row per post office')
+    args = parser.parse_args()
+
+    with open(args.path, newline='', encoding='utf-8') as f:
+        count = get_storage().load_pincodes(read_directory(f))
+    print(f"📮 {count} pincodes loaded, serviceability refreshed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+AquaHub Snapshots
+Per-worker immutable in-memory snapshots rebuilt when their data changes
+
+Storage keeps a change counter per data set (the data_versions table,
+bumped by triggers). A SnapshotHolder polls that counter at most every
+SNAPSHOT_CHECK_INTERVAL seconds and rebuilds its snapshot when it moved.
+The new snapshot replaces the old one with a single reference assignment,
+so readers always see one complete snapshot and never wait for a rebuild
+once a first snapshot exists.
+"""
+
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SNAPSHOT_CONFIG = {
+    'check_interval': float(os.getenv('SNAPSHOT_CHECK_INTERVAL') or 5),
+}
+
+_holders = []
+
+
+class SnapshotHolder:
+    """Holds the snapshot ``build(storage, version)`` made of data set ``data``"""
+
+    def __init__(self, name, data, build, check_interval=None):
+        self.name = name
+        self.data = data
+        self.build = build
+        self.check_interval = (
+            SNAPSHOT_CONFIG['check_interval'] if check_interval is None else check_interval
+        )
+        self.snapshot = None
+        self.version = None
+        self.rebuilds = 0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        _holders.append(self)
+
+    def get(self, storage):
+        """Return the current snapshot, rebuilding it first if it is stale"""
+        snapshot = self.snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        # One thread checks and rebuilds; the rest keep serving the old snapshot
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self.snapshot is None or time.monotonic() - self._checked_at >= self.check_interval:
+                version = storage.data_version(self.data)
+                if self.snapshot is None or version != self.version:
+                    self.snapshot = self.build(storage, version)
+                    self.version = version
+                    self.rebuilds += 1
+                self._checked_at = time.monotonic()
+            return self.snapshot
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """Check the data version on the next get(), e.g. after a local write"""
+        self._checked_at = 0.0
+
+
+def invalidate_snapshots():
+    """Make every snapshot re-check its data version after a local write"""
+    for holder in _holders:
+        holder.invalidate()
+
+
+def snapshot_stats():
+    """Data version and rebuild count of every snapshot in this worker"""
+    return {
+        holder.name: {'version': holder.version, 'rebuilds': holder.rebuilds}
+        for holder in _holders
+    }
@@ -0,0 +1,189 @@
+"""
+AquaHub Storage Layer
+Backend-neutral data access used by the request handlers
+
+STORAGE_BACKEND selects the implementation: 'postgres' (default) talks to
+the configured PostgreSQL server through the connection pool, 'sqlite'
+runs on an embedded database file at SQLITE_PATH for local development
+and hermetic benchmarks.
+"""
+
+import os
+import threading
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+STORAGE_CONFIG = {
+    'backend': os.getenv('STORAGE_BACKEND', 'postgres').lower(),
+    'sqlite_path': os.getenv('SQLITE_PATH', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'aquahub.sqlite3')),
+}
+
+
+class StorageUnavailable(Exception):
+    """Raised when the storage backend cannot hand out a connection"""
+
+
+class Storage:
+    """Interface every storage backend implements"""
+
+    name = None
+
+    def create_customer(self, data, password_hash):
+        """Create user, profile and optional water requirements
+
+        Returns the new user id, or None if the email is already registered.
+        """
+        raise NotImplementedError
+
+    def create_vendor(self, data, password_hash):
+        """Create user, vendor profile and any services in the payload
+
+        Returns the new user id, or None if the email is already registered.
+        """
+        raise NotImplementedError
+
+    def add_vendor_services(self, vendor_id, services):
+        """Insert services for an existing vendor profile; returns their ids"""
+        raise NotImplementedError
+
+    def list_users(self, limit, cursor=None):
+        """Return (users, next_cursor) for one newest-first page"""
+        raise NotImplementedError
+
+    def iter_users(self):
+        """Yield every user as a UserRow, newest first, in constant memory"""
+        raise NotImplementedError
+
+    def data_version(self, name):
+        """Change counter for a data set ('catalog'), bumped on every write"""
+        raise NotImplementedError
+
+    def iter_catalog_services(self):
+        """Yield every active service as a CATALOG_SERVICES_SQL tuple"""
+        raise NotImplementedError
+
+    def iter_vendor_locations(self):
+        """Yield a VendorLocation for every active vendor with coordinates"""
+        raise NotImplementedError
+
+    def iter_search_entries(self):
+        """Yield (kind, id, name, city) for every searchable vendor, service and area"""
+        raise NotImplementedError
+
+    def area_vendors(self, name, limit, cursor=None):
+        """Return (area, vendors, next_cursor) for vendors serving an area
+
+        area is None if the name matches no known area.
+        """
+        raise NotImplementedError
+
+    def pincode_vendors(self, pincode, limit, cursor=None):
+        """Return (pincode, vendors, next_cursor) for vendors delivering to a pincode
+
+        pincode is None if it is not in the pincode directory.
+        """
+        raise NotImplementedError
+
+    def load_pincodes(self, entries):
+        """Upsert (Pincode, localities) directory entries; returns the count"""
+        raise NotImplementedError
+
+    def top_services(self, pincode, water_type, limit):
+        """The precomputed best RankedServices for a pincode and water type"""
+        raise NotImplementedError
+
+    def rate_vendor(self, vendor_id, rating):
+        """Add a 1-5 star rating; returns (average, count), None for an unknown vendor"""
+        raise NotImplementedError
+
+    def refresh_rankings(self, max_batches=None):
+        """Re-rank queued pincodes, every one or up to ``max_batches`` batches
+
+        Returns how many were re-ranked.
+        """
+        raise NotImplementedError
+
+    def queue_all_rankings(self):
+        """Queue every ranked or serviceable pincode; returns the count"""
+        raise NotImplementedError
+
+    def iter_coverage_polygons(self):
+        """Yield a CoveragePolygon for every active vendor's polygon"""
+        raise NotImplementedError
+
+    def add_coverage_polygon(self, vendor_id, service_id, name, vertices):
+        """Store a vendor's polygon; returns its id, None for an unknown vendor or service"""
+        raise NotImplementedError
+
+    def vendor_coverage_polygons(self, vendor_id):
+        """A vendor's polygons as PolygonRows"""
+        raise NotImplementedError
+
+    def delete_coverage_polygon(self, vendor_id, polygon_id):
+        """Delete one of a vendor's polygons; returns whether it existed"""
+        raise NotImplementedError
+
+    def match_requirements(self, full=False):
+        """Re-match changed (or, with ``full``, all) requirements; returns a MatchRun"""
+        raise NotImplementedError
+
+    def import_records(self, kind, lines, fmt='ndjson', batch_size=None):
+        """Bulk load customers, vendors or services; returns an ImportReport"""
+        raise NotImplementedError
+
+    def begin_request(self, name):
+        """Mark the start of a request (used for connection leak tracking)"""
+
+    def end_request(self):
+        """Mark the end of a request; returns any leak reports"""
+        return []
+
+    def health(self):
+        """Backend-specific connection statistics"""
+        return {}
+
+    def close(self):
+        """Release connections held by this backend"""
+
+
+_storage = None
+_storage_pid = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend=None, **options):
+    """Build a storage backend by name"""
+    backend = (backend or STORAGE_CONFIG['backend']).lower()
+    if backend == 'postgres':
+        from storage.postgres import PostgresStorage
+        return PostgresStorage(**options)
+    if backend == 'sqlite':
+        from storage.sqlite import SQLiteStorage
+        options.setdefault('path', STORAGE_CONFIG['sqlite_path'])
+        return SQLiteStorage(**options)
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+
+def get_storage():
+    """Return the process-wide storage backend, creating it after any fork"""
+    global _storage, _storage_pid
+    pid = os.getpid()
+    if _storage is not None and _storage_pid == pid:
+        return _storage
+    with _storage_lock:
+        if _storage is None or _storage_pid != pid:
+            _storage = create_storage()
+            _storage_pid = pid
+        return _storage
+
+
+def set_storage(storage):
+    """Install a storage backend explicitly (benchmarks, scripts)"""
+    global _storage, _storage_pid
+    with _storage_lock:
+        _storage = storage
+        _storage_pid = os.getpid()
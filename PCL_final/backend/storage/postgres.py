@@ -0,0 +1,175 @@
+"""
+AquaHub PostgreSQL Storage
+Storage backend on the pooled PostgreSQL connections
+"""
+
+import time
+from functools import partial
+
+import psycopg2
+
+from areas import fetch_area_vendors
+from catalog_snapshot import iter_catalog_services
+from coverage import (
+    delete_coverage_polygon, fetch_vendor_polygons, insert_coverage_polygon, iter_coverage_polygons
+)
+from bulk_import import DEFAULT_BATCH_SIZE, import_records, load_batch_copy
+import prepared
+from db import LEAK_DEBUG, PoolTimeout, get_pool, leak_tracker, report_leaks
+from matching import MATCHING_CONFIG, MatchRun, match_requirement_batch, queue_requirement_matches
+from ranking import RANKING_CONFIG, fetch_top_services, rate_vendor, refresh_ranking_batch
+from registration import create_customer, create_vendor
+from search_index import iter_search_entries
+from serviceability import fetch_pincode_vendors, load_pincodes
+from storage import Storage, StorageUnavailable
+from users import fetch_users_page, iter_users
+from vendor_search import iter_vendor_locations
+from vendor_services import insert_vendor_services
+
+
+class PostgresStorage(Storage):
+    """Storage backed by PostgreSQL through the process-wide pool"""
+
+    name = 'postgres'
+
+    def unit_of_work(self):
+        """Begin a UnitOfWork, reporting checkout failures uniformly"""
+        try:
+            return get_pool().begin()
+        except (PoolTimeout, psycopg2.OperationalError) as e:
+            raise StorageUnavailable(str(e)) from e
+
+    def create_customer(self, data, password_hash):
+        with self.unit_of_work() as uow:
+            created = create_customer(uow.cursor(), data, password_hash)
+        return created[0] if created else None
+
+    def create_vendor(self, data, password_hash):
+        with self.unit_of_work() as uow:
+            cur = uow.cursor()
+            created = create_vendor(cur, data, password_hash)
+            if created and data.get('services'):
+                insert_vendor_services(cur, created[1], data['services'])
+        return created[0] if created else None
+
+    def add_vendor_services(self, vendor_id, services):
+        with self.unit_of_work() as uow:
+            return insert_vendor_services(uow.cursor(), vendor_id, services)
+
+    def list_users(self, limit, cursor=None):
+        with self.unit_of_work() as uow:
+            return fetch_users_page(uow.conn, limit, cursor)
+
+    def iter_users(self):
+        with self.unit_of_work() as uow:
+            yield from iter_users(uow.conn)
+
+    def data_version(self, name):
+        with self.unit_of_work() as uow:
+            cur = uow.cursor()
+            cur.execute('SELECT version FROM data_versions WHERE name = %s', (name,))
+            row = cur.fetchone()
+        return row[0] if row else 0
+
+    def iter_catalog_services(self):
+        with self.unit_of_work() as uow:
+            yield from iter_catalog_services(uow.conn)
+
+    def iter_vendor_locations(self):
+        with self.unit_of_work() as uow:
+            yield from iter_vendor_locations(uow.conn)
+
+    def iter_search_entries(self):
+        with self.unit_of_work() as uow:
+            yield from iter_search_entries(uow.conn)
+
+    def area_vendors(self, name, limit, cursor=None):
+        with self.unit_of_work() as uow:
+            return fetch_area_vendors(uow.conn, name, limit, cursor)
+
+    def pincode_vendors(self, pincode, limit, cursor=None):
+        with self.unit_of_work() as uow:
+            return fetch_pincode_vendors(uow.conn, pincode, limit, cursor)
+
+    def load_pincodes(self, entries):
+        with self.unit_of_work() as uow:
+            return load_pincodes(uow.conn, entries)
+
+    def top_services(self, pincode, water_type, limit):
+        with self.unit_of_work() as uow:
+            return fetch_top_services(uow.conn, pincode, water_type, limit)
+
+    def rate_vendor(self, vendor_id, rating):
+        with self.unit_of_work() as uow:
+            return rate_vendor(uow.conn, vendor_id, rating)
+
+    def iter_coverage_polygons(self):
+        with self.unit_of_work() as uow:
+            yield from iter_coverage_polygons(uow.conn)
+
+    def add_coverage_polygon(self, vendor_id, service_id, name, vertices):
+        with self.unit_of_work() as uow:
+            return insert_coverage_polygon(uow.conn, vendor_id, service_id, name, vertices)
+
+    def vendor_coverage_polygons(self, vendor_id):
+        with self.unit_of_work() as uow:
+            return fetch_vendor_polygons(uow.conn, vendor_id)
+
+    def delete_coverage_polygon(self, vendor_id, polygon_id):
+        with self.unit_of_work() as uow:
+            return delete_coverage_polygon(uow.conn, vendor_id, polygon_id)
+
+    def refresh_rankings(self, max_batches=None):
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            # One transaction per batch, so a long drain never holds the
+            # whole queue locked
+            with self.unit_of_work() as uow:
+                count = refresh_ranking_batch(uow.conn)
+            total += count
+            batches += 1
+            if count < RANKING_CONFIG['batch_size']:
+                break
+        return total
+
+    def queue_all_rankings(self):
+        with self.unit_of_work() as uow:
+            cur = uow.cursor()
+            cur.execute("""
+                INSERT INTO ranking_queue (pincode)
+                SELECT pincode FROM pincode_serviceability
+                UNION
+                SELECT pincode FROM pincode_rankings
+                ON CONFLICT (pincode) DO NOTHING
+            """)
+            return cur.rowcount
+
+    def match_requirements(self, full=False):
+        started = time.perf_counter()
+        with self.unit_of_work() as uow:
+            queued, full = queue_requirement_matches(uow.conn, full)
+        matched = 0
+        while True:
+            with self.unit_of_work() as uow:
+                count = match_requirement_batch(uow.conn)
+            matched += count
+            if count < MATCHING_CONFIG['batch_size']:
+                return MatchRun(queued, matched, full, time.perf_counter() - started)
+
+    def import_records(self, kind, lines, fmt='ndjson', batch_size=None):
+        with self.unit_of_work() as uow:
+            return import_records(
+                partial(load_batch_copy, uow.conn), kind, lines, fmt,
+                batch_size or DEFAULT_BATCH_SIZE
+            )
+
+    def begin_request(self, name):
+        if LEAK_DEBUG:
+            leak_tracker.begin_scope(name)
+
+    def end_request(self):
+        return report_leaks() if LEAK_DEBUG else []
+
+    def health(self):
+        return {'pool': get_pool().stats(), 'prepared_statements': prepared.stats()}
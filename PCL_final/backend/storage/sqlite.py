@@ -0,0 +1,792 @@
+"""
+AquaHub SQLite Storage
+Embedded storage backend for local development and hermetic benchmarks
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from areas import Area, AreaVendor, area_key
+from bulk_import import DEFAULT_BATCH_SIZE, import_records
+from coverage import CoveragePolygon, encode_vertices, polygon_row
+from distances import pairwise_km
+from matching import MATCHING_CONFIG, WATERMARK_NAME, MatchRun, match_candidates
+from ranking import RANKING_CONFIG, average_rating, rank_candidates, ranked_service
+from registration import customer_signup_params, vendor_signup_params
+from serviceability import Pincode, group_vendor_rows, locality_rows
+from storage import Storage
+from users import UserRow, decode_cursor, encode_cursor
+from vendor_search import KM_PER_DEGREE, VendorLocation, normalize_water_type
+from vendor_services import service_row
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'schema_sqlite.sql'
+)
+
+USERS_SELECT_SQL = """
+    SELECT u.id, u.email, u.user_type, u.created_at,
+           CASE
+               WHEN u.user_type = 'customer' THEN cp.first_name || ' ' || cp.last_name
+               WHEN u.user_type = 'vendor' THEN vp.business_name
+           END as name
+    FROM users u
+    LEFT JOIN customer_profiles cp ON u.id = cp.user_id
+    LEFT JOIN vendor_profiles vp ON u.id = vp.user_id
+"""
+
+VENDOR_LOCATIONS_SQL = """
+    SELECT vp.id, vp.business_name, vp.city, vp.latitude, vp.longitude,
+           COALESCE(vp.delivery_radius_km, 50), COALESCE(vp.tanker_capacity, '[]'),
+           json_group_array(vs.water_type) FILTER (WHERE vs.id IS NOT NULL),
+           json_group_array(vs.tanker_capacity) FILTER (WHERE vs.id IS NOT NULL)
+    FROM vendor_profiles vp
+    JOIN users u ON u.id = vp.user_id AND u.is_active = 1
+    LEFT JOIN vendor_services vs ON vs.vendor_id = vp.id AND vs.is_active = 1
+    WHERE vp.latitude IS NOT NULL AND vp.longitude IS NOT NULL
+    GROUP BY vp.id
+"""
+
+CATALOG_SERVICES_SQL = """
+    SELECT vs.id, vp.id, vp.business_name, vp.city, vs.service_name, vs.water_type,
+           vs.tanker_capacity, vs.price_per_liter, vs.minimum_order_quantity
+    FROM vendor_services vs
+    JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+    JOIN users u ON u.id = vp.user_id AND u.is_active = 1
+    WHERE vs.is_active = 1
+"""
+
+COVERAGE_POLYGONS_SQL = """
+    SELECT cp.id, cp.vendor_id, cp.service_id, cp.name, cp.vertices
+    FROM coverage_polygons cp
+    JOIN vendor_profiles vp ON vp.id = cp.vendor_id
+    JOIN users u ON u.id = vp.user_id AND u.is_active = 1
+"""
+
+SEARCH_ENTRIES_SQL = """
+    SELECT 'vendor', vp.id, vp.business_name, vp.city
+    FROM vendor_profiles vp
+    JOIN users u ON u.id = vp.user_id AND u.is_active = 1
+    UNION ALL
+    SELECT DISTINCT 'service', vs.vendor_id, vs.service_name, vp.city
+    FROM vendor_services vs
+    JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+    JOIN users u ON u.id = vp.user_id AND u.is_active = 1
+    WHERE vs.is_active = 1
+    UNION ALL
+    SELECT 'area', a.id, a.name, NULL
+    FROM areas a
+    WHERE EXISTS (SELECT 1 FROM vendor_service_areas WHERE area_id = a.id)
+       OR EXISTS (SELECT 1 FROM vendor_service_coverage WHERE area_id = a.id)
+"""
+
+# Active services with what decides where they deliver (migrations/005)
+SERVICEABILITY_SQL = """
+    SELECT vs.id, vs.vendor_id, vs.coverage_areas, vp.service_areas, vp.postal_code,
+           vp.latitude, vp.longitude, COALESCE(vp.delivery_radius_km, 50)
+    FROM vendor_services vs
+    JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+    JOIN users u ON u.id = vp.user_id AND u.is_active = 1
+    WHERE vs.is_active = 1 {vendor_filter}
+"""
+
+PINCODE_VENDORS_SQL = """
+    WITH page AS (
+        SELECT DISTINCT vendor_id FROM pincode_serviceability
+        WHERE pincode = :pincode AND vendor_id > :after
+        ORDER BY vendor_id
+        LIMIT :limit
+    )
+    SELECT vp.id, vp.business_name, vp.city, vp.phone,
+           vs.id, vs.service_name, vs.water_type, vs.tanker_capacity, vs.price_per_liter
+    FROM page
+    JOIN pincode_serviceability ps ON ps.pincode = :pincode AND ps.vendor_id = page.vendor_id
+    JOIN vendor_profiles vp ON vp.id = page.vendor_id
+    JOIN vendor_services vs ON vs.id = ps.service_id
+    ORDER BY vp.id, vs.tanker_capacity, vs.id
+"""
+
+RANKING_CANDIDATES_SQL = """
+    SELECT ps.pincode, vs.water_type, vs.id, vs.vendor_id, vs.price_per_liter,
+           vp.latitude, vp.longitude, p.latitude, p.longitude,
+           COALESCE(vp.delivery_radius_km, 50), vp.rating_total, vp.rating_count,
+           vp.dispatch_minutes
+    FROM pincode_serviceability ps
+    JOIN pincodes p ON p.pincode = ps.pincode
+    JOIN vendor_services vs ON vs.id = ps.service_id
+    JOIN vendor_profiles vp ON vp.id = ps.vendor_id
+    WHERE ps.pincode IN ({placeholders})
+"""
+
+TOP_SERVICES_SQL = """
+    SELECT r.rank, r.service_id, r.vendor_id, vp.business_name, vp.city, vs.service_name,
+           vs.water_type, vs.tanker_capacity, vs.price_per_liter, vp.rating_total,
+           vp.rating_count, r.distance_km, r.eta_minutes, r.score
+    FROM pincode_rankings r
+    JOIN vendor_services vs ON vs.id = r.service_id
+    JOIN vendor_profiles vp ON vp.id = r.vendor_id
+    WHERE r.pincode = ? AND r.water_type = ?
+    ORDER BY r.rank
+    LIMIT ?
+"""
+
+# The WITH follows the INSERT so sqlite3 reports a rowcount
+QUEUE_CHANGED_MATCHES_SQL = """
+    INSERT OR IGNORE INTO requirement_match_queue (requirement_id)
+    WITH changed_services AS (
+        SELECT vs.id FROM vendor_services vs
+        JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+        JOIN users u ON u.id = vp.user_id
+        WHERE vs.updated_at > :since OR vp.updated_at > :since OR u.updated_at > :since
+    )
+    SELECT r.id FROM customer_water_requirements r
+    WHERE r.updated_at > :since
+    UNION
+    SELECT r.id FROM customer_water_requirements r
+    JOIN customer_profiles cp ON cp.id = r.customer_id
+    WHERE cp.updated_at > :since
+    UNION
+    SELECT r.id
+    FROM changed_services c
+    JOIN vendor_services vs ON vs.id = c.id
+    JOIN pincode_serviceability ps ON ps.service_id = vs.id
+    JOIN customer_profiles cp ON replace(cp.postal_code, ' ', '') = ps.pincode
+    JOIN customer_water_requirements r
+      ON r.customer_id = cp.id AND lower(trim(r.water_type)) = lower(trim(vs.water_type))
+    UNION
+    SELECT m.requirement_id FROM requirement_matches m
+    JOIN changed_services c ON c.id = m.service_id
+"""
+
+MATCH_CANDIDATES_SQL = """
+    SELECT r.id, r.required_quantity, r.preferred_delivery_days, r.preferred_time_slots,
+           vs.id, vs.vendor_id, vs.tanker_capacity, vs.price_per_liter,
+           vs.available_days, vs.available_time_slots
+    FROM customer_water_requirements r
+    JOIN customer_profiles cp ON cp.id = r.customer_id
+    JOIN pincode_serviceability ps ON ps.pincode = replace(cp.postal_code, ' ', '')
+    JOIN vendor_services vs ON vs.id = ps.service_id
+    WHERE r.id IN ({placeholders})
+      AND lower(trim(vs.water_type)) = lower(trim(r.water_type))
+      AND vs.tanker_capacity > 0
+      AND (r.storage_capacity IS NULL OR vs.tanker_capacity <= r.storage_capacity)
+      AND (vs.minimum_order_quantity IS NULL OR vs.minimum_order_quantity <= r.required_quantity)
+"""
+
+# Columns added to the schema after SQLite files may already exist;
+# CREATE TABLE IF NOT EXISTS leaves those tables alone, so add them here.
+ADDED_COLUMNS = (
+    ('vendor_profiles', 'latitude', 'REAL'),
+    ('vendor_profiles', 'longitude', 'REAL'),
+    ('vendor_profiles', 'rating_total', 'INTEGER NOT NULL DEFAULT 0'),
+    ('vendor_profiles', 'rating_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('vendor_profiles', 'dispatch_minutes', 'INTEGER DEFAULT 60'),
+)
+
+# Postgres array parameters that are stored as JSON text here
+ARRAY_PARAMS = {
+    'preferred_delivery_days', 'preferred_time_slots', 'service_areas', 'tanker_capacity',
+    'available_days', 'available_time_slots', 'coverage_areas'
+}
+
+
+def new_id():
+    return str(uuid.uuid4())
+
+
+def to_sqlite_params(params):
+    """Encode list-valued parameters as the JSON arrays the schema stores"""
+    return {
+        key: json.dumps(list(value or [])) if key in ARRAY_PARAMS else value
+        for key, value in params.items()
+    }
+
+
+class SQLiteStorage(Storage):
+    """Storage on an embedded SQLite database, one connection per thread"""
+
+    name = 'sqlite'
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._local = threading.local()
+        self._anchor = None
+        if path == ':memory:':
+            # A shared-cache memory database lives as long as one connection
+            # to it is open, so keep one for the lifetime of the storage.
+            self._target = f'file:aquahub-{uuid.uuid4().hex}?mode=memory&cache=shared'
+            self._anchor = self._connect()
+        else:
+            self._target = path
+
+        with open(SCHEMA_PATH, 'r') as f:
+            schema_sql = f.read()
+        conn = self._conn()
+        had_areas = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'areas'"
+        ).fetchone()
+        conn.executescript(schema_sql)
+        for table, column, decl in ADDED_COLUMNS:
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if column not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+        if not had_areas:
+            with self.transaction() as conn:
+                self._backfill_areas(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self._target, uri=self._target.startswith('file:'),
+            isolation_level=None, check_same_thread=False, timeout=5.0
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        if self.path != ':memory:':
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in one write transaction on this thread's connection"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    # --- Writes ------------------------------------------------------------
+
+    def _area_ids(self, conn, names):
+        """Ids of the areas named in ``names``, creating any new ones"""
+        keys = {}
+        for name in names or []:
+            key = area_key(name)
+            if key:
+                keys.setdefault(key, name.strip())
+        if not keys:
+            return []
+        conn.executemany(
+            'INSERT INTO areas (area_key, name) VALUES (?, ?) ON CONFLICT (area_key) DO NOTHING',
+            keys.items()
+        )
+        placeholders = ', '.join('?' * len(keys))
+        return [row[0] for row in conn.execute(
+            f'SELECT id FROM areas WHERE area_key IN ({placeholders})', list(keys)
+        )]
+
+    def _link_vendor_areas(self, conn, vendor_id, names):
+        conn.execute('DELETE FROM vendor_service_areas WHERE vendor_id = ?', (vendor_id,))
+        conn.executemany(
+            'INSERT INTO vendor_service_areas (area_id, vendor_id) VALUES (?, ?)',
+            [(area_id, vendor_id) for area_id in self._area_ids(conn, names)]
+        )
+
+    def _link_service_areas(self, conn, vendor_id, service_id, names):
+        conn.execute('DELETE FROM vendor_service_coverage WHERE service_id = ?', (service_id,))
+        conn.executemany(
+            'INSERT INTO vendor_service_coverage (area_id, vendor_id, service_id) VALUES (?, ?, ?)',
+            [(area_id, vendor_id, service_id) for area_id in self._area_ids(conn, names)]
+        )
+
+    def _backfill_areas(self, conn):
+        """Populate the area join tables for rows written before they existed"""
+        for vendor_id, service_areas in conn.execute(
+                'SELECT id, service_areas FROM vendor_profiles').fetchall():
+            self._link_vendor_areas(conn, vendor_id, json.loads(service_areas or '[]'))
+        for service_id, vendor_id, coverage_areas in conn.execute(
+                'SELECT id, vendor_id, coverage_areas FROM vendor_services '
+                'WHERE is_active = 1 AND vendor_id IS NOT NULL').fetchall():
+            self._link_service_areas(conn, vendor_id, service_id, json.loads(coverage_areas or '[]'))
+
+    def _pincodes_within(self, conn, lat, lng, radius_km):
+        """Pincodes whose centroid lies within ``radius_km`` of a point"""
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        rows = conn.execute("""
+            SELECT pincode, latitude, longitude FROM pincodes
+            WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+        """, (lat - dlat, lat + dlat, lng - dlng, lng + dlng)).fetchall()
+        if not rows:
+            return set()
+        pincodes, p_lat, p_lng = zip(*rows)
+        inside = pairwise_km(lat, lng, p_lat, p_lng) <= radius_km
+        return {pincode for pincode, keep in zip(pincodes, inside.tolist()) if keep}
+
+    def _refresh_serviceability(self, conn, vendor_ids=None, pincodes=None):
+        """Recompute pincode_serviceability for some vendors or some pincodes"""
+        vendor_filter, params = '', []
+        if vendor_ids is not None:
+            vendor_ids = list(vendor_ids)
+            placeholders = ', '.join('?' * len(vendor_ids))
+            vendor_filter = f'AND vs.vendor_id IN ({placeholders})'
+            params = vendor_ids
+            conn.execute(
+                f'DELETE FROM pincode_serviceability WHERE vendor_id IN ({placeholders})', vendor_ids
+            )
+        if pincodes is not None:
+            pincodes = set(pincodes)
+            conn.executemany(
+                'DELETE FROM pincode_serviceability WHERE pincode = ?', [(p,) for p in pincodes]
+            )
+
+        rows, in_radius = [], {}
+        for (service_id, vendor_id, coverage_areas, service_areas, postal_code,
+             lat, lng, radius_km) in conn.execute(
+                SERVICEABILITY_SQL.format(vendor_filter=vendor_filter), params).fetchall():
+            names = json.loads(coverage_areas or '[]') + json.loads(service_areas or '[]')
+            keys = list({area_key(name) for name in names + [postal_code]} - {''})
+            placeholders = ', '.join('?' * len(keys))
+            served = {row[0] for row in conn.execute(
+                f'SELECT pincode FROM pincode_localities WHERE area_key IN ({placeholders})', keys
+            )}
+            if lat is not None and lng is not None:
+                if vendor_id not in in_radius:
+                    in_radius[vendor_id] = self._pincodes_within(conn, lat, lng, radius_km)
+                served |= in_radius[vendor_id]
+            if pincodes is not None:
+                served &= pincodes
+            rows.extend((pincode, vendor_id, service_id) for pincode in served)
+        conn.executemany(
+            'INSERT OR IGNORE INTO pincode_serviceability (pincode, vendor_id, service_id) VALUES (?, ?, ?)',
+            rows
+        )
+
+    def _insert_user(self, conn, email, password_hash, user_type):
+        user_id = new_id()
+        cur = conn.execute("""
+            INSERT INTO users (id, email, password_hash, user_type)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (email) DO NOTHING
+        """, (user_id, email, password_hash, user_type))
+        return user_id if cur.rowcount == 1 else None
+
+    def _insert_customer(self, conn, data, password_hash):
+        user_id = self._insert_user(conn, data['email'], password_hash, 'customer')
+        if user_id is None:
+            return None
+
+        params = to_sqlite_params(customer_signup_params(data, password_hash))
+        params['user_id'] = user_id
+        params['profile_id'] = new_id()
+        conn.execute("""
+            INSERT INTO customer_profiles
+            (id, user_id, first_name, last_name, phone, date_of_birth, gender,
+             address_line1, address_line2, city, state, postal_code, country,
+             emergency_contact_name, emergency_contact_phone)
+            VALUES (:profile_id, :user_id, :first_name, :last_name, :phone, :date_of_birth,
+                    :gender, :address_line1, :address_line2, :city, :state, :postal_code,
+                    :country, :emergency_contact_name, :emergency_contact_phone)
+        """, params)
+
+        if params['has_requirements']:
+            params['requirement_id'] = new_id()
+            conn.execute("""
+                INSERT INTO customer_water_requirements
+                (id, customer_id, required_quantity, frequency, preferred_delivery_days,
+                 preferred_time_slots, water_type, storage_capacity, special_instructions)
+                VALUES (:requirement_id, :profile_id, :required_quantity, :frequency,
+                        :preferred_delivery_days, :preferred_time_slots, :water_type,
+                        :storage_capacity, :special_instructions)
+            """, params)
+        return user_id
+
+    def _insert_vendor(self, conn, data, password_hash):
+        user_id = self._insert_user(conn, data['email'], password_hash, 'vendor')
+        if user_id is None:
+            return None
+
+        params = to_sqlite_params(vendor_signup_params(data, password_hash))
+        params['user_id'] = user_id
+        params['profile_id'] = new_id()
+        conn.execute("""
+            INSERT INTO vendor_profiles
+            (id, user_id, business_name, contact_person_name, phone, alternate_phone,
+             business_address_line1, business_address_line2, city, state, postal_code, country,
+             business_type, years_in_business, license_number, tax_id,
+             service_areas, tanker_capacity, delivery_radius_km, latitude, longitude)
+            VALUES (:profile_id, :user_id, :business_name, :contact_person_name, :phone,
+                    :alternate_phone, :business_address_line1, :business_address_line2,
+                    :city, :state, :postal_code, :country, :business_type,
+                    :years_in_business, :license_number, :tax_id, :service_areas,
+                    :tanker_capacity, :delivery_radius_km, :latitude, :longitude)
+        """, params)
+        self._link_vendor_areas(conn, params['profile_id'], data.get('serviceAreas'))
+
+        if data.get('services'):
+            self._insert_services(conn, params['profile_id'], data['services'])
+        return user_id
+
+    def _insert_services(self, conn, vendor_id, services):
+        rows, coverage = [], []
+        for service in services:
+            row = list(service_row(vendor_id, service))
+            coverage.append(row[8])
+            row[6:9] = [json.dumps(list(value or [])) for value in row[6:9]]
+            rows.append([new_id()] + row)
+        conn.executemany("""
+            INSERT INTO vendor_services
+            (id, vendor_id, service_name, water_type, tanker_capacity, price_per_liter,
+             minimum_order_quantity, available_days, available_time_slots, coverage_areas)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        for row, names in zip(rows, coverage):
+            self._link_service_areas(conn, vendor_id, row[0], names)
+        self._refresh_serviceability(conn, [vendor_id])
+        return [row[0] for row in rows]
+
+    def create_customer(self, data, password_hash):
+        with self.transaction() as conn:
+            return self._insert_customer(conn, data, password_hash)
+
+    def create_vendor(self, data, password_hash):
+        with self.transaction() as conn:
+            return self._insert_vendor(conn, data, password_hash)
+
+    def add_vendor_services(self, vendor_id, services):
+        if not services:
+            return []
+        with self.transaction() as conn:
+            return self._insert_services(conn, vendor_id, services)
+
+    # --- Reads -------------------------------------------------------------
+
+    def list_users(self, limit, cursor=None):
+        if cursor:
+            created_at, user_id = decode_cursor(cursor)
+            rows = self._conn().execute(USERS_SELECT_SQL + """
+                WHERE (u.created_at, u.id) < (?, ?)
+                ORDER BY u.created_at DESC, u.id DESC
+                LIMIT ?
+            """, (created_at, user_id, limit + 1)).fetchall()
+        else:
+            rows = self._conn().execute(USERS_SELECT_SQL + """
+                ORDER BY u.created_at DESC, u.id DESC
+                LIMIT ?
+            """, (limit + 1,)).fetchall()
+
+        users = [UserRow(*row) for row in rows]
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor(users[-1])
+        return users, next_cursor
+
+    def iter_users(self):
+        # A dedicated connection keeps the read cursor independent of any
+        # writes this thread makes while the export is being consumed.
+        conn = self._connect()
+        try:
+            for row in conn.execute(USERS_SELECT_SQL + ' ORDER BY u.created_at DESC, u.id DESC'):
+                yield UserRow(*row)
+        finally:
+            conn.close()
+
+    def data_version(self, name):
+        row = self._conn().execute(
+            'SELECT version FROM data_versions WHERE name = ?', (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def iter_catalog_services(self):
+        conn = self._connect()
+        conn.row_factory = None
+        try:
+            yield from conn.execute(CATALOG_SERVICES_SQL)
+        finally:
+            conn.close()
+
+    def iter_vendor_locations(self):
+        conn = self._connect()
+        try:
+            for row in conn.execute(VENDOR_LOCATIONS_SQL):
+                yield VendorLocation(*row[:6], *(json.loads(value) for value in row[6:]))
+        finally:
+            conn.close()
+
+    def iter_search_entries(self):
+        conn = self._connect()
+        conn.row_factory = None
+        try:
+            yield from conn.execute(SEARCH_ENTRIES_SQL)
+        finally:
+            conn.close()
+
+    def area_vendors(self, name, limit, cursor=None):
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT id, area_key, name FROM areas WHERE area_key = ?', (area_key(name),)
+        ).fetchone()
+        if row is None:
+            return None, [], None
+        area = Area(*row)
+
+        after = cursor or ''
+        rows = conn.execute("""
+            WITH page AS (
+                SELECT vendor_id FROM vendor_service_areas
+                WHERE area_id = :area_id AND vendor_id > :after
+                UNION
+                SELECT vendor_id FROM vendor_service_coverage
+                WHERE area_id = :area_id AND vendor_id > :after
+                ORDER BY vendor_id
+                LIMIT :limit
+            )
+            SELECT vp.id, vp.business_name, vp.city, vp.phone
+            FROM page
+            JOIN vendor_profiles vp ON vp.id = page.vendor_id
+            ORDER BY vp.id
+        """, {'area_id': area.id, 'after': after, 'limit': limit + 1}).fetchall()
+        vendors = [AreaVendor(*r) for r in rows]
+
+        next_cursor = None
+        if len(vendors) > limit:
+            vendors = vendors[:limit]
+            next_cursor = vendors[-1].id
+        return area, vendors, next_cursor
+
+    # --- Pincodes, rankings, coverage and matching -------------------------
+
+    def pincode_vendors(self, pincode, limit, cursor=None):
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT pincode, district, state, latitude, longitude FROM pincodes WHERE pincode = ?',
+            (pincode,)
+        ).fetchone()
+        if row is None:
+            return None, [], None
+        rows = conn.execute(PINCODE_VENDORS_SQL, {
+            'pincode': pincode, 'after': cursor or '', 'limit': limit + 1
+        }).fetchall()
+        vendors, next_cursor = group_vendor_rows(rows, limit)
+        return Pincode(*row), vendors, next_cursor
+
+    def load_pincodes(self, entries):
+        codes = []
+        with self.transaction() as conn:
+            for pincode, names in entries:
+                conn.execute("""
+                    INSERT INTO pincodes (pincode, district, state, latitude, longitude)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (pincode) DO UPDATE SET
+                        district = excluded.district, state = excluded.state,
+                        latitude = excluded.latitude, longitude = excluded.longitude
+                """, (pincode.pincode, pincode.district, pincode.state,
+                      pincode.latitude, pincode.longitude))
+                conn.execute('DELETE FROM pincode_localities WHERE pincode = ?', (pincode.pincode,))
+                conn.executemany(
+                    'INSERT INTO pincode_localities (area_key, pincode, name) VALUES (?, ?, ?)',
+                    locality_rows(pincode.pincode, names)
+                )
+                codes.append(pincode.pincode)
+            if codes:
+                self._refresh_serviceability(conn, pincodes=codes)
+        return len(codes)
+
+    def top_services(self, pincode, water_type, limit):
+        rows = self._conn().execute(
+            TOP_SERVICES_SQL, (pincode, normalize_water_type(water_type), limit)
+        ).fetchall()
+        return [ranked_service(row) for row in rows]
+
+    def rate_vendor(self, vendor_id, rating):
+        with self.transaction() as conn:
+            row = conn.execute("""
+                UPDATE vendor_profiles
+                SET rating_total = rating_total + ?, rating_count = rating_count + 1
+                WHERE id = ?
+                RETURNING rating_total, rating_count
+            """, (rating, vendor_id)).fetchone()
+        return (average_rating(*row), row[1]) if row else None
+
+    def iter_coverage_polygons(self):
+        conn = self._connect()
+        conn.row_factory = None
+        try:
+            for row in conn.execute(COVERAGE_POLYGONS_SQL):
+                yield CoveragePolygon(*row)
+        finally:
+            conn.close()
+
+    def add_coverage_polygon(self, vendor_id, service_id, name, vertices):
+        with self.transaction() as conn:
+            row = conn.execute("""
+                INSERT INTO coverage_polygons (vendor_id, service_id, name, vertices)
+                SELECT vp.id, :service_id, :name, :vertices
+                FROM vendor_profiles vp
+                WHERE vp.id = :vendor_id
+                  AND (:service_id IS NULL OR EXISTS (
+                      SELECT 1 FROM vendor_services vs WHERE vs.id = :service_id AND vs.vendor_id = vp.id
+                  ))
+                RETURNING id
+            """, {
+                'vendor_id': vendor_id, 'service_id': service_id, 'name': name,
+                'vertices': encode_vertices(vertices),
+            }).fetchone()
+        return row[0] if row else None
+
+    def vendor_coverage_polygons(self, vendor_id):
+        rows = self._conn().execute(
+            'SELECT id, vendor_id, service_id, name, vertices FROM coverage_polygons WHERE vendor_id = ? ORDER BY id',
+            (vendor_id,)
+        ).fetchall()
+        return [polygon_row(CoveragePolygon(*row)) for row in rows]
+
+    def delete_coverage_polygon(self, vendor_id, polygon_id):
+        with self.transaction() as conn:
+            cur = conn.execute(
+                'DELETE FROM coverage_polygons WHERE id = ? AND vendor_id = ?', (polygon_id, vendor_id)
+            )
+        return cur.rowcount > 0
+
+    def refresh_rankings(self, max_batches=None):
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with self.transaction() as conn:
+                pincodes = [row[0] for row in conn.execute(
+                    'SELECT pincode FROM ranking_queue ORDER BY queued_at LIMIT ?',
+                    (RANKING_CONFIG['batch_size'],)
+                )]
+                if not pincodes:
+                    break
+                placeholders = ', '.join('?' * len(pincodes))
+                conn.execute(f'DELETE FROM ranking_queue WHERE pincode IN ({placeholders})', pincodes)
+                rankings = rank_candidates(conn.execute(
+                    RANKING_CANDIDATES_SQL.format(placeholders=placeholders), pincodes
+                ).fetchall())
+                conn.execute(f'DELETE FROM pincode_rankings WHERE pincode IN ({placeholders})', pincodes)
+                conn.executemany("""
+                    INSERT INTO pincode_rankings
+                    (pincode, water_type, rank, service_id, vendor_id, score, distance_km, eta_minutes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, rankings)
+            total += len(pincodes)
+            batches += 1
+        return total
+
+    def queue_all_rankings(self):
+        with self.transaction() as conn:
+            return conn.execute("""
+                INSERT OR IGNORE INTO ranking_queue (pincode)
+                SELECT pincode FROM pincode_serviceability
+                UNION
+                SELECT pincode FROM pincode_rankings
+            """).rowcount
+
+    def match_requirements(self, full=False):
+        started = time.perf_counter()
+        with self.transaction() as conn:
+            row = conn.execute("""
+                SELECT strftime('%Y-%m-%dT%H:%M:%f+00:00', watermark, ?)
+                FROM job_watermarks WHERE name = ?
+            """, (f"-{MATCHING_CONFIG['overlap_seconds']} seconds", WATERMARK_NAME)).fetchone()
+            conn.execute("""
+                INSERT INTO job_watermarks (name, watermark)
+                VALUES (?, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+                ON CONFLICT (name) DO UPDATE SET watermark = excluded.watermark
+            """, (WATERMARK_NAME,))
+            full = full or row is None
+            if full:
+                queued = conn.execute("""
+                    INSERT OR IGNORE INTO requirement_match_queue (requirement_id)
+                    SELECT id FROM customer_water_requirements
+                """).rowcount
+            else:
+                queued = conn.execute(QUEUE_CHANGED_MATCHES_SQL, {'since': row[0]}).rowcount
+
+        matched = 0
+        while True:
+            with self.transaction() as conn:
+                ids = [row[0] for row in conn.execute(
+                    'SELECT requirement_id FROM requirement_match_queue ORDER BY requirement_id LIMIT ?',
+                    (MATCHING_CONFIG['batch_size'],)
+                )]
+                if not ids:
+                    break
+                placeholders = ', '.join('?' * len(ids))
+                conn.execute(f'DELETE FROM requirement_match_queue WHERE requirement_id IN ({placeholders})', ids)
+                rows = conn.execute(MATCH_CANDIDATES_SQL.format(placeholders=placeholders), ids)
+                matches = match_candidates(
+                    (*row[:2], json.loads(row[2] or '[]'), json.loads(row[3] or '[]'), *row[4:8],
+                     json.loads(row[8] or '[]'), json.loads(row[9] or '[]'))
+                    for row in rows
+                )
+                conn.execute(f'DELETE FROM requirement_matches WHERE requirement_id IN ({placeholders})', ids)
+                conn.executemany("""
+                    INSERT INTO requirement_matches
+                    (requirement_id, rank, service_id, vendor_id, tankers_per_delivery,
+                     cost_per_delivery, common_days, common_hours)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, matches)
+            matched += len(ids)
+        return MatchRun(queued, matched, full, time.perf_counter() - started)
+
+    # --- Bulk import -------------------------------------------------------
+
+    def _vendor_id_for_email(self, conn, email):
+        row = conn.execute("""
+            SELECT vp.id FROM users u
+            JOIN vendor_profiles vp ON vp.user_id = u.id
+            WHERE u.email = ? AND u.user_type = 'vendor'
+        """, (email,)).fetchone()
+        return row[0] if row else None
+
+    def _load_batch(self, kind, batch, report):
+        """Insert one import batch row by row inside a single transaction"""
+        with self.transaction() as conn:
+            for line_no, record, password_hash in batch:
+                conn.execute('SAVEPOINT import_row')
+                try:
+                    if kind == 'customers':
+                        ok = self._insert_customer(conn, record, password_hash)
+                        error = None if ok else 'Email already registered'
+                    elif kind == 'vendors':
+                        ok = self._insert_vendor(conn, record, password_hash)
+                        error = None if ok else 'Email already registered'
+                    else:
+                        vendor_id = self._vendor_id_for_email(conn, record['vendorEmail'])
+                        if vendor_id:
+                            self._insert_services(conn, vendor_id, [record])
+                        error = None if vendor_id else 'Unknown vendor email'
+                    conn.execute('RELEASE SAVEPOINT import_row')
+                except sqlite3.Error as e:
+                    conn.execute('ROLLBACK TO SAVEPOINT import_row')
+                    conn.execute('RELEASE SAVEPOINT import_row')
+                    error = str(e)
+
+                if error:
+                    report.add_error(line_no, error)
+                else:
+                    report.imported += 1
+
+    def import_records(self, kind, lines, fmt='ndjson', batch_size=None):
+        return import_records(
+            self._load_batch, kind, lines, fmt, batch_size or DEFAULT_BATCH_SIZE
+        )
+
+    def health(self):
+        return {'sqlite': {'path': self.path, 'version': sqlite3.sqlite_version}}
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        if self._anchor is not None:
+            self._anchor.close()
+            self._anchor = None
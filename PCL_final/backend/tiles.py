@@ -0,0 +1,211 @@
+"""
+AquaHub Map Tiles
+Caching proxy for the OpenStreetMap tiles the dashboards draw
+
+/api/tiles/<z>/<x>/<y>.png answers from a size-capped LRU cache on disk
+(disk_cache.BlobCache, TILE_CACHE_MAX_MB). A missing tile is fetched once
+from TILE_UPSTREAM_URL however many dashboards ask for it at the same
+moment, and upstream fetches from every worker are paced together.
+Browsers keep tiles for TILE_BROWSER_MAX_AGE and revalidate by ETag.
+
+Tiles covering the vendors of each operating city can be fetched ahead
+of demand:
+
+    python tiles.py seed [--city Bangalore] [--min-zoom 10] [--max-zoom 15] [--max-tiles 20000]
+
+tile.openstreetmap.org does not allow bulk downloads; point
+TILE_UPSTREAM_URL at a provider that does before seeding many tiles.
+"""
+
+import argparse
+import math
+import os
+import threading
+import urllib.error
+import urllib.request
+
+from dotenv import load_dotenv
+
+from disk_cache import BlobCache, CachedFetcher, RateShaper
+from registration import MAX_DELIVERY_RADIUS_KM
+from vendor_search import KM_PER_DEGREE
+
+# Load environment variables
+load_dotenv()
+
+TILE_CONFIG = {
+    'upstream_url': os.getenv('TILE_UPSTREAM_URL') or 'https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+    'user_agent': os.getenv('TILE_USER_AGENT') or 'AquaHub Water Booking App',
+    'timeout': float(os.getenv('TILE_TIMEOUT') or 10),
+    'cache_path': os.getenv('TILE_CACHE_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'tile_cache.sqlite3'
+    ),
+    'cache_max_bytes': int(float(os.getenv('TILE_CACHE_MAX_MB') or 1024) * 2**20),
+    # OpenStreetMap asks for tiles to be kept at least a week
+    'ttl': int(os.getenv('TILE_CACHE_TTL') or 7 * 86400),
+    'browser_max_age': int(os.getenv('TILE_BROWSER_MAX_AGE') or 86400),
+    'max_zoom': int(os.getenv('TILE_MAX_ZOOM') or 19),
+    'min_interval': float(os.getenv('TILE_MIN_INTERVAL') or 0.05),
+    'max_wait': float(os.getenv('TILE_MAX_WAIT') or 5),
+}
+
+DEFAULT_SEED_ZOOMS = (10, 15)
+DEFAULT_SEED_LIMIT = 20000
+
+
+class TileUpstreamError(Exception):
+    """The upstream tile server failed or has no such tile"""
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= TILE_CONFIG['max_zoom'] and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def fetch_tile(z, x, y):
+    """(body, content_type) of a tile from the upstream server"""
+    request = urllib.request.Request(
+        TILE_CONFIG['upstream_url'].format(z=z, x=x, y=y),
+        headers={'User-Agent': TILE_CONFIG['user_agent']},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=TILE_CONFIG['timeout']) as response:
+            return response.read(), response.headers.get_content_type()
+    except (urllib.error.URLError, TimeoutError) as e:
+        raise TileUpstreamError(f'Tile {z}/{x}/{y} failed: {e}') from e
+
+
+class TileCache:
+    """Cached, deduplicated and paced access to the upstream tile server"""
+
+    def __init__(self, cache, shaper, fetch=fetch_tile, ttl=None):
+        self.fetcher = CachedFetcher(cache, shaper)
+        self.fetch = fetch
+        self.ttl = TILE_CONFIG['ttl'] if ttl is None else ttl
+
+    def get(self, z, x, y):
+        """(body, content_type, cache hit) of a valid tile"""
+        return self.fetcher.get(f'{z}/{x}/{y}', lambda: self.fetch(z, x, y), lambda body: self.ttl)
+
+    def stats(self):
+        return self.fetcher.stats()
+
+
+def open_tile_cache(max_wait=None):
+    path = TILE_CONFIG['cache_path']
+    return TileCache(
+        BlobCache(path, TILE_CONFIG['cache_max_bytes']),
+        RateShaper(path, 'tiles', TILE_CONFIG['min_interval'],
+                   TILE_CONFIG['max_wait'] if max_wait is None else max_wait),
+    )
+
+
+_tile_cache = None
+_tile_cache_lock = threading.Lock()
+
+
+def get_tile_cache():
+    """The process-wide TileCache, built from TILE_CONFIG on first use"""
+    global _tile_cache
+    if _tile_cache is None:
+        with _tile_cache_lock:
+            if _tile_cache is None:
+                _tile_cache = open_tile_cache()
+    return _tile_cache
+
+
+def set_tile_cache(tile_cache):
+    """Install a TileCache explicitly (a local upstream stand-in, tests of a deployment)"""
+    global _tile_cache
+    with _tile_cache_lock:
+        _tile_cache = tile_cache
+
+
+def tile_xy(lat, lng, z):
+    """Slippy-map tile containing a point at zoom z"""
+    lat = max(min(lat, 85.0511), -85.0511)
+    n = 2 ** z
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bounds(bounds, z):
+    """Tiles at zoom z covering (south, west, north, east)"""
+    south, west, north, east = bounds
+    x0, y0 = tile_xy(north, west, z)
+    x1, y1 = tile_xy(south, east, z)
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            yield z, x, y
+
+
+def city_bounds(vendors, cities=None):
+    """(south, west, north, east) per city around its vendors' delivery areas"""
+    wanted = {city.lower() for city in cities} if cities else None
+    bounds = {}
+    for vendor in vendors:
+        if not vendor.city or (wanted and vendor.city.lower() not in wanted):
+            continue
+        radius = min(vendor.delivery_radius_km or 0, MAX_DELIVERY_RADIUS_KM)
+        dlat = radius / KM_PER_DEGREE
+        dlng = radius / (KM_PER_DEGREE * max(math.cos(math.radians(vendor.latitude)), 0.01))
+        south, west, north, east = bounds.get(vendor.city, (90.0, 180.0, -90.0, -180.0))
+        bounds[vendor.city] = (
+            min(south, vendor.latitude - dlat), min(west, vendor.longitude - dlng),
+            max(north, vendor.latitude + dlat), max(east, vendor.longitude + dlng),
+        )
+    return bounds
+
+
+def seed_tiles(tile_cache, bounds, min_zoom, max_zoom, max_tiles=DEFAULT_SEED_LIMIT):
+    """Fill the cache for every tile of ``bounds`` from min_zoom to max_zoom
+
+    Zooms are seeded outward from min_zoom until ``max_tiles`` tiles have
+    been visited. Returns (tiles visited, tiles fetched, tiles failed).
+    """
+    visited = fetched = failed = 0
+    for z in range(min_zoom, max_zoom + 1):
+        for tile in sorted({t for b in bounds for t in tiles_in_bounds(b, z)}):
+            if visited == max_tiles:
+                return visited, fetched, failed
+            visited += 1
+            try:
+                if not tile_cache.get(*tile)[2]:
+                    fetched += 1
+            except TileUpstreamError as e:
+                print(f"⚠️  {e}")
+                failed += 1
+    return visited, fetched, failed
+
+
+def main():
+    from storage import get_storage
+
+    parser = argparse.ArgumentParser(description='Seed the AquaHub map tile cache')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    seed = subcommands.add_parser('seed', help="fetch the tiles around each operating city's vendors")
+    seed.add_argument('--city', action='append', help='only this city (repeatable)')
+    seed.add_argument('--min-zoom', type=int, default=DEFAULT_SEED_ZOOMS[0])
+    seed.add_argument('--max-zoom', type=int, default=DEFAULT_SEED_ZOOMS[1])
+    seed.add_argument('--max-tiles', type=int, default=DEFAULT_SEED_LIMIT)
+    args = parser.parse_args()
+
+    bounds = city_bounds(get_storage().iter_vendor_locations(), args.city)
+    if not bounds:
+        print("No located vendors to seed tiles for")
+        return
+    print(f"🗺️  Seeding zooms {args.min_zoom}-{args.max_zoom} for {', '.join(sorted(bounds))}")
+
+    # Seeding waits for its turn rather than giving up
+    tile_cache = open_tile_cache(max_wait=math.inf)
+    visited, fetched, failed = seed_tiles(
+        tile_cache, bounds.values(), args.min_zoom, min(args.max_zoom, TILE_CONFIG['max_zoom']), args.max_tiles
+    )
+    stats = tile_cache.stats()
+    print(f"✅ {visited} tiles: {fetched} fetched, {visited - fetched - failed} already cached, "
+          f"{failed} failed; cache holds {stats['entries']} tiles ({stats['bytes'] / 2**20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
+
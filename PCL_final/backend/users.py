@@ -0,0 +1,126 @@
+"""
+AquaHub User Listing
+Keyset-paginated and streamed reads of the users table
+"""
+
+import base64
+import datetime
+import json
+import uuid
+from dataclasses import dataclass
+
+from prepared import execute_prepared, register_query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 1000
+
+
+@dataclass(slots=True)
+class UserRow:
+    """One row of the users listing, built straight from a tuple cursor"""
+
+    id: str
+    email: str
+    user_type: str
+    created_at: datetime.datetime
+    name: str
+
+
+# Pages are ordered newest first on (created_at, id) so the keyset
+# predicate and ORDER BY both walk idx_users_created_at_id.
+USERS_SELECT_SQL = """
+    SELECT u.id, u.email, u.user_type, u.created_at,
+           CASE
+               WHEN u.user_type = 'customer' THEN cp.first_name || ' ' || cp.last_name
+               WHEN u.user_type = 'vendor' THEN vp.business_name
+           END as name
+    FROM users u
+    LEFT JOIN customer_profiles cp ON u.id = cp.user_id
+    LEFT JOIN vendor_profiles vp ON u.id = vp.user_id
+"""
+
+USERS_FIRST_PAGE_SQL = USERS_SELECT_SQL + """
+    ORDER BY u.created_at DESC, u.id DESC
+    LIMIT %(limit)s
+"""
+register_query('users_first_page', USERS_FIRST_PAGE_SQL)
+
+USERS_NEXT_PAGE_SQL = USERS_SELECT_SQL + """
+    WHERE (u.created_at, u.id) < (%(created_at)s::timestamptz, %(id)s::uuid)
+    ORDER BY u.created_at DESC, u.id DESC
+    LIMIT %(limit)s
+"""
+register_query('users_next_page', USERS_NEXT_PAGE_SQL)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(row):
+    """Build the opaque cursor pointing just past UserRow ``row``"""
+    created_at = row.created_at
+    if hasattr(created_at, 'isoformat'):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, str(row.id)])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (created_at, id)
+
+    Both parts are checked here so a well-formed but tampered cursor is
+    rejected before it reaches the database.
+    """
+    try:
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        datetime.datetime.fromisoformat(created_at)
+        user_id = str(uuid.UUID(user_id))
+    except (ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+    return created_at, user_id
+
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a requested page size, falling back to the default"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def fetch_users_page(conn, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Return (users, next_cursor) for one page of the newest-first listing
+
+    next_cursor is None once the last page has been reached.
+    """
+    params = {'limit': limit + 1}
+    query = 'users_first_page'
+    if cursor:
+        params['created_at'], params['id'] = decode_cursor(cursor)
+        query = 'users_next_page'
+
+    with conn.cursor() as cur:
+        execute_prepared(cur, query, params)
+        users = [UserRow(*row) for row in cur]
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1])
+    return users, next_cursor
+
+
+def iter_users(conn, batch_size=STREAM_BATCH_SIZE):
+    """Yield every user as a UserRow through a server-side named cursor
+
+    Rows are pulled from Postgres ``batch_size`` at a time, so memory stays
+    flat no matter how large the users table is.
+    """
+    with conn.cursor(name='users_export') as cur:
+        cur.itersize = batch_size
+        cur.execute(USERS_SELECT_SQL + ' ORDER BY u.created_at DESC, u.id DESC')
+        for row in cur:
+            yield UserRow(*row)
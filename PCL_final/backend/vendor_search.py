@@ -0,0 +1,211 @@
+"""
+AquaHub Vendor Search
+Grid-indexed lookup of vendors whose delivery radius covers a point
+
+Every vendor with coordinates is registered in each grid cell its delivery
+circle touches, so a search reads a single cell and checks only those
+candidates' haversine distance. A row of the shared distance cache
+(distances.py) keyed by the searcher's location orders them; vendors
+whose radius edge lies within the row's error are measured exactly, as
+are the distances returned. The index is a
+per-worker snapshot rebuilt whenever the catalog data version changes.
+"""
+
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+
+from distances import EARTH_RADIUS_KM, PointSet, distance_cache
+from registration import MAX_DELIVERY_RADIUS_KM
+from snapshots import SnapshotHolder
+
+# Load environment variables
+load_dotenv()
+
+SEARCH_CONFIG = {
+    'cell_deg': float(os.getenv('VENDOR_INDEX_CELL_DEG') or 0.25),
+}
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+DEFAULT_DELIVERY_RADIUS_KM = 50
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# One row per located vendor, with its active services' water types and
+# capacities aggregated alongside.
+VENDOR_LOCATIONS_SQL = """
+    SELECT vp.id, vp.business_name, vp.city, vp.latitude, vp.longitude,
+           COALESCE(vp.delivery_radius_km, 50), COALESCE(vp.tanker_capacity, '{}'),
+           COALESCE(array_agg(vs.water_type) FILTER (WHERE vs.id IS NOT NULL), '{}'),
+           COALESCE(array_agg(vs.tanker_capacity) FILTER (WHERE vs.id IS NOT NULL), '{}')
+    FROM vendor_profiles vp
+    JOIN users u ON u.id = vp.user_id AND u.is_active
+    LEFT JOIN vendor_services vs ON vs.vendor_id = vp.id AND vs.is_active
+    WHERE vp.latitude IS NOT NULL AND vp.longitude IS NOT NULL
+    GROUP BY vp.id
+"""
+
+
+@dataclass(slots=True)
+class VendorLocation:
+    """A located vendor and what its active services can deliver"""
+
+    id: str
+    business_name: str
+    city: str
+    latitude: float
+    longitude: float
+    delivery_radius_km: int
+    tanker_capacity: list
+    service_water_types: list
+    service_capacities: list
+
+
+@dataclass(slots=True)
+class VendorHit:
+    """One search result"""
+
+    id: str
+    business_name: str
+    city: str
+    latitude: float
+    longitude: float
+    distance_km: float
+    delivery_radius_km: int
+    water_types: list
+    max_capacity: int
+
+
+def iter_vendor_locations(conn):
+    """Yield every located vendor as a VendorLocation"""
+    with conn.cursor(name='vendor_locations') as cur:
+        cur.itersize = 5000
+        cur.execute(VENDOR_LOCATIONS_SQL)
+        for row in cur:
+            yield VendorLocation(*row)
+
+
+def normalize_water_type(value):
+    return (value or '').strip().lower()
+
+
+class VendorGeoIndex:
+    """Immutable grid index over a snapshot of vendor locations"""
+
+    def __init__(self, vendors, cell_deg=None, version=None):
+        self.cell_deg = cell_deg or SEARCH_CONFIG['cell_deg']
+        self.vendors = list(vendors)
+        # Distance rows are cached per catalog version; an index built
+        # outside a snapshot has none and measures every search afresh
+        self.version = None if version is None else ('vendor_index', version)
+        count = len(self.vendors)
+
+        self.points = PointSet(
+            [v.latitude for v in self.vendors], [v.longitude for v in self.vendors]
+        )
+        self.radius = np.minimum(np.array(
+            [v.delivery_radius_km or DEFAULT_DELIVERY_RADIUS_KM for v in self.vendors],
+            dtype=np.float64
+        ), MAX_DELIVERY_RADIUS_KM)
+
+        # capacity[i, 0] is vendor i's largest tanker of any kind,
+        # capacity[i, t] its largest service of water type t (0 = none)
+        types = sorted({
+            normalize_water_type(w) for v in self.vendors for w in v.service_water_types if w
+        })
+        self.water_types = {name: column for column, name in enumerate(types, start=1)}
+        self.capacity = np.zeros((count, len(types) + 1), dtype=np.int64)
+        for i, vendor in enumerate(self.vendors):
+            self.capacity[i, 0] = max(
+                [c or 0 for c in vendor.tanker_capacity] +
+                [c or 0 for c in vendor.service_capacities] + [0]
+            )
+            for water_type, capacity in zip(vendor.service_water_types, vendor.service_capacities):
+                column = self.water_types.get(normalize_water_type(water_type))
+                if column and (capacity or 0) > self.capacity[i, column]:
+                    self.capacity[i, column] = capacity
+
+        cells = {}
+        for i, vendor in enumerate(self.vendors):
+            for cell in self._covered_cells(vendor.latitude, vendor.longitude, self.radius[i]):
+                cells.setdefault(cell, []).append(i)
+        self.cells = {cell: np.array(ids, dtype=np.int32) for cell, ids in cells.items()}
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def _covered_cells(self, lat, lng, radius_km):
+        """Cells touched by the bounding box of a delivery circle"""
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lng_lo = self._cell(max(lat - dlat, -90.0), lng - dlng)
+        lat_hi, lng_hi = self._cell(min(lat + dlat, 90.0), lng + dlng)
+        for lat_cell in range(lat_lo, lat_hi + 1):
+            for lng_cell in range(lng_lo, lng_hi + 1):
+                yield (lat_cell, lng_cell)
+
+    def __len__(self):
+        return len(self.vendors)
+
+    def search(self, lat, lng, water_type=None, min_capacity=None,
+               limit=DEFAULT_SEARCH_LIMIT, offset=0):
+        """Vendors delivering to (lat, lng), nearest first
+
+        Returns (hits, total) where total counts every match before paging.
+        """
+        cell = self._cell(lat, lng)
+        candidates = self.cells.get(cell)
+        if candidates is None:
+            return [], 0
+
+        column = 0
+        if water_type:
+            column = self.water_types.get(normalize_water_type(water_type))
+            if column is None:
+                return [], 0
+
+        distance = distance_cache.row(lat, lng, self.points, self.version, candidates, cell)
+        radius = self.radius[candidates]
+
+        mask = distance <= radius
+        error = distance_cache.error_km(lat, lng, self.version)
+        boundary = np.flatnonzero(np.abs(distance - radius) <= error)
+        if boundary.size:
+            mask[boundary] = self.points.distances_from(
+                lat, lng, candidates[boundary], distance_cache.method
+            ) <= radius[boundary]
+        capacity = self.capacity[candidates, column]
+        if min_capacity:
+            mask &= capacity >= min_capacity
+        elif column:
+            mask &= capacity > 0
+
+        matched = candidates[mask]
+        order = np.argsort(distance[mask], kind='stable')[offset:offset + limit]
+        page = matched[order]
+        exact = self.points.distances_from(lat, lng, page, distance_cache.method)
+        hits = [self._hit(int(i), float(d)) for i, d in zip(page, exact.tolist())]
+        return hits, int(mask.sum())
+
+    def _hit(self, i, distance_km):
+        vendor = self.vendors[i]
+        water_types = sorted({normalize_water_type(w) for w in vendor.service_water_types if w})
+        return VendorHit(
+            vendor.id, vendor.business_name, vendor.city, vendor.latitude, vendor.longitude,
+            round(distance_km, 2), int(self.radius[i]), water_types, int(self.capacity[i, 0])
+        )
+
+
+vendor_index = SnapshotHolder(
+    'vendor_index', 'catalog',
+    lambda storage, version: VendorGeoIndex(storage.iter_vendor_locations(), version=version)
+)
+
+
+def get_vendor_index(storage):
+    """Return this worker's index, rebuilding it when the catalog changed"""
+    return vendor_index.get(storage)
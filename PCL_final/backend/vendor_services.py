@@ -0,0 +1,47 @@
+"""
+AquaHub Vendor Service Offerings
+Batched writes to the vendor_services table
+"""
+
+from psycopg2.extras import execute_values
+
+INSERT_SERVICES_SQL = """
+    INSERT INTO vendor_services
+    (vendor_id, service_name, water_type, tanker_capacity, price_per_liter,
+     minimum_order_quantity, available_days, available_time_slots, coverage_areas)
+    VALUES %s
+    RETURNING id
+"""
+
+# Explicit casts keep empty arrays and JSON numbers-as-strings typed the
+# same way in every row of the VALUES list.
+SERVICE_ROW_TEMPLATE = (
+    '(%s::uuid, %s, %s, %s::integer, %s::numeric, %s::integer, '
+    '%s::text[], %s::text[], %s::text[])'
+)
+
+
+def service_row(vendor_id, service):
+    """Map one service payload onto a vendor_services row tuple"""
+    return (
+        vendor_id, service.get('serviceName', ''), service.get('waterType', 'potable'),
+        service.get('tankerCapacity', 5000), service.get('pricePerLiter', 1.50),
+        service.get('minimumOrder', 1000), service.get('availableDays', []),
+        service.get('availableTimeSlots', []), service.get('coverageAreas', [])
+    )
+
+
+def insert_vendor_services(cur, vendor_id, services):
+    """Insert all of a vendor's services with one multi-row INSERT
+
+    Returns the new service ids. The whole batch goes out as a single
+    statement regardless of how many services are given.
+    """
+    rows = [service_row(vendor_id, service) for service in services]
+    if not rows:
+        return []
+    result = execute_values(
+        cur, INSERT_SERVICES_SQL, rows,
+        template=SERVICE_ROW_TEMPLATE, page_size=len(rows), fetch=True
+    )
+    return [str(row[0]) for row in result]
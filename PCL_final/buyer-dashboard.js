@@ -8,6 +8,19 @@ let marker;
 let autocomplete;
 let selectedLocation = null;
 let useOpenStreetMap = false; // Flag to track which map system to use
+let placeSuggestions = []; // Last results of the place autocomplete
+const pincodeCache = new Map(); // pincode -> pending/settled directory lookup
+const reverseCache = new Map(); // rounded "lat,lng" -> pending/settled reverse geocode
+
+// Origin of the backend API (backend/app.py). The pages are served from a
+// different origin (dev_server.py, or any static host), so API calls name
+// it explicitly; set window.AQUAHUB_API_BASE before this script to point
+// elsewhere, or to '' when a proxy serves /api on the page's own origin.
+const API_BASE = (window.AQUAHUB_API_BASE ?? 'http://localhost:5001').replace(/\/$/, '');
+
+function apiUrl(path) {
+    return `${API_BASE}${path}`;
+}
 
 // Initialize map (called by Google Maps callback or manually)
 function initMap() {
@@ -62,17 +75,18 @@ function initializeOpenStreetMap() {
     
     if (!locationInput) return;
 
-    // Add autocomplete using OpenStreetMap Nominatim
+    // Add autocomplete from the backend's local place index
     let searchTimeout;
     locationInput.addEventListener('input', function(e) {
         clearTimeout(searchTimeout);
         const query = e.target.value;
         
-        if (query.length < 3) return;
+        if (selectPlaceSuggestion(query)) return;
+        if (query.length < 2) return;
         
         searchTimeout = setTimeout(() => {
             searchLocationOSM(query);
-        }, 500);
+        }, 150);
     });
 
     // Current location button
@@ -84,16 +98,15 @@ function initializeOpenStreetMap() {
     showNotification('Map ready! Using OpenStreetMap. Enter your location or use current location.', 'info');
 }
 
-// Search for locations using OpenStreetMap Nominatim
+// Search for localities, areas and landmarks in the backend's offline place index
 function searchLocationOSM(query) {
-    fetch(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(query)}, India&limit=5`, {
-        headers: {
-            'User-Agent': 'AquaHub Water Booking App'
-        }
+    fetch(apiUrl(`/api/places/autocomplete?q=${encodeURIComponent(query)}&limit=5`))
+    .then(response => {
+        if (!response.ok) throw new Error(`Place autocomplete failed (${response.status})`);
+        return response.json();
     })
-    .then(response => response.json())
-    .then(results => {
-        if (results && results.length > 0) {
+    .then(data => {
+        if (data.places && data.places.length > 0) {
             // Create a simple datalist for suggestions
             let datalist = document.getElementById('location-suggestions');
             if (!datalist) {
@@ -103,8 +116,12 @@ function searchLocationOSM(query) {
                 document.body.appendChild(datalist);
             }
             
-            datalist.innerHTML = results.map(r => 
-                `<option value="${r.display_name}" data-lat="${r.lat}" data-lon="${r.lon}"></option>`
+            placeSuggestions = data.places.map(place => ({
+                ...place,
+                label: [place.name, place.district, place.state, place.pincode].filter(Boolean).join(', ')
+            }));
+            datalist.innerHTML = placeSuggestions.map(place =>
+                `<option value="${place.label}"></option>`
             ).join('');
         }
     })
@@ -113,6 +130,31 @@ function searchLocationOSM(query) {
     });
 }
 
+// Use a suggestion picked from the datalist; returns whether one matched
+function selectPlaceSuggestion(value) {
+    const place = placeSuggestions.find(p => p.label === value);
+    if (!place || place.latitude === null || place.longitude === null) return false;
+
+    const addressDetails = {
+        suburb: place.name,
+        city: place.district,
+        state: place.state,
+        postcode: place.pincode
+    };
+    selectedLocation = {
+        address: place.label,
+        lat: place.latitude,
+        lng: place.longitude,
+        name: place.name,
+        addressDetails: addressDetails
+    };
+
+    fillManualAddressFromLocation(addressDetails);
+    showLocationOnMap(selectedLocation);
+    showNotification('📍 Location set and address form filled! You can modify the details if needed.', 'success');
+    return true;
+}
+
 // Handle place selection
 function onPlaceChanged() {
     const place = autocomplete.getPlace();
@@ -167,6 +209,41 @@ function onPlaceChanged() {
     showNotification(`📍 Location set and address form filled! You can modify the details if needed.`, 'success');
 }
 
+// Reverse geocode a point, preferring the backend's offline nearest-locality
+// index and falling back to its cached OpenStreetMap proxy. Resolves to a
+// Nominatim-shaped { display_name, address } object; points ~10 m apart
+// share one lookup.
+function reverseGeocode(lat, lng) {
+    const key = `${lat.toFixed(4)},${lng.toFixed(4)}`;
+    if (!reverseCache.has(key)) {
+        const lookup = fetch(apiUrl(`/api/places/nearest?lat=${lat}&lng=${lng}`))
+            .then(response => {
+                if (!response.ok) throw new Error(`Nearest locality lookup failed (${response.status})`);
+                return response.json();
+            })
+            .then(place => ({
+                display_name: [place.area, place.city, place.state, place.pincode].filter(Boolean).join(', '),
+                address: {
+                    suburb: place.area || '',
+                    city: place.city || '',
+                    state: place.state || '',
+                    postcode: place.pincode || ''
+                }
+            }))
+            .catch(() => fetch(apiUrl(`/api/geocode/reverse?lat=${lat}&lng=${lng}&zoom=18`))
+                .then(response => {
+                    if (!response.ok) throw new Error(`Reverse geocoding failed (${response.status})`);
+                    return response.json();
+                }))
+            .catch(error => {
+                reverseCache.delete(key);
+                throw error;
+            });
+        reverseCache.set(key, lookup);
+    }
+    return reverseCache.get(key);
+}
+
 // Get current location using browser geolocation
 function getCurrentLocation() {
     if (!navigator.geolocation) {
@@ -183,13 +260,7 @@ function getCurrentLocation() {
 
             console.log('Current coordinates:', lat, lng);
 
-            // Use OpenStreetMap for geocoding (works for both map systems)
-            fetch(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}&zoom=18&addressdetails=1`, {
-                headers: {
-                    'User-Agent': 'AquaHub Water Booking App'
-                }
-            })
-            .then(response => response.json())
+            reverseGeocode(lat, lng)
             .then(data => {
                 if (data && data.display_name) {
                     const locationInput = document.getElementById('location');
@@ -239,13 +310,7 @@ function getCurrentLocation() {
 
 // Fallback function when geocoding fails
 function useCoordinatesOnly(lat, lng) {
-    // Try alternative geocoding service as fallback
-    fetch(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}&zoom=18&addressdetails=1`, {
-        headers: {
-            'Accept-Language': 'en'
-        }
-    })
-    .then(response => response.json())
+    reverseGeocode(lat, lng)
     .then(data => {
         if (data && data.display_name) {
             const locationInput = document.getElementById('location');
@@ -362,8 +427,8 @@ function showLocationOnOpenStreetMap(location, mapDiv) {
         // Create Leaflet map
         map = L.map(mapDiv).setView([location.lat, location.lng], 15);
 
-        // Add OpenStreetMap tiles
-        L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        // OpenStreetMap tiles through the backend's caching tile proxy
+        L.tileLayer(apiUrl('/api/tiles/{z}/{x}/{y}.png'), {
             attribution: '© <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
             maxZoom: 19
         }).addTo(map);
@@ -410,12 +475,7 @@ function showLocationOnOpenStreetMap(location, mapDiv) {
 function updateLocationFromCoordinates(lat, lng) {
     showNotification('Updating address...', 'info');
     
-    fetch(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}&zoom=18&addressdetails=1`, {
-        headers: {
-            'User-Agent': 'AquaHub Water Booking App'
-        }
-    })
-    .then(response => response.json())
+    reverseGeocode(lat, lng)
     .then(data => {
         if (data && data.display_name) {
             const locationInput = document.getElementById('location');
@@ -659,37 +719,54 @@ function highlightField(fieldId) {
     }, 2000);
 }
 
-// Lookup location by pincode
+// Look a pincode up in the backend's offline directory; resolves to null
+// when it is unknown. Lookups are cached, so geocoding the address later
+// costs no extra request.
+function fetchPincode(pincode) {
+    if (!pincodeCache.has(pincode)) {
+        const lookup = fetch(apiUrl(`/api/pincodes/${pincode}`))
+            .then(response => {
+                if (response.status === 404) return null;
+                if (!response.ok) throw new Error(`Pincode lookup failed (${response.status})`);
+                return response.json();
+            })
+            .catch(error => {
+                pincodeCache.delete(pincode);
+                throw error;
+            });
+        pincodeCache.set(pincode, lookup);
+    }
+    return pincodeCache.get(pincode);
+}
+
 function lookupPincode(pincode) {
     if (pincode.length !== 6) return;
 
     showNotification('Looking up pincode...', 'info');
 
-    // Use India Post API or OpenStreetMap
-    fetch(`https://api.postalpincode.in/pincode/${pincode}`)
-        .then(response => response.json())
+    fetchPincode(pincode)
         .then(data => {
-            if (data && data[0] && data[0].Status === 'Success') {
-                const postOffice = data[0].PostOffice[0];
+            if (data) {
+                const postOffice = data.post_offices[0] || '';
                 
                 // Auto-fill area and city
-                if (postOffice.Name && !document.getElementById('area').value) {
-                    document.getElementById('area').value = postOffice.Name;
+                if (postOffice && !document.getElementById('area').value) {
+                    document.getElementById('area').value = postOffice;
                 }
-                if (postOffice.District && !document.getElementById('city').value) {
-                    document.getElementById('city').value = postOffice.District;
+                if (data.district && !document.getElementById('city').value) {
+                    document.getElementById('city').value = data.district;
                 }
-                if (postOffice.State) {
+                if (data.state) {
                     const stateSelect = document.getElementById('state');
                     const matchingOption = Array.from(stateSelect.options).find(
-                        opt => opt.value.toLowerCase() === postOffice.State.toLowerCase()
+                        opt => opt.value.toLowerCase() === data.state.toLowerCase()
                     );
                     if (matchingOption) {
                         stateSelect.value = matchingOption.value;
                     }
                 }
                 
-                showNotification(`✓ Pincode found: ${postOffice.Name}, ${postOffice.District}`, 'success');
+                showNotification(`✓ Pincode found: ${[postOffice, data.district].filter(Boolean).join(', ')}`, 'success');
             } else {
                 showNotification('Pincode not found. Please verify and try again.', 'warning');
             }
@@ -761,12 +838,11 @@ function locateManualAddress() {
     // Geocode the address
     const query = `${houseNo} ${street}, ${area}, ${city}, ${pincode}, India`;
     
-    fetch(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(query)}&limit=1`, {
-        headers: {
-            'User-Agent': 'AquaHub Water Booking App'
-        }
+    fetch(apiUrl(`/api/geocode/search?q=${encodeURIComponent(query)}&limit=1`))
+    .then(response => {
+        if (!response.ok) throw new Error(`Geocoding failed (${response.status})`);
+        return response.json();
     })
-    .then(response => response.json())
     .then(results => {
         if (results && results.length > 0) {
             const result = results[0];
@@ -811,22 +887,15 @@ function locateManualAddress() {
 
 // Fallback geocoding using just pincode
 function geocodeByPincode(pincode, fullAddress) {
-    fetch(`https://nominatim.openstreetmap.org/search?format=json&postalcode=${pincode}&country=India&limit=1`, {
-        headers: {
-            'User-Agent': 'AquaHub Water Booking App'
-        }
-    })
-    .then(response => response.json())
-    .then(results => {
-        if (results && results.length > 0) {
-            const result = results[0];
-            
+    fetchPincode(pincode)
+    .then(data => {
+        if (data && data.latitude !== null && data.longitude !== null) {
             document.getElementById('location').value = fullAddress;
             
             selectedLocation = {
                 address: fullAddress,
-                lat: parseFloat(result.lat),
-                lng: parseFloat(result.lon),
+                lat: data.latitude,
+                lng: data.longitude,
                 name: 'Manual Address',
                 pincode: pincode
             };
@@ -0,0 +1,4 @@
+-- Keyset pagination index for GET /api/users
+-- Serves ORDER BY created_at DESC, id DESC and the (created_at, id) < (...) predicate
+
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users (created_at DESC, id DESC);
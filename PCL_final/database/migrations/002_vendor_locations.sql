@@ -0,0 +1,7 @@
+-- Vendor depot coordinates for GET /api/vendors/search
+-- Vendors without coordinates are simply left out of radius search
+
+ALTER TABLE vendor_profiles ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION
+    CHECK (latitude BETWEEN -90 AND 90);
+ALTER TABLE vendor_profiles ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION
+    CHECK (longitude BETWEEN -180 AND 180);
@@ -0,0 +1,98 @@
+-- Normalized service areas for GET /api/areas/<name>/vendors
+-- vendor_profiles.service_areas and vendor_services.coverage_areas stay the
+-- source of truth; triggers keep the join tables below in step with them, so
+-- "which vendors serve X" is two index-only scans instead of unnesting every
+-- array in the table.
+
+-- Canonical spelling used to match area names: lower case, runs of
+-- punctuation/whitespace collapsed to one space. Mirrored by areas.area_key().
+CREATE OR REPLACE FUNCTION area_key(name TEXT)
+RETURNS TEXT AS $$
+    SELECT btrim(regexp_replace(lower(name), '[^[:alnum:]]+', ' ', 'g'))
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+CREATE TABLE IF NOT EXISTS areas (
+    id SERIAL PRIMARY KEY,
+    area_key VARCHAR(255) UNIQUE NOT NULL,
+    name VARCHAR(255) NOT NULL
+);
+
+-- Areas a vendor lists on its profile
+CREATE TABLE IF NOT EXISTS vendor_service_areas (
+    area_id INTEGER REFERENCES areas(id) ON DELETE CASCADE,
+    vendor_id UUID REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    PRIMARY KEY (area_id, vendor_id)
+);
+CREATE INDEX IF NOT EXISTS idx_vendor_service_areas_vendor_id ON vendor_service_areas(vendor_id);
+
+-- Areas covered by a vendor's active services
+CREATE TABLE IF NOT EXISTS vendor_service_coverage (
+    area_id INTEGER REFERENCES areas(id) ON DELETE CASCADE,
+    vendor_id UUID REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    service_id UUID REFERENCES vendor_services(id) ON DELETE CASCADE,
+    PRIMARY KEY (area_id, vendor_id, service_id)
+);
+CREATE INDEX IF NOT EXISTS idx_vendor_service_coverage_service_id ON vendor_service_coverage(service_id);
+
+CREATE OR REPLACE FUNCTION ensure_areas(names TEXT[])
+RETURNS VOID AS $$
+    INSERT INTO areas (area_key, name)
+    SELECT DISTINCT ON (area_key(n)) area_key(n), btrim(n)
+    FROM unnest(names) AS n
+    WHERE area_key(n) <> ''
+    ORDER BY area_key(n), btrim(n)
+    ON CONFLICT (area_key) DO NOTHING
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION sync_vendor_service_areas()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM vendor_service_areas WHERE vendor_id = NEW.id;
+    PERFORM ensure_areas(NEW.service_areas);
+    INSERT INTO vendor_service_areas (area_id, vendor_id)
+    SELECT DISTINCT a.id, NEW.id
+    FROM unnest(NEW.service_areas) AS n
+    JOIN areas a ON a.area_key = area_key(n);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION sync_vendor_service_coverage()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM vendor_service_coverage WHERE service_id = NEW.id;
+    IF NEW.is_active IS NOT FALSE THEN
+        PERFORM ensure_areas(NEW.coverage_areas);
+        INSERT INTO vendor_service_coverage (area_id, vendor_id, service_id)
+        SELECT DISTINCT a.id, NEW.vendor_id, NEW.id
+        FROM unnest(NEW.coverage_areas) AS n
+        JOIN areas a ON a.area_key = area_key(n);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_vendor_service_areas ON vendor_profiles;
+CREATE TRIGGER sync_vendor_service_areas AFTER INSERT OR UPDATE OF service_areas ON vendor_profiles FOR EACH ROW EXECUTE FUNCTION sync_vendor_service_areas();
+DROP TRIGGER IF EXISTS sync_vendor_service_coverage ON vendor_services;
+CREATE TRIGGER sync_vendor_service_coverage AFTER INSERT OR UPDATE OF coverage_areas, is_active, vendor_id ON vendor_services FOR EACH ROW EXECUTE FUNCTION sync_vendor_service_coverage();
+
+-- Backfill from existing rows
+SELECT ensure_areas(array_agg(n)) FROM (
+    SELECT unnest(service_areas) FROM vendor_profiles
+    UNION ALL
+    SELECT unnest(coverage_areas) FROM vendor_services WHERE is_active IS NOT FALSE
+) AS all_areas(n);
+
+INSERT INTO vendor_service_areas (area_id, vendor_id)
+SELECT DISTINCT a.id, vp.id
+FROM vendor_profiles vp, unnest(vp.service_areas) AS n
+JOIN areas a ON a.area_key = area_key(n)
+ON CONFLICT DO NOTHING;
+
+INSERT INTO vendor_service_coverage (area_id, vendor_id, service_id)
+SELECT DISTINCT a.id, vs.vendor_id, vs.id
+FROM vendor_services vs, unnest(vs.coverage_areas) AS n
+JOIN areas a ON a.area_key = area_key(n)
+WHERE vs.is_active IS NOT FALSE AND vs.vendor_id IS NOT NULL
+ON CONFLICT DO NOTHING;
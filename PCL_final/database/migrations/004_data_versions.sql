@@ -0,0 +1,29 @@
+-- Change counters for in-memory snapshots (catalog, vendor search)
+-- Workers poll one row instead of scanning vendor tables to learn whether
+-- their snapshot is stale. The counter is bumped once per statement, so a
+-- bulk import costs one update, not one per row.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO data_versions (name) VALUES ('catalog') ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE data_versions
+    SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+    WHERE name = 'catalog';
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS bump_catalog_version ON vendor_services;
+CREATE TRIGGER bump_catalog_version AFTER INSERT OR UPDATE OR DELETE ON vendor_services FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+DROP TRIGGER IF EXISTS bump_catalog_version ON vendor_profiles;
+CREATE TRIGGER bump_catalog_version AFTER INSERT OR UPDATE OR DELETE ON vendor_profiles FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+DROP TRIGGER IF EXISTS bump_catalog_version ON users;
+CREATE TRIGGER bump_catalog_version AFTER UPDATE OF is_active OR DELETE ON users FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
@@ -0,0 +1,153 @@
+-- Pincode serviceability for GET /api/pincodes/<pincode>/vendors
+-- Whether a service delivers to a pincode is decided when the vendor, one of
+-- its services or the pincode directory changes, and stored in
+-- pincode_serviceability, so "who serves 560001" is one range scan on its
+-- primary key. An active service serves a pincode when
+--   * the vendor's postal code, service areas or the service's coverage
+--     areas name the pincode or one of its localities, or
+--   * the pincode centroid lies within the vendor's delivery radius.
+-- Only the rows of the vendors (or pincodes) that changed are recomputed.
+
+CREATE TABLE IF NOT EXISTS pincodes (
+    pincode VARCHAR(6) PRIMARY KEY,
+    district VARCHAR(100),
+    state VARCHAR(100),
+    latitude DOUBLE PRECISION CHECK (latitude BETWEEN -90 AND 90),
+    longitude DOUBLE PRECISION CHECK (longitude BETWEEN -180 AND 180)
+);
+CREATE INDEX IF NOT EXISTS idx_pincodes_location ON pincodes(latitude, longitude);
+
+-- Post offices/localities of a pincode by area_key(); every pincode is also
+-- listed under its own number, so areas given as "560001" match too
+CREATE TABLE IF NOT EXISTS pincode_localities (
+    area_key VARCHAR(255),
+    pincode VARCHAR(6) REFERENCES pincodes(pincode) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    PRIMARY KEY (area_key, pincode)
+);
+CREATE INDEX IF NOT EXISTS idx_pincode_localities_pincode ON pincode_localities(pincode);
+
+CREATE TABLE IF NOT EXISTS pincode_serviceability (
+    pincode VARCHAR(6) REFERENCES pincodes(pincode) ON DELETE CASCADE,
+    vendor_id UUID REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    service_id UUID REFERENCES vendor_services(id) ON DELETE CASCADE,
+    PRIMARY KEY (pincode, vendor_id, service_id)
+);
+CREATE INDEX IF NOT EXISTS idx_pincode_serviceability_vendor_id ON pincode_serviceability(vendor_id);
+
+-- Great-circle distance; mirrors vendor_search.EARTH_RADIUS_KM
+CREATE OR REPLACE FUNCTION haversine_km(
+    lat1 DOUBLE PRECISION, lng1 DOUBLE PRECISION, lat2 DOUBLE PRECISION, lng2 DOUBLE PRECISION
+)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT 2 * 6371.0088 * asin(least(1.0, sqrt(
+        power(sin(radians(lat2 - lat1) / 2), 2)
+        + cos(radians(lat1)) * cos(radians(lat2)) * power(sin(radians(lng2 - lng1) / 2), 2)
+    )))
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Serviceable (pincode, vendor, service) rows of the given vendors and/or
+-- pincodes; NULL means all. Each vendor drives an index range scan on the
+-- pincodes inside its radius bounding box.
+CREATE OR REPLACE FUNCTION serviceable_pincodes(vendor_ids UUID[], codes TEXT[])
+RETURNS TABLE (pincode VARCHAR, vendor_id UUID, service_id UUID) AS $$
+    WITH services AS (
+        SELECT vs.id, vs.vendor_id,
+               coalesce(vs.coverage_areas, '{}') || coalesce(vp.service_areas, '{}')
+                   || ARRAY[vp.postal_code::TEXT] AS names
+        FROM vendor_services vs
+        JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+        JOIN users u ON u.id = vp.user_id AND u.is_active
+        WHERE vs.is_active IS NOT FALSE
+          AND (vendor_ids IS NULL OR vs.vendor_id = ANY (vendor_ids))
+    ), vendors AS (
+        SELECT vp.id, vp.latitude, vp.longitude,
+               coalesce(vp.delivery_radius_km, 50)::DOUBLE PRECISION AS radius_km,
+               coalesce(vp.delivery_radius_km, 50)
+                   / (111.195 * greatest(cos(radians(vp.latitude)), 0.01)) AS lng_span
+        FROM vendor_profiles vp
+        WHERE vp.latitude IS NOT NULL AND vp.longitude IS NOT NULL
+          AND vp.id IN (SELECT vendor_id FROM services)
+    )
+    SELECT pl.pincode, s.vendor_id, s.id
+    FROM services s
+    CROSS JOIN LATERAL unnest(s.names) AS n
+    JOIN pincode_localities pl ON pl.area_key = area_key(n)
+    WHERE codes IS NULL OR pl.pincode = ANY (codes)
+    UNION
+    SELECT p.pincode, s.vendor_id, s.id
+    FROM vendors v
+    JOIN pincodes p
+      ON p.latitude BETWEEN v.latitude - v.radius_km / 111.195 AND v.latitude + v.radius_km / 111.195
+     AND p.longitude BETWEEN v.longitude - v.lng_span AND v.longitude + v.lng_span
+     AND haversine_km(v.latitude, v.longitude, p.latitude, p.longitude) <= v.radius_km
+    JOIN services s ON s.vendor_id = v.id
+    WHERE codes IS NULL OR p.pincode = ANY (codes)
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION refresh_vendor_serviceability(vendor_ids UUID[])
+RETURNS VOID AS $$
+    DELETE FROM pincode_serviceability WHERE vendor_id = ANY (vendor_ids);
+    INSERT INTO pincode_serviceability (pincode, vendor_id, service_id)
+    SELECT * FROM serviceable_pincodes(vendor_ids, NULL);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION refresh_pincode_serviceability(codes TEXT[])
+RETURNS VOID AS $$
+    DELETE FROM pincode_serviceability WHERE pincode = ANY (codes);
+    INSERT INTO pincode_serviceability (pincode, vendor_id, service_id)
+    SELECT * FROM serviceable_pincodes(NULL, codes);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION refresh_profile_serviceability()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_vendor_serviceability(ARRAY[NEW.id]);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION refresh_user_serviceability()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_vendor_serviceability(ARRAY(
+        SELECT id FROM vendor_profiles WHERE user_id = NEW.id
+    ));
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Statement-level, so a bulk import refreshes each vendor once. Updates
+-- that only touch prices or schedules leave serviceability alone.
+CREATE OR REPLACE FUNCTION refresh_services_serviceability()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_vendor_serviceability(ARRAY(
+            SELECT DISTINCT vendor_id FROM new_rows WHERE vendor_id IS NOT NULL
+        ));
+    ELSE
+        PERFORM refresh_vendor_serviceability(ARRAY(
+            SELECT unnest(ARRAY[o.vendor_id, n.vendor_id])
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            WHERE (n.vendor_id, n.is_active, n.coverage_areas)
+                  IS DISTINCT FROM (o.vendor_id, o.is_active, o.coverage_areas)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS refresh_profile_serviceability ON vendor_profiles;
+CREATE TRIGGER refresh_profile_serviceability AFTER UPDATE OF postal_code, service_areas, delivery_radius_km, latitude, longitude ON vendor_profiles FOR EACH ROW EXECUTE FUNCTION refresh_profile_serviceability();
+DROP TRIGGER IF EXISTS refresh_user_serviceability ON users;
+CREATE TRIGGER refresh_user_serviceability AFTER UPDATE OF is_active ON users FOR EACH ROW WHEN (OLD.is_active IS DISTINCT FROM NEW.is_active AND NEW.user_type = 'vendor') EXECUTE FUNCTION refresh_user_serviceability();
+DROP TRIGGER IF EXISTS refresh_services_serviceability_insert ON vendor_services;
+CREATE TRIGGER refresh_services_serviceability_insert AFTER INSERT ON vendor_services REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_services_serviceability();
+DROP TRIGGER IF EXISTS refresh_services_serviceability_update ON vendor_services;
+CREATE TRIGGER refresh_services_serviceability_update AFTER UPDATE ON vendor_services REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_services_serviceability();
+
+-- Deleted services and vendors drop out through ON DELETE CASCADE.
+-- Backfill for any pincodes already loaded
+SELECT refresh_pincode_serviceability(ARRAY(SELECT pincode FROM pincodes));
@@ -0,0 +1,90 @@
+-- Precomputed top-K vendor services per pincode and water type
+-- GET /api/pincodes/<pincode>/top-services reads K rows of pincode_rankings
+-- by primary key. Writes that can change a ranking (serviceability, prices,
+-- ratings, dispatch times) queue the affected pincodes in ranking_queue;
+-- ranking.py re-scores just those pincodes (see ranking.RANKING_CONFIG for
+-- the weights).
+
+-- Vendor ratings are kept as running totals so a new rating is one UPDATE
+ALTER TABLE vendor_profiles ADD COLUMN IF NOT EXISTS rating_total INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE vendor_profiles ADD COLUMN IF NOT EXISTS rating_count INTEGER NOT NULL DEFAULT 0;
+-- Minutes from order to a tanker leaving the depot
+ALTER TABLE vendor_profiles ADD COLUMN IF NOT EXISTS dispatch_minutes INTEGER DEFAULT 60
+    CHECK (dispatch_minutes >= 0);
+
+CREATE TABLE IF NOT EXISTS ranking_queue (
+    pincode VARCHAR(6) PRIMARY KEY,
+    queued_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_ranking_queue_queued_at ON ranking_queue(queued_at);
+
+CREATE TABLE IF NOT EXISTS pincode_rankings (
+    pincode VARCHAR(6),
+    water_type VARCHAR(50),
+    rank SMALLINT,
+    service_id UUID REFERENCES vendor_services(id) ON DELETE CASCADE,
+    vendor_id UUID REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    score REAL NOT NULL,
+    distance_km REAL,
+    eta_minutes INTEGER,
+    PRIMARY KEY (pincode, water_type, rank)
+);
+CREATE INDEX IF NOT EXISTS idx_pincode_rankings_service_id ON pincode_rankings(service_id);
+CREATE INDEX IF NOT EXISTS idx_pincode_rankings_vendor_id ON pincode_rankings(vendor_id);
+
+CREATE OR REPLACE FUNCTION queue_serviceability_rankings()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ranking_queue (pincode)
+        SELECT DISTINCT pincode FROM new_rows
+        ON CONFLICT (pincode) DO NOTHING;
+    ELSE
+        INSERT INTO ranking_queue (pincode)
+        SELECT DISTINCT pincode FROM old_rows
+        ON CONFLICT (pincode) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Only changes to ranked attributes re-rank; activity and coverage changes
+-- already arrive through pincode_serviceability
+CREATE OR REPLACE FUNCTION queue_service_rankings()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO ranking_queue (pincode)
+    SELECT DISTINCT ps.pincode
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    JOIN pincode_serviceability ps ON ps.vendor_id = n.vendor_id AND ps.service_id = n.id
+    WHERE (n.price_per_liter, n.water_type, n.tanker_capacity)
+          IS DISTINCT FROM (o.price_per_liter, o.water_type, o.tanker_capacity)
+    ON CONFLICT (pincode) DO NOTHING;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION queue_vendor_rankings()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO ranking_queue (pincode)
+    SELECT DISTINCT pincode FROM pincode_serviceability WHERE vendor_id = NEW.id
+    ON CONFLICT (pincode) DO NOTHING;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS queue_serviceability_rankings_insert ON pincode_serviceability;
+CREATE TRIGGER queue_serviceability_rankings_insert AFTER INSERT ON pincode_serviceability REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION queue_serviceability_rankings();
+DROP TRIGGER IF EXISTS queue_serviceability_rankings_delete ON pincode_serviceability;
+CREATE TRIGGER queue_serviceability_rankings_delete AFTER DELETE ON pincode_serviceability REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION queue_serviceability_rankings();
+DROP TRIGGER IF EXISTS queue_service_rankings ON vendor_services;
+CREATE TRIGGER queue_service_rankings AFTER UPDATE ON vendor_services REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION queue_service_rankings();
+DROP TRIGGER IF EXISTS queue_vendor_rankings ON vendor_profiles;
+CREATE TRIGGER queue_vendor_rankings AFTER UPDATE OF rating_total, rating_count, dispatch_minutes ON vendor_profiles FOR EACH ROW EXECUTE FUNCTION queue_vendor_rankings();
+
+-- Rank every pincode that already has serviceable vendors on the next refresh
+INSERT INTO ranking_queue (pincode)
+SELECT DISTINCT pincode FROM pincode_serviceability
+ON CONFLICT (pincode) DO NOTHING;
@@ -0,0 +1,44 @@
+-- Vendor offers matched to customer water requirements
+-- matching.py fills requirement_matches in a nightly batch (see its module
+-- docstring for the matching rules). Runs are incremental: requirements
+-- changed since the last run's watermark in job_watermarks, or whose
+-- candidate services changed, are queued in requirement_match_queue and
+-- re-matched in batches.
+
+CREATE TABLE IF NOT EXISTS requirement_matches (
+    requirement_id UUID REFERENCES customer_water_requirements(id) ON DELETE CASCADE,
+    rank SMALLINT,
+    service_id UUID REFERENCES vendor_services(id) ON DELETE CASCADE,
+    vendor_id UUID REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    tankers_per_delivery INTEGER NOT NULL,
+    cost_per_delivery DECIMAL(12,2),
+    common_days SMALLINT NOT NULL, -- bit mask, bit 0 = Monday
+    common_hours INTEGER NOT NULL, -- bit mask, bit h = h:00-h+1:00
+    matched_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (requirement_id, rank)
+);
+CREATE INDEX IF NOT EXISTS idx_requirement_matches_service_id ON requirement_matches(service_id);
+CREATE INDEX IF NOT EXISTS idx_requirement_matches_vendor_id ON requirement_matches(vendor_id);
+
+-- Filled at the start of a run and drained in batches, so an interrupted
+-- run resumes where it stopped
+CREATE TABLE IF NOT EXISTS requirement_match_queue (
+    requirement_id UUID PRIMARY KEY REFERENCES customer_water_requirements(id) ON DELETE CASCADE
+);
+
+-- High-water marks of incremental batch jobs
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Change detection scans only rows newer than the watermark
+CREATE INDEX IF NOT EXISTS idx_customer_water_requirements_updated_at ON customer_water_requirements(updated_at);
+CREATE INDEX IF NOT EXISTS idx_customer_profiles_updated_at ON customer_profiles(updated_at);
+CREATE INDEX IF NOT EXISTS idx_vendor_services_updated_at ON vendor_services(updated_at);
+CREATE INDEX IF NOT EXISTS idx_vendor_profiles_updated_at ON vendor_profiles(updated_at);
+CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users(updated_at);
+
+-- Requirements by customer, and customers by pincode as matching joins them
+CREATE INDEX IF NOT EXISTS idx_customer_water_requirements_customer_id ON customer_water_requirements(customer_id);
+CREATE INDEX IF NOT EXISTS idx_customer_profiles_pincode ON customer_profiles ((replace(postal_code, ' ', '')));
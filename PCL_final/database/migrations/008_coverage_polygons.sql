@@ -0,0 +1,20 @@
+-- Vendor coverage polygons
+-- A vendor can draw the territories it actually serves. A polygon with no
+-- service_id covers every service of the vendor. Vertices are packed
+-- little-endian int32 (lat, lng) pairs in microdegrees (see coverage.py),
+-- 8 bytes a vertex. Point lookups run on an in-memory STR R-tree rebuilt
+-- when the catalog version moves, so polygon writes bump it too.
+
+CREATE TABLE IF NOT EXISTS coverage_polygons (
+    id BIGSERIAL PRIMARY KEY,
+    vendor_id UUID NOT NULL REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    service_id UUID REFERENCES vendor_services(id) ON DELETE CASCADE,
+    name VARCHAR(255),
+    vertices BYTEA NOT NULL CHECK (octet_length(vertices) >= 24 AND octet_length(vertices) % 8 = 0),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_coverage_polygons_vendor_id ON coverage_polygons(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_coverage_polygons_service_id ON coverage_polygons(service_id);
+
+DROP TRIGGER IF EXISTS bump_catalog_version ON coverage_polygons;
+CREATE TRIGGER bump_catalog_version AFTER INSERT OR UPDATE OR DELETE ON coverage_polygons FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
@@ -0,0 +1,11 @@
+-- Bump the catalog version only for vendor profile columns the snapshots read
+-- The catalog, vendor search, text search and coverage snapshots read a
+-- vendor's id, user, name, city, location, delivery radius and tankers.
+-- Ratings and dispatch times are also stored on vendor_profiles but feed
+-- only the rankings, so updating them must not make every worker rebuild
+-- every snapshot.
+
+DROP TRIGGER IF EXISTS bump_catalog_version ON vendor_profiles;
+CREATE TRIGGER bump_catalog_version
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, business_name, city, latitude, longitude, delivery_radius_km, tanker_capacity
+    ON vendor_profiles FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
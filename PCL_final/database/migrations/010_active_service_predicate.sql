@@ -0,0 +1,62 @@
+-- One definition of an active service: vendor_services.is_active is true
+-- The catalog, search and SQLite queries filter on "vs.is_active", which
+-- leaves out services whose is_active is NULL; serviceability and area
+-- coverage used "IS NOT FALSE" and counted them in. Both now use the same
+-- predicate, and rows derived from NULL services are dropped.
+
+CREATE OR REPLACE FUNCTION sync_vendor_service_coverage()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM vendor_service_coverage WHERE service_id = NEW.id;
+    IF NEW.is_active THEN
+        PERFORM ensure_areas(NEW.coverage_areas);
+        INSERT INTO vendor_service_coverage (area_id, vendor_id, service_id)
+        SELECT DISTINCT a.id, NEW.vendor_id, NEW.id
+        FROM unnest(NEW.coverage_areas) AS n
+        JOIN areas a ON a.area_key = area_key(n);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION serviceable_pincodes(vendor_ids UUID[], codes TEXT[])
+RETURNS TABLE (pincode VARCHAR, vendor_id UUID, service_id UUID) AS $$
+    WITH services AS (
+        SELECT vs.id, vs.vendor_id,
+               coalesce(vs.coverage_areas, '{}') || coalesce(vp.service_areas, '{}')
+                   || ARRAY[vp.postal_code::TEXT] AS names
+        FROM vendor_services vs
+        JOIN vendor_profiles vp ON vp.id = vs.vendor_id
+        JOIN users u ON u.id = vp.user_id AND u.is_active
+        WHERE vs.is_active
+          AND (vendor_ids IS NULL OR vs.vendor_id = ANY (vendor_ids))
+    ), vendors AS (
+        SELECT vp.id, vp.latitude, vp.longitude,
+               coalesce(vp.delivery_radius_km, 50)::DOUBLE PRECISION AS radius_km,
+               coalesce(vp.delivery_radius_km, 50)
+                   / (111.195 * greatest(cos(radians(vp.latitude)), 0.01)) AS lng_span
+        FROM vendor_profiles vp
+        WHERE vp.latitude IS NOT NULL AND vp.longitude IS NOT NULL
+          AND vp.id IN (SELECT vendor_id FROM services)
+    )
+    SELECT pl.pincode, s.vendor_id, s.id
+    FROM services s
+    CROSS JOIN LATERAL unnest(s.names) AS n
+    JOIN pincode_localities pl ON pl.area_key = area_key(n)
+    WHERE codes IS NULL OR pl.pincode = ANY (codes)
+    UNION
+    SELECT p.pincode, s.vendor_id, s.id
+    FROM vendors v
+    JOIN pincodes p
+      ON p.latitude BETWEEN v.latitude - v.radius_km / 111.195 AND v.latitude + v.radius_km / 111.195
+     AND p.longitude BETWEEN v.longitude - v.lng_span AND v.longitude + v.lng_span
+     AND haversine_km(v.latitude, v.longitude, p.latitude, p.longitude) <= v.radius_km
+    JOIN services s ON s.vendor_id = v.id
+    WHERE codes IS NULL OR p.pincode = ANY (codes)
+$$ LANGUAGE sql STABLE;
+
+DELETE FROM vendor_service_coverage
+WHERE service_id IN (SELECT id FROM vendor_services WHERE is_active IS NULL);
+
+DELETE FROM pincode_serviceability
+WHERE service_id IN (SELECT id FROM vendor_services WHERE is_active IS NULL);
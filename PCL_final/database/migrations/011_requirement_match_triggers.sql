@@ -0,0 +1,66 @@
+-- Queue requirements for re-matching on changes that leave no updated_at
+-- The incremental run (matching.py) finds changed requirements and services
+-- through their updated_at columns. A deleted service takes its
+-- requirement_matches rows with it, and serviceability can change through
+-- area, coverage or pincode directory updates without touching a service,
+-- so these triggers queue the requirements they affect in
+-- requirement_match_queue for the next run. Requirements already left short
+-- before this migration need one "python matching.py run --full".
+
+-- Before the cascade removes the matches that name the service or vendor
+CREATE OR REPLACE FUNCTION queue_deleted_service_matches()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO requirement_match_queue (requirement_id)
+    SELECT requirement_id FROM requirement_matches WHERE service_id = OLD.id
+    ON CONFLICT (requirement_id) DO NOTHING;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION queue_deleted_vendor_matches()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO requirement_match_queue (requirement_id)
+    SELECT requirement_id FROM requirement_matches WHERE vendor_id = OLD.id
+    ON CONFLICT (requirement_id) DO NOTHING;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+-- A service that starts serving a pincode is a new candidate for the
+-- requirements there; one that stops only matters to those it matched
+CREATE OR REPLACE FUNCTION queue_serviceability_matches()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO requirement_match_queue (requirement_id)
+        SELECT DISTINCT r.id
+        FROM new_rows n
+        JOIN vendor_services vs ON vs.id = n.service_id
+        JOIN customer_profiles cp ON replace(cp.postal_code, ' ', '') = n.pincode
+        JOIN customer_water_requirements r
+          ON r.customer_id = cp.id AND lower(btrim(r.water_type)) = lower(btrim(vs.water_type))
+        ON CONFLICT (requirement_id) DO NOTHING;
+    ELSE
+        INSERT INTO requirement_match_queue (requirement_id)
+        SELECT DISTINCT m.requirement_id
+        FROM old_rows o
+        JOIN requirement_matches m ON m.service_id = o.service_id
+        JOIN customer_water_requirements r ON r.id = m.requirement_id
+        JOIN customer_profiles cp
+          ON cp.id = r.customer_id AND replace(cp.postal_code, ' ', '') = o.pincode
+        ON CONFLICT (requirement_id) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS queue_deleted_service_matches ON vendor_services;
+CREATE TRIGGER queue_deleted_service_matches BEFORE DELETE ON vendor_services FOR EACH ROW EXECUTE FUNCTION queue_deleted_service_matches();
+DROP TRIGGER IF EXISTS queue_deleted_vendor_matches ON vendor_profiles;
+CREATE TRIGGER queue_deleted_vendor_matches BEFORE DELETE ON vendor_profiles FOR EACH ROW EXECUTE FUNCTION queue_deleted_vendor_matches();
+DROP TRIGGER IF EXISTS queue_serviceability_matches_insert ON pincode_serviceability;
+CREATE TRIGGER queue_serviceability_matches_insert AFTER INSERT ON pincode_serviceability REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION queue_serviceability_matches();
+DROP TRIGGER IF EXISTS queue_serviceability_matches_delete ON pincode_serviceability;
+CREATE TRIGGER queue_serviceability_matches_delete AFTER DELETE ON pincode_serviceability REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION queue_serviceability_matches();
@@ -0,0 +1,353 @@
+-- AquaHub Database Schema (embedded SQLite)
+-- Mirrors schema.sql for the SQLite storage backend.
+-- UUIDs are generated by the application, TEXT[]/INTEGER[] columns hold
+-- JSON arrays (queried with json_each), and timestamps are ISO-8601 UTC text.
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    user_type TEXT NOT NULL CHECK (user_type IN ('customer', 'vendor')),
+    is_active INTEGER DEFAULT 1,
+    email_verified INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS customer_profiles (
+    id TEXT PRIMARY KEY,
+    user_id TEXT UNIQUE REFERENCES users(id) ON DELETE CASCADE,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    date_of_birth TEXT,
+    gender TEXT CHECK (gender IN ('male', 'female', 'other')),
+    address_line1 TEXT NOT NULL,
+    address_line2 TEXT,
+    city TEXT NOT NULL,
+    state TEXT NOT NULL,
+    postal_code TEXT NOT NULL,
+    country TEXT DEFAULT 'India',
+    preferred_delivery_time TEXT,
+    emergency_contact_name TEXT,
+    emergency_contact_phone TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS vendor_profiles (
+    id TEXT PRIMARY KEY,
+    user_id TEXT UNIQUE REFERENCES users(id) ON DELETE CASCADE,
+    business_name TEXT NOT NULL,
+    contact_person_name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    alternate_phone TEXT,
+    business_address_line1 TEXT NOT NULL,
+    business_address_line2 TEXT,
+    city TEXT NOT NULL,
+    state TEXT NOT NULL,
+    postal_code TEXT NOT NULL,
+    country TEXT DEFAULT 'India',
+    business_type TEXT,
+    years_in_business INTEGER,
+    license_number TEXT,
+    tax_id TEXT,
+    service_areas TEXT DEFAULT '[]', -- JSON array of areas they serve
+    tanker_capacity TEXT DEFAULT '[]', -- JSON array of tanker capacities
+    delivery_radius_km INTEGER DEFAULT 50,
+    latitude REAL, -- depot location for radius search
+    longitude REAL,
+    rating_total INTEGER NOT NULL DEFAULT 0, -- running sum of 1-5 star ratings
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    dispatch_minutes INTEGER DEFAULT 60, -- order to tanker leaving the depot
+    is_verified INTEGER DEFAULT 0,
+    verification_documents TEXT DEFAULT '[]', -- JSON array of document URLs
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS customer_water_requirements (
+    id TEXT PRIMARY KEY,
+    customer_id TEXT REFERENCES customer_profiles(id) ON DELETE CASCADE,
+    required_quantity INTEGER NOT NULL,
+    frequency TEXT,
+    preferred_delivery_days TEXT DEFAULT '[]', -- JSON array
+    preferred_time_slots TEXT DEFAULT '[]', -- JSON array
+    water_type TEXT DEFAULT 'potable',
+    storage_capacity INTEGER,
+    special_instructions TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS vendor_services (
+    id TEXT PRIMARY KEY,
+    vendor_id TEXT REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    service_name TEXT NOT NULL,
+    water_type TEXT NOT NULL,
+    tanker_capacity INTEGER NOT NULL,
+    price_per_liter REAL,
+    minimum_order_quantity INTEGER,
+    is_active INTEGER DEFAULT 1,
+    available_days TEXT DEFAULT '[]', -- JSON array
+    available_time_slots TEXT DEFAULT '[]', -- JSON array
+    coverage_areas TEXT DEFAULT '[]', -- JSON array
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- Normalized service areas, kept in step with the JSON arrays above by
+-- SQLiteStorage (PostgreSQL uses triggers, see migrations/003)
+CREATE TABLE IF NOT EXISTS areas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    area_key TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS vendor_service_areas (
+    area_id INTEGER REFERENCES areas(id) ON DELETE CASCADE,
+    vendor_id TEXT REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    PRIMARY KEY (area_id, vendor_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS vendor_service_coverage (
+    area_id INTEGER REFERENCES areas(id) ON DELETE CASCADE,
+    vendor_id TEXT REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    service_id TEXT REFERENCES vendor_services(id) ON DELETE CASCADE,
+    PRIMARY KEY (area_id, vendor_id, service_id)
+) WITHOUT ROWID;
+
+-- Pincode directory and precomputed serviceability (see migrations/005);
+-- SQLiteStorage refreshes the rows of a vendor whenever it writes one
+CREATE TABLE IF NOT EXISTS pincodes (
+    pincode TEXT PRIMARY KEY,
+    district TEXT,
+    state TEXT,
+    latitude REAL,
+    longitude REAL
+);
+
+CREATE TABLE IF NOT EXISTS pincode_localities (
+    area_key TEXT,
+    pincode TEXT REFERENCES pincodes(pincode) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    PRIMARY KEY (area_key, pincode)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS pincode_serviceability (
+    pincode TEXT REFERENCES pincodes(pincode) ON DELETE CASCADE,
+    vendor_id TEXT REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    service_id TEXT REFERENCES vendor_services(id) ON DELETE CASCADE,
+    PRIMARY KEY (pincode, vendor_id, service_id)
+) WITHOUT ROWID;
+
+-- Precomputed top-K services per pincode and water type, re-ranked from
+-- ranking_queue (see migrations/006)
+CREATE TABLE IF NOT EXISTS ranking_queue (
+    pincode TEXT PRIMARY KEY,
+    queued_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS pincode_rankings (
+    pincode TEXT,
+    water_type TEXT,
+    rank INTEGER,
+    service_id TEXT REFERENCES vendor_services(id) ON DELETE CASCADE,
+    vendor_id TEXT REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    score REAL NOT NULL,
+    distance_km REAL,
+    eta_minutes INTEGER,
+    PRIMARY KEY (pincode, water_type, rank)
+) WITHOUT ROWID;
+
+-- Vendor offers matched to customer requirements by the nightly
+-- matching.py run (see migrations/007)
+CREATE TABLE IF NOT EXISTS requirement_matches (
+    requirement_id TEXT REFERENCES customer_water_requirements(id) ON DELETE CASCADE,
+    rank INTEGER,
+    service_id TEXT REFERENCES vendor_services(id) ON DELETE CASCADE,
+    vendor_id TEXT REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    tankers_per_delivery INTEGER NOT NULL,
+    cost_per_delivery REAL,
+    common_days INTEGER NOT NULL, -- bit mask, bit 0 = Monday
+    common_hours INTEGER NOT NULL, -- bit mask, bit h = h:00-h+1:00
+    matched_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    PRIMARY KEY (requirement_id, rank)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS requirement_match_queue (
+    requirement_id TEXT PRIMARY KEY REFERENCES customer_water_requirements(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    name TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL
+);
+
+-- Vendor coverage polygons, vertices packed as int32 microdegree pairs
+-- (see migrations/008)
+CREATE TABLE IF NOT EXISTS coverage_polygons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vendor_id TEXT NOT NULL REFERENCES vendor_profiles(id) ON DELETE CASCADE,
+    service_id TEXT REFERENCES vendor_services(id) ON DELETE CASCADE,
+    name TEXT,
+    vertices BLOB NOT NULL CHECK (length(vertices) >= 24 AND length(vertices) % 8 = 0),
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- Change counters polled by the in-memory snapshots (see migrations/004)
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    changed_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+INSERT OR IGNORE INTO data_versions (name) VALUES ('catalog');
+
+CREATE INDEX IF NOT EXISTS idx_users_user_type ON users(user_type);
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_customer_profiles_city ON customer_profiles(city);
+CREATE INDEX IF NOT EXISTS idx_vendor_profiles_city ON vendor_profiles(city);
+CREATE INDEX IF NOT EXISTS idx_vendor_services_vendor_id ON vendor_services(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_vendor_services_water_type ON vendor_services(water_type);
+CREATE INDEX IF NOT EXISTS idx_vendor_service_areas_vendor_id ON vendor_service_areas(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_vendor_service_coverage_service_id ON vendor_service_coverage(service_id);
+CREATE INDEX IF NOT EXISTS idx_pincodes_location ON pincodes(latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_pincode_localities_pincode ON pincode_localities(pincode);
+CREATE INDEX IF NOT EXISTS idx_pincode_serviceability_vendor_id ON pincode_serviceability(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_ranking_queue_queued_at ON ranking_queue(queued_at);
+CREATE INDEX IF NOT EXISTS idx_pincode_rankings_service_id ON pincode_rankings(service_id);
+CREATE INDEX IF NOT EXISTS idx_pincode_rankings_vendor_id ON pincode_rankings(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_requirement_matches_service_id ON requirement_matches(service_id);
+CREATE INDEX IF NOT EXISTS idx_requirement_matches_vendor_id ON requirement_matches(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_customer_water_requirements_updated_at ON customer_water_requirements(updated_at);
+CREATE INDEX IF NOT EXISTS idx_customer_profiles_updated_at ON customer_profiles(updated_at);
+CREATE INDEX IF NOT EXISTS idx_vendor_services_updated_at ON vendor_services(updated_at);
+CREATE INDEX IF NOT EXISTS idx_vendor_profiles_updated_at ON vendor_profiles(updated_at);
+CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users(updated_at);
+CREATE INDEX IF NOT EXISTS idx_customer_water_requirements_customer_id ON customer_water_requirements(customer_id);
+CREATE INDEX IF NOT EXISTS idx_customer_profiles_pincode ON customer_profiles(replace(postal_code, ' ', ''));
+CREATE INDEX IF NOT EXISTS idx_coverage_polygons_vendor_id ON coverage_polygons(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_coverage_polygons_service_id ON coverage_polygons(service_id);
+
+-- updated_at maintenance (SQLite has no BEFORE UPDATE row mutation)
+CREATE TRIGGER IF NOT EXISTS update_users_updated_at AFTER UPDATE ON users
+BEGIN
+    UPDATE users SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS update_customer_profiles_updated_at AFTER UPDATE ON customer_profiles
+BEGIN
+    UPDATE customer_profiles SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS update_vendor_profiles_updated_at AFTER UPDATE ON vendor_profiles
+BEGIN
+    UPDATE vendor_profiles SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS update_customer_water_requirements_updated_at AFTER UPDATE ON customer_water_requirements
+BEGIN
+    UPDATE customer_water_requirements SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS update_vendor_services_updated_at AFTER UPDATE ON vendor_services
+BEGIN
+    UPDATE vendor_services SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id;
+END;
+
+-- catalog version bumps (SQLite only has row-level triggers)
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_services_insert AFTER INSERT ON vendor_services
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_services_update AFTER UPDATE ON vendor_services
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_services_delete AFTER DELETE ON vendor_services
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_profiles_insert AFTER INSERT ON vendor_profiles
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+-- Only the columns the snapshots read (see migrations/009); recreated so
+-- files made before that get the narrower trigger
+DROP TRIGGER IF EXISTS bump_catalog_version_profiles_update;
+CREATE TRIGGER bump_catalog_version_profiles_update
+AFTER UPDATE OF user_id, business_name, city, latitude, longitude, delivery_radius_km, tanker_capacity ON vendor_profiles
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_profiles_delete AFTER DELETE ON vendor_profiles
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_users_update AFTER UPDATE OF is_active ON users
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_polygons_insert AFTER INSERT ON coverage_polygons
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_polygons_update AFTER UPDATE ON coverage_polygons
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+CREATE TRIGGER IF NOT EXISTS bump_catalog_version_polygons_delete AFTER DELETE ON coverage_polygons
+BEGIN
+    UPDATE data_versions SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE name = 'catalog';
+END;
+
+-- ranking queue (re-rank pincodes whose candidates changed)
+CREATE TRIGGER IF NOT EXISTS queue_serviceability_rankings_insert AFTER INSERT ON pincode_serviceability
+BEGIN
+    INSERT OR IGNORE INTO ranking_queue (pincode) VALUES (NEW.pincode);
+END;
+CREATE TRIGGER IF NOT EXISTS queue_serviceability_rankings_delete AFTER DELETE ON pincode_serviceability
+BEGIN
+    INSERT OR IGNORE INTO ranking_queue (pincode) VALUES (OLD.pincode);
+END;
+CREATE TRIGGER IF NOT EXISTS queue_service_rankings AFTER UPDATE OF price_per_liter, water_type, tanker_capacity ON vendor_services
+WHEN OLD.price_per_liter IS NOT NEW.price_per_liter OR OLD.water_type IS NOT NEW.water_type
+  OR OLD.tanker_capacity IS NOT NEW.tanker_capacity
+BEGIN
+    INSERT OR IGNORE INTO ranking_queue (pincode)
+    SELECT pincode FROM pincode_serviceability WHERE vendor_id = NEW.vendor_id AND service_id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS queue_vendor_rankings AFTER UPDATE OF rating_total, rating_count, dispatch_minutes ON vendor_profiles
+BEGIN
+    INSERT OR IGNORE INTO ranking_queue (pincode)
+    SELECT pincode FROM pincode_serviceability WHERE vendor_id = NEW.id;
+END;
+
+-- requirement match queue for changes without an updated_at (see migrations/011)
+CREATE TRIGGER IF NOT EXISTS queue_deleted_service_matches BEFORE DELETE ON vendor_services
+BEGIN
+    INSERT OR IGNORE INTO requirement_match_queue (requirement_id)
+    SELECT requirement_id FROM requirement_matches WHERE service_id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS queue_deleted_vendor_matches BEFORE DELETE ON vendor_profiles
+BEGIN
+    INSERT OR IGNORE INTO requirement_match_queue (requirement_id)
+    SELECT requirement_id FROM requirement_matches WHERE vendor_id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS queue_serviceability_matches_insert AFTER INSERT ON pincode_serviceability
+BEGIN
+    INSERT OR IGNORE INTO requirement_match_queue (requirement_id)
+    SELECT r.id
+    FROM vendor_services vs
+    JOIN customer_profiles cp ON replace(cp.postal_code, ' ', '') = NEW.pincode
+    JOIN customer_water_requirements r
+      ON r.customer_id = cp.id AND lower(trim(r.water_type)) = lower(trim(vs.water_type))
+    WHERE vs.id = NEW.service_id;
+END;
+CREATE TRIGGER IF NOT EXISTS queue_serviceability_matches_delete AFTER DELETE ON pincode_serviceability
+BEGIN
+    INSERT OR IGNORE INTO requirement_match_queue (requirement_id)
+    SELECT m.requirement_id
+    FROM requirement_matches m
+    JOIN customer_water_requirements r ON r.id = m.requirement_id
+    JOIN customer_profiles cp ON cp.id = r.customer_id
+    WHERE m.service_id = OLD.service_id AND replace(cp.postal_code, ' ', '') = OLD.pincode;
+END;
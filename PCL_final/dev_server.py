@@ -111,6 +111,9 @@ def demo_login():
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
+    # API calls expect JSON; the rest of the backend API lives in backend/app.py
+    if request.path.startswith('/api/'):
+        return jsonify({'error': 'Not found'}), 404
     return send_from_directory('.', 'index.html')
 
 if __name__ == '__main__':
@@ -4,8 +4,10 @@ Creates database and tables if they don't exist
 """
 
 import psycopg2
+import sqlite3
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -21,6 +23,9 @@ DB_CONFIG = {
 
 DATABASE_NAME = os.getenv('DB_NAME', 'aquahub')
 
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'postgres').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH') or os.path.join('backend', 'aquahub.sqlite3')
+
 def create_database():
     """Create the AquaHub database if it doesn't exist"""
     print("🔧 Setting up AquaHub Database...")
@@ -133,11 +138,90 @@ def insert_sample_data():
         print(f"❌ Failed to insert sample data: {e}")
         return False
 
+def apply_migrations():
+    """Apply pending database/migrations/*.sql files in filename order"""
+    print("\n🧩 Applying migrations...")
+    
+    try:
+        conn = psycopg2.connect(
+            host=DB_CONFIG['host'],
+            database=DATABASE_NAME,
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password'],
+            port=DB_CONFIG['port']
+        )
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                filename VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT filename FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        conn.commit()
+        
+        migrations_dir = os.path.join('database', 'migrations')
+        pending = sorted(
+            name for name in os.listdir(migrations_dir)
+            if name.endswith('.sql') and name not in applied
+        ) if os.path.isdir(migrations_dir) else []
+        
+        for name in pending:
+            print(f"📄 Applying {name}...")
+            with open(os.path.join(migrations_dir, name), 'r') as f:
+                cursor.execute(f.read())
+            cursor.execute("INSERT INTO schema_migrations (filename) VALUES (%s)", (name,))
+            conn.commit()
+        
+        if pending:
+            print(f"✅ Applied {len(pending)} migration(s)")
+        else:
+            print("ℹ️ No pending migrations")
+        
+        cursor.close()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Failed to apply migrations: {e}")
+        return False
+
+def setup_sqlite():
+    """Create the embedded SQLite database used by STORAGE_BACKEND=sqlite"""
+    print(f"\n🗄️ Setting up SQLite database at {SQLITE_PATH}...")
+    
+    try:
+        schema_file = os.path.join('database', 'schema_sqlite.sql')
+        with open(schema_file, 'r') as f:
+            schema_sql = f.read()
+        
+        conn = sqlite3.connect(SQLITE_PATH)
+        conn.executescript(schema_sql)
+        conn.close()
+        print("✅ SQLite schema created successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Failed to setup SQLite database: {e}")
+        return False
+
 def main():
     """Run database setup"""
     print("🚀 AquaHub Database Setup")
     print("=" * 50)
     
+    # The embedded backend needs no server, only the schema file applied
+    if STORAGE_BACKEND == 'sqlite':
+        setup_sqlite()
+        return
+    
+    # Existing databases only need the incremental migrations
+    if '--migrate' in sys.argv[1:]:
+        apply_migrations()
+        return
+    
     # Step 1: Create database
     if not create_database():
         print("❌ Database creation failed, aborting setup")
@@ -148,7 +232,12 @@ def main():
         print("❌ Schema setup failed, aborting setup")
         return
     
-    # Step 3: Insert sample data
+    # Step 3: Apply migrations
+    if not apply_migrations():
+        print("❌ Migrations failed, aborting setup")
+        return
+    
+    # Step 4: Insert sample data
     insert_sample_data()
     
     print("\n🎉 Database setup completed!")